@@ -0,0 +1,123 @@
+"""
+Custo do cliente por modo de saída (painel, --plain, --jsonl): tempo da
+partida do processo até o 'set_name' chegar ao servidor e CPU do cliente
+por mensagem recebida.
+
+Um servidor de mentira, aqui mesmo, aceita a conexão, mede quando o
+'set_name' chega, manda --messages mensagens de uma partida (estado em
+delta, avisos, dados, revelação) e um 'game_over'. A CPU por mensagem é a
+diferença entre essa execução e uma só com o 'game_over', dividida pelo
+número de mensagens. O cliente roda com o stdout num pipe descartado (o
+painel cai no modo texto do render.py, sem terminal) e numa pasta
+temporária, por causa do partida_log.txt.
+
+Uso:
+    python benchmarks/bench_client.py [--runs 10] [--messages 20000]
+"""
+import argparse
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from protocol import encode_message, FrameDecoder, CODEC_BINARY
+
+MODES = {"painel": [], "plain": ["--plain"], "jsonl": ["--jsonl"]}
+
+def game_frames(messages, players=6):
+    """
+    'messages' quadros de uma partida, na proporção de uma de verdade: a cada
+    turno um 'state_delta' e um aviso; a cada 10 turnos, dados novos e a revelação.
+    """
+    names = [f"Pirata{i}" for i in range(players)]
+    state = {"players": [{"name": n, "dice_count": 5} for n in names],
+             "last_bid": {"quantity": 0, "face": 0}, "current_turn": names[0]}
+    frames = [encode_message("state_snapshot", {"seq": 1, "state": state}, CODEC_BINARY)]
+    seq = 1
+    turn = 0
+    while len(frames) < messages:
+        if turn % 10 == 0:
+            frames.append(encode_message("round_start", {"dice": [3, 1, 6, 6, 2]}, CODEC_BINARY))
+            frames.append(encode_message("reveal_all", {
+                "dice_data": [{"player": n, "dice": [2, 4, 4, 1, 6]} for n in names],
+                "quantity": 7, "face": 4, "total_count": 12, "wild_ones": True, "step": 0}))
+        seq += 1
+        frames.append(encode_message("state_delta", {
+            "seq": seq, "last_bid": {"quantity": turn % 30 + 1, "face": turn % 6 + 1},
+            "turn": (turn + 1) % players}, CODEC_BINARY))
+        frames.append(encode_message("info", {"message": f"{names[turn % players]} apostou."}))
+        turn += 1
+    return frames[:messages]
+
+def play(mode, listener, port, frames, workdir):
+    """
+    Uma execução do cliente. Retorna (s até o 'set_name', s de CPU do cliente).
+    """
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "client.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--name", "bench", *MODES[mode]],
+        cwd=workdir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    conn, _ = listener.accept()
+    decoder = FrameDecoder()
+    hello = []
+    while not hello:
+        data = conn.recv(4096)
+        if not data:
+            raise RuntimeError("cliente fechou sem mandar 'set_name'")
+        hello = decoder.feed(data)
+    startup = time.perf_counter() - start
+    conn.sendall(b"".join(frames) + encode_message("game_over", {"message": "O vencedor é bench!"}))
+    proc.wait(timeout=60)
+    conn.close()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return startup, cpu
+
+def run(runs=10, messages=20_000):
+    """
+    Retorna {modo: {"startup_ms", "cpu_idle_ms", "cpu_us_per_message"}} (medianas das execuções).
+    """
+    frames = game_frames(messages)
+    listener = socket.create_server(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in MODES:
+            play(mode, listener, port, [], workdir)  # Aquece o cache de disco e os .pyc
+            startups, idle, busy = [], [], []
+            for _ in range(runs):
+                startup, cpu = play(mode, listener, port, [], workdir)
+                startups.append(startup)
+                idle.append(cpu)
+                busy.append(play(mode, listener, port, frames, workdir)[1])
+            idle_cpu = sorted(idle)[runs // 2]
+            results[mode] = {
+                "startup_ms": sorted(startups)[runs // 2] * 1000,
+                "cpu_idle_ms": idle_cpu * 1000,
+                "cpu_us_per_message": max(0.0, sorted(busy)[runs // 2] - idle_cpu) / messages * 1e6,
+            }
+    listener.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"medianas de {args.runs} execuções; CPU por mensagem com {args.messages} mensagens")
+    print(f"{'modo':<8} {'até set_name':>13} {'CPU só partida':>15} {'CPU/mensagem':>13}")
+    for mode, r in run(args.runs, args.messages).items():
+        print(f"{mode:<8} {r['startup_ms']:>10.1f} ms {r['cpu_idle_ms']:>12.1f} ms "
+              f"{r['cpu_us_per_message']:>10.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark dos codecs do protocolo: bytes no fio e ns por mensagem
+(encode e decode) para JSON x binário compacto, um tipo de mensagem por
+linha (os tipos sem layout binário saem em JSON nos dois codecs).
+
+Uso:
+    python benchmarks/bench_codec.py [--players 6] [--number 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from protocol import encode_message, decode_message, HEADER, CODEC_JSON, CODEC_BINARY
+
+def sample_messages(num_players):
+    players = [{"name": f"Pirata{i}", "dice_count": 5 - i % 3} for i in range(num_players)]
+    return {
+        "bid": {"quantity": 7, "face": 4},
+        "challenge": None,
+        "your_turn": None,
+        "round_start": {"dice": [3, 1, 6, 6, 2]},
+        "game_update": {
+            "state": {"players": players, "last_bid": {"quantity": 7, "face": 4},
+                      "current_turn": players[1]["name"]},
+            "message": f"Vez de {players[1]['name']}"
+        },
+        "state_snapshot": {
+            "seq": 42,
+            "state": {"players": players, "last_bid": {"quantity": 7, "face": 4},
+                      "current_turn": players[1]["name"]},
+        },
+        "state_delta": {"seq": 43, "last_bid": {"quantity": 8, "face": 2}, "turn": 2},
+        "info": {"message": f"{players[0]['name']} apostou 7x 4."},
+        "reveal_all": {
+            "dice_data": [{"player": p["name"], "dice": [2, 4, 4, 1, 6][:p["dice_count"]]} for p in players],
+            "quantity": 7, "face": 4, "total_count": 6, "wild_ones": True, "step": 0.6,
+        },
+        "game_over": {"message": f"O vencedor é {players[0]['name']}!"},
+    }
+
+def bench(msg_type, payload, codec, number):
+    frame = encode_message(msg_type, payload, codec)
+    body = memoryview(frame)[HEADER.size:]
+    enc = timeit.timeit(lambda: encode_message(msg_type, payload, codec), number=number)
+    dec = timeit.timeit(lambda: decode_message(body), number=number)
+    return len(frame), enc / number * 1e9, dec / number * 1e9
+
+def run(num_players=6, number=20000):
+    """
+    Retorna [{"type", "codec", "bytes", "encode_ns", "decode_ns"}] para cada mensagem/codec.
+    """
+    results = []
+    for msg_type, payload in sample_messages(num_players).items():
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            size, enc, dec = bench(msg_type, payload, codec, number)
+            results.append({"type": msg_type, "codec": codec, "bytes": size,
+                            "encode_ns": enc, "decode_ns": dec})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = run(args.players, args.number)
+    print(f"{'mensagem':<14} {'codec':<5} {'bytes':>6} {'encode ns':>10} {'decode ns':>10}")
+    for r in results:
+        print(f"{r['type']:<14} {r['codec']:<5} {r['bytes']:>6} {r['encode_ns']:>10.0f} {r['decode_ns']:>10.0f}")
+
+if __name__ == "__main__":
+    main()
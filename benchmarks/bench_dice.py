@@ -0,0 +1,82 @@
+"""
+Rodadas sorteadas por segundo (mãos + histograma de faces, o que o
+GameState.roll entrega ao servidor) com 2, 6 e 100 jogadores de 5 dados:
+um random.randint por dado (o sorteio de antes), engine.DiceStream (um
+SHAKE-128 por rodada) e, com NumPy instalada, um Generator (PCG64) com uma
+chamada integers() por rodada.
+
+Uso:
+    python benchmarks/bench_dice.py [--players 2 6 100] [--rounds 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import DiceStream, GameState, np
+
+def numpy_roller(seed):
+    """
+    O mesmo que DiceStream.roll, sobre um numpy.random.Generator.
+    """
+    rng = np.random.default_rng(seed)
+
+    def roll(counts):
+        dice = rng.integers(1, 7, size=sum(counts), dtype=np.int8)
+        faces = np.bincount(dice, minlength=7).tolist()
+        flat = dice.tolist()
+        hands = []
+        pos = 0
+        for n in counts:
+            hands.append(flat[pos:pos + n])
+            pos += n
+        return hands, faces
+
+    return roll
+
+def rounds_per_second(roll, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        roll()
+    return rounds / (time.perf_counter() - start)
+
+def run(players=(2, 6, 100), rounds=20_000, seed=1):
+    results = []
+    for n in players:
+        game = GameState(n)
+        counts = game.dice_counts
+        rng = random.Random(seed)
+        stream = DiceStream(seed)
+        row = {
+            "players": n, "dice": sum(counts),
+            "randint": rounds_per_second(lambda: game.roll(rng), rounds),
+            "stream": rounds_per_second(lambda: game.roll(stream), rounds),
+        }
+        if np is not None:
+            roll = numpy_roller(seed)
+            row["numpy"] = rounds_per_second(lambda: roll(counts), rounds)
+        # Conferência: a última rodada sai igual refeita só com (semente, rodada)
+        game.roll(stream)
+        row["reproducible"] = DiceStream(seed).roll_round(stream.round, counts)[0] == game.hands
+        results.append(row)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 6, 100])
+    parser.add_argument("--rounds", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{args.rounds} rodadas por medida; rodadas/s (x = em relação ao randint por dado)")
+    print(f"{'jogadores':>9} {'dados':>6} {'randint':>10} {'DiceStream':>17} {'NumPy':>17}")
+    for r in run(args.players, args.rounds):
+        base = r["randint"]
+        numpy = f"{r['numpy']:>10,.0f} {r['numpy'] / base:>5.1f}x" if "numpy" in r else f"{'-':>17}"
+        print(f"{r['players']:>9} {r['dice']:>6} {base:>10,.0f} {r['stream']:>10,.0f} "
+              f"{r['stream'] / base:>5.1f}x {numpy}" + ("" if r["reproducible"] else "  NÃO REPRODUZÍVEL"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Partidas de ponta a ponta no loopback: sobe um server.py de verdade (sem
+pausas, dados com semente fixa), joga --games partidas inteiras, uma depois
+da outra, com clientes roteirizados (o bot do loadgen com uma política sem
+sorteio) e mede a duração de cada rodada (do 'round_start' ao 'reveal_all'),
+a latência de cada aposta, mensagens por segundo e a CPU do servidor.
+
+Com a semente fixa e a mesma política em todos os assentos, cada execução
+joga exatamente as mesmas partidas: dá para comparar uma mudança no
+servidor com a anterior (ver benchmarks/suite.py).
+
+Uso:
+    python benchmarks/bench_e2e.py [--players 4] [--games 20] [--codec bin1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import loadgen
+from bench_scaling import free_port, wait_listening
+from protocol import CODEC_BINARY, CODEC_JSON
+
+def scripted_policy(view, rng=None):
+    """
+    Sem sorteio: duvida quando a aposta passa do esperado (dados próprios que
+    batem + 1/3 dos desconhecidos); senão aposta na face que mais tem na mão,
+    na menor quantidade que aumenta a aposta.
+    """
+    dice = view["dice"]
+    total = view["total_dice"]
+    q, f = view["last_bid"]["quantity"], view["last_bid"]["face"]
+
+    def mine(face):
+        return sum(1 for d in dice if d == face or (d == 1 and face != 1))
+
+    if q > 0 and q > mine(f) + (total - len(dice)) / (6 if f == 1 else 3):
+        return "challenge", None
+    face = max(range(2, 7), key=lambda face: (mine(face), face))
+    quantity = max(1, q if face > f else q + 1)
+    if quantity > total:
+        return "challenge", None
+    return "bid", {"quantity": quantity, "face": face}
+
+def cpu_seconds(pid):
+    """
+    CPU (usuário + sistema) de um processo vivo, pelo /proc (Linux). None fora do Linux.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rpartition(")")[2].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+async def play(args, players, games, stats):
+    for game in range(games):
+        await asyncio.gather(*(
+            loadgen.play_game(game * players + i, args, stats, scripted_policy, random.Random(i))
+            for i in range(players)))
+    stats.finished = time.perf_counter()
+
+def run(players=4, games=20, codec=CODEC_BINARY, seed=1):
+    """
+    Um servidor, 'games' partidas seguidas. Retorna o relatório do loadgen
+    (round_ms, bid_latency_ms, messages_per_s...) com a CPU do servidor.
+    """
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--port", str(port), "--players", str(players),
+         "--pacing", "0", "--dice-seed", str(seed), "--quiet", "--log-file", os.devnull],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_listening(port)
+        args = loadgen.parse_args(["--port", str(port), "--codec", codec])
+        stats = loadgen.Stats()
+        # A CPU conta a partir da porta aberta: a subida do interpretador fica de fora
+        before = cpu_seconds(proc.pid)
+        asyncio.run(play(args, players, games, stats))
+        after = cpu_seconds(proc.pid)
+    finally:
+        # SIGINT: sai sem drenar (as partidas já acabaram)
+        proc.send_signal(signal.SIGINT)
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    report = stats.report()
+    report.update({"players": players, "codec": codec, "round_samples": len(stats.rounds),
+                   "server_cpu_ms_per_game": None})
+    if before is not None:
+        report["server_cpu_ms_per_game"] = (after - before) * 1000 / max(1, report["games"])
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--codec", default=CODEC_BINARY, choices=[CODEC_JSON, CODEC_BINARY])
+    parser.add_argument("--seed", type=int, default=1, help="semente dos dados do servidor (--dice-seed)")
+    args = parser.parse_args()
+
+    r = run(args.players, args.games, args.codec, args.seed)
+    rounds, bids = r["round_ms"], r["bid_latency_ms"]
+    print(f"{r['games']} partidas de {r['players']} jogadores ({r['codec']}) em {r['elapsed_s']:.2f} s")
+    print(f"rodada ({r['round_samples']} amostras): p50 {rounds['p50']:.2f} ms  p95 {rounds['p95']:.2f} ms  "
+          f"p99 {rounds['p99']:.2f} ms")
+    print(f"bid -> estado ({r['bids']} amostras): p50 {bids['p50']:.2f} ms  p95 {bids['p95']:.2f} ms  "
+          f"p99 {bids['p99']:.2f} ms")
+    cpu = r["server_cpu_ms_per_game"]
+    print(f"mensagens/s: {r['messages_per_s']:,.0f}   partidas/s: {r['games_per_s']:.1f}   "
+          f"CPU do servidor: {'-' if cpu is None else f'{cpu:.1f} ms'} por partida")
+    print(f"erros: {r['errors'] or 'nenhum'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Vazão do núcleo do jogo (engine.py): rodadas simuladas por segundo com o
+GameState (uma partida por vez, como no servidor) e com o BatchSimulator
+(NumPy, muitas partidas em lockstep), mais o placar por assento.
+
+Uso:
+    python benchmarks/bench_engine.py [--players 4] [--games 100000] [--rounds 2000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+from odds import bid_probability
+
+def scalar_rounds_per_s(players, rounds, threshold=0.5, seed=1):
+    """
+    Mesma política de threshold_policy, jogada com o GameState do servidor.
+    """
+    rng = random.Random(seed)
+    game = engine.GameState(players)
+    game.roll(rng)
+    done = 0
+    start = time.perf_counter()
+    while done < rounds:
+        hand = game.hands[game.turn]
+        total = game.total_dice()
+        q, f = game.last_bid
+        if q and bid_probability(hand, total - len(hand), q, f) < threshold:
+            game.resolve_challenge()
+            done += 1
+            if game.winner() is not None:
+                game = engine.GameState(players)
+            game.roll(rng)
+            continue
+        matches = engine.count_matches
+        face = max(range(2, 7), key=lambda face: matches(face, hand))
+        quantity = max(q, 1) if face > f else q + 1
+        if game.check_bid(quantity, face):
+            game.resolve_challenge()
+            done += 1
+            if game.winner() is not None:
+                game = engine.GameState(players)
+            game.roll(rng)
+        else:
+            game.apply_bid(quantity, face)
+    return done / (time.perf_counter() - start)
+
+def run(players=4, games=100000, rounds=2_000_000, scalar_rounds=20000):
+    result = {"scalar_rounds_per_s": scalar_rounds_per_s(players, scalar_rounds)}
+    if engine.np is not None:
+        sim = engine.BatchSimulator(games, players, seed=1)
+        start = time.perf_counter()
+        sim.run(rounds)
+        elapsed = time.perf_counter() - start
+        result.update({
+            "batch_rounds_per_s": sim.rounds / elapsed,
+            "batch_decisions_per_s": (sim.rounds + sim.bids) / elapsed,
+            "batch_games": sim.games,
+            "batch_wins": sim.wins.tolist(),
+        })
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--rounds", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    r = run(args.players, args.games, args.rounds)
+    print(f"{args.players} jogadores")
+    print(f"  GameState (1 partida)         {r['scalar_rounds_per_s']:>12,.0f} rodadas/s")
+    if "batch_rounds_per_s" in r:
+        print(f"  BatchSimulator ({args.games:>7} jogos) {r['batch_rounds_per_s']:>12,.0f} rodadas/s"
+              f" ({r['batch_decisions_per_s']:,.0f} jogadas/s)")
+        print(f"  partidas completas: {r['batch_games']}  vitórias por assento: {r['batch_wins']}")
+    else:
+        print("  BatchSimulator: NumPy não instalada")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Custo das esperas: CPU ociosa por 1.000 jogadores conectados e latência
+entre 'your_turn' chegar e o prompt aparecer, comparando o modelo antigo
+(polling com time.sleep) com o atual (asyncio no servidor, Event no cliente).
+
+Uso:
+    python benchmarks/bench_idle.py [--players 1000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from protocol import encode_message
+
+POLL_INTERVAL = 0.1   # O sleep usado pelos loops antigos
+
+def _cpu_during(seconds):
+    start = time.process_time()
+    time.sleep(seconds)
+    return time.process_time() - start
+
+# =======================
+# CPU ociosa
+# =======================
+def idle_cpu_polling(players, seconds):
+    """
+    Modelo antigo: uma thread por jogador em 'while not flag: time.sleep(0.1)'.
+    """
+    stop = False
+
+    def waiter():
+        while not stop:
+            time.sleep(POLL_INTERVAL)
+
+    threads = [threading.Thread(target=waiter, daemon=True) for _ in range(players)]
+    for t in threads:
+        t.start()
+    time.sleep(POLL_INTERVAL)
+    cpu = _cpu_during(seconds)
+    stop = True
+    for t in threads:
+        t.join()
+    return cpu
+
+def idle_cpu_async_server(players, seconds):
+    """
+    Servidor atual com 'players' sockets conectados e todas as mesas
+    esperando a jogada do turno (nenhuma mensagem trafegando).
+    """
+    server.PACING = dict.fromkeys(server.PACING, 0)
+    server.logger.level = server.ERROR
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    holder = {}
+
+    async def run():
+        gs = server.GameServer()
+        srv = await asyncio.start_server(gs.handle_client, "127.0.0.1", 0, backlog=players)
+        holder["port"] = srv.sockets[0].getsockname()[1]
+        holder["srv"] = srv
+        ready.set()
+        await srv.serve_forever()
+
+    thread = threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True)
+    thread.start()
+    ready.wait()
+
+    socks = []
+    for i in range(players):
+        s = socket.create_connection(("127.0.0.1", holder["port"]))
+        s.sendall(encode_message("set_name", {"name": f"p{i}"}))
+        socks.append(s)
+    time.sleep(1)  # Mesas formadas e turnos anunciados
+
+    cpu = _cpu_during(seconds)
+
+    for s in socks:
+        s.close()
+    loop.call_soon_threadsafe(holder["srv"].close)
+    return cpu
+
+# =======================
+# Latência your_turn -> prompt
+# =======================
+def prompt_latency_polling(samples):
+    """
+    Cliente antigo: a thread principal testa 'my_turn' a cada 0.1 s.
+    """
+    flag = {"turn": False, "t": 0.0}
+    latencies = []
+
+    def main_loop():
+        for _ in range(samples):
+            while not flag["turn"]:
+                time.sleep(POLL_INTERVAL)
+            latencies.append(time.perf_counter() - flag["t"])
+            flag["turn"] = False
+
+    t = threading.Thread(target=main_loop)
+    t.start()
+    for _ in range(samples):
+        time.sleep(0.013)  # Mensagens chegam em instantes sem relação com o sleep
+        flag["t"] = time.perf_counter()
+        flag["turn"] = True
+        while flag["turn"]:
+            time.sleep(0.001)
+    t.join()
+    return latencies
+
+def prompt_latency_event(samples):
+    """
+    Cliente atual: a thread principal dorme em my_turn.wait().
+    """
+    event = threading.Event()
+    sent = {"t": 0.0}
+    done = threading.Event()
+    latencies = []
+
+    def main_loop():
+        for _ in range(samples):
+            event.wait()
+            latencies.append(time.perf_counter() - sent["t"])
+            event.clear()
+            done.set()
+
+    t = threading.Thread(target=main_loop)
+    t.start()
+    for _ in range(samples):
+        time.sleep(0.013)
+        done.clear()
+        sent["t"] = time.perf_counter()
+        event.set()
+        done.wait()
+    t.join()
+    return latencies
+
+def run(players=1000, seconds=5, samples=50):
+    poll_lat = prompt_latency_polling(samples)
+    event_lat = prompt_latency_event(samples)
+    return {
+        "idle_cpu_polling_s": idle_cpu_polling(players, seconds),
+        "idle_cpu_async_s": idle_cpu_async_server(players, seconds),
+        "prompt_latency_polling_ms": statistics.mean(poll_lat) * 1000,
+        "prompt_latency_event_ms": statistics.mean(event_lat) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.players, args.seconds, args.samples)
+    scale = 1000 / args.players / args.seconds * 100
+    print("CPU ociosa por 1.000 jogadores (% de um núcleo):")
+    print(f"  polling (antes)   {r['idle_cpu_polling_s'] * scale:8.2f} %")
+    print(f"  asyncio (depois)  {r['idle_cpu_async_s'] * scale:8.2f} %")
+    print(f"Latência your_turn -> prompt (média de {args.samples}):")
+    print(f"  polling (antes)   {r['prompt_latency_polling_ms']:8.2f} ms")
+    print(f"  Event (depois)    {r['prompt_latency_event_ms']:8.3f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark do matchmaking contínuo (lobby.py), num relógio virtual:
+chegadas em ritmo constante com ratings aleatórios, distribuição do tempo
+até a mesa, e operações de fila por segundo com dezenas de milhares de
+jogadores esperando.
+
+Uso:
+    python benchmarks/bench_matchmaking.py [--rate 200] [--seconds 120] [--queued 50000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lobby import Matchmaker
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+def simulate(rate, seconds, table_size, max_wait, bucket_width, sweep_interval=0.25, seed=1):
+    """
+    Chegadas de Poisson com 'rate' jogadores/s durante 'seconds' segundos
+    virtuais. Retorna os tempos de espera e os tamanhos das mesas formadas.
+    """
+    rng = random.Random(seed)
+    now = [0.0]
+    waits, sizes = [], []
+
+    def on_match(players, queued_at):
+        sizes.append(len(players))
+        waits.extend(now[0] - t for t in queued_at)
+
+    mm = Matchmaker(on_match, table_size, 2, max_wait, bucket_width, clock=lambda: now[0])
+    next_sweep = sweep_interval
+    i = 0
+    while now[0] < seconds:
+        now[0] += rng.expovariate(rate)
+        while next_sweep <= now[0]:
+            mm.sweep(next_sweep)
+            next_sweep += sweep_interval
+        mm.enqueue(i, rng.gauss(1500, 300))
+        i += 1
+    waits.sort()
+    return waits, sizes, mm.waiting
+
+def pairing_ops(queued, table_size, bucket_width, seed=2):
+    """
+    Com 'queued' jogadores na fila (sem mesas cheias), mede enqueue/remove por segundo.
+    """
+    rng = random.Random(seed)
+    matched = [0]
+    mm = Matchmaker(lambda players, q: matched.__setitem__(0, matched[0] + 1),
+                    table_size, 2, 1e9, bucket_width, clock=lambda: 0.0)
+    # Enche a fila sem formar mesas: cada jogador num balde de rating próprio
+    width = bucket_width or 1
+    for i in range(queued):
+        mm.enqueue(("fila", i), i * width * table_size)
+    ops = 50_000
+    players = [("novo", i) for i in range(ops)]
+    ratings = [rng.randint(0, queued * width * table_size) for _ in range(ops)]
+    t0 = time.perf_counter()
+    for p, r in zip(players, ratings):
+        mm.enqueue(p, r)
+    for p in players:
+        mm.remove(p)
+    elapsed = time.perf_counter() - t0
+    return 2 * ops / elapsed
+
+def run(rate=200, seconds=120, queued=50_000, table_size=4, max_wait=10.0, bucket_width=100):
+    waits, sizes, left = simulate(rate, seconds, table_size, max_wait, bucket_width)
+    full = sum(1 for s in sizes if s == table_size)
+    return {
+        "players_seated": len(waits),
+        "tables": len(sizes),
+        "full_tables_pct": 100 * full / len(sizes) if sizes else 0.0,
+        "still_waiting": left,
+        "wait_s": {
+            "p50": percentile(waits, 50),
+            "p95": percentile(waits, 95),
+            "p99": percentile(waits, 99),
+            "max": waits[-1] if waits else 0.0,
+        },
+        "queue_ops_per_s": pairing_ops(queued, table_size, bucket_width),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200, help="chegadas por segundo")
+    parser.add_argument("--seconds", type=float, default=120, help="segundos virtuais simulados")
+    parser.add_argument("--queued", type=int, default=50_000, help="jogadores na fila para o teste de operações")
+    parser.add_argument("--table-size", type=int, default=4)
+    parser.add_argument("--max-wait", type=float, default=10.0)
+    parser.add_argument("--bucket", type=int, default=100, help="largura do balde de rating")
+    args = parser.parse_args()
+
+    r = run(args.rate, args.seconds, args.queued, args.table_size, args.max_wait, args.bucket)
+    w = r["wait_s"]
+    print(f"{args.rate:g} chegadas/s por {args.seconds:g} s, mesas de {args.table_size}, balde {args.bucket}")
+    print(f"  sentados {r['players_seated']:,} em {r['tables']:,} mesas ({r['full_tables_pct']:.1f}% cheias), "
+          f"{r['still_waiting']} na fila no fim")
+    print(f"  espera até a mesa: p50 {w['p50']:.2f} s  p95 {w['p95']:.2f} s  p99 {w['p99']:.2f} s  máx {w['max']:.2f} s")
+    print(f"  {args.queued:,} na fila: {r['queue_ops_per_s']:,.0f} enqueue/remove por segundo")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Custo das métricas: CPU do servidor por aposta sem métricas, com métricas
+(--metrics-port) e com métricas + profiler por amostragem (--profile-hz),
+sob a mesma carga do loadgen. O alvo é ficar abaixo de alguns por cento.
+
+A CPU vem do rusage do processo do servidor (os.wait4), então o gerador de
+carga rodando na mesma máquina não entra na conta. Os modos se alternam
+em cada repetição e vale a menor medida de cada um.
+
+Uso:
+    python benchmarks/bench_metrics.py [--bots 100] [--duration 5] [--repeats 2]
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_scaling import free_port, wait_listening
+from metrics import Registry
+
+MODES = {
+    "off": [],
+    "metrics": ["--metrics-port", "{metrics}"],
+    "metrics+profiler": ["--metrics-port", "{metrics}", "--profile-hz", "100"],
+}
+
+def measure(mode, bots, duration):
+    """
+    Um servidor + uma rodada do loadgen. Retorna (CPU s por aposta, apostas, amostra do /metrics).
+    """
+    port, metrics_port = free_port(), free_port()
+    extra = [a.format(metrics=metrics_port) for a in MODES[mode]]
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--port", str(port), "--pacing", "0",
+         "--quiet", "--log-file", os.devnull, *extra],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_listening(port)
+        out = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "loadgen.py"), "--port", str(port),
+             "--bots", str(bots), "--duration", str(duration), "--seed", "1", "--json"],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        report = json.loads(out)
+        scrape = ""
+        if extra:
+            with urllib.request.urlopen(f"http://127.0.0.1:{metrics_port}/metrics", timeout=5) as r:
+                scrape = r.read().decode("utf-8")
+    finally:
+        # SIGINT: sai sem drenar (os bots já foram embora)
+        proc.send_signal(signal.SIGINT)
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = 0
+    cpu = usage.ru_utime + usage.ru_stime
+    return cpu / max(1, report["bids"]), report["bids"], scrape
+
+def micro(n=200_000):
+    """
+    ns por inc() e por observe() (com o filho do rótulo já resolvido).
+    """
+    r = Registry()
+    counter = r.counter("c_total", "c", ["type"]).labels("bid")
+    histogram = r.histogram("h_seconds", "h", ["type"]).labels("bid")
+    start = time.perf_counter()
+    for _ in range(n):
+        counter.inc()
+    inc_ns = (time.perf_counter() - start) / n * 1e9
+    start = time.perf_counter()
+    for i in range(n):
+        histogram.observe(i * 1e-8)
+    observe_ns = (time.perf_counter() - start) / n * 1e9
+    return {"inc_ns": inc_ns, "observe_ns": observe_ns}
+
+def run(bots=100, duration=5.0, repeats=2):
+    best = {}
+    bids = {}
+    scrape_lines = 0
+    for _ in range(repeats):
+        for mode in MODES:
+            cpu_per_bid, n, scrape = measure(mode, bots, duration)
+            if mode not in best or cpu_per_bid < best[mode]:
+                best[mode] = cpu_per_bid
+            bids[mode] = n
+            scrape_lines = max(scrape_lines, len(scrape.splitlines()))
+    base = best["off"]
+    return {
+        "modes": [{"mode": m, "cpu_us_per_bid": best[m] * 1e6, "bids": bids[m],
+                   "overhead": best[m] / base - 1} for m in MODES],
+        "scrape_lines": scrape_lines,
+        **micro(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+
+    r = run(args.bots, args.duration, args.repeats)
+    print(f"{args.bots} bots, {args.duration:g} s x {args.repeats} por modo (menor medida)")
+    for m in r["modes"]:
+        print(f"  {m['mode']:<17} {m['cpu_us_per_bid']:7.1f} µs de CPU por aposta  "
+              f"{m['overhead']:+6.1%}  ({m['bids']} apostas)")
+    print(f"inc(): {r['inc_ns']:.0f} ns   observe(): {r['observe_ns']:.0f} ns   "
+          f"/metrics: {r['scrape_lines']} linhas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark do oráculo de probabilidades (odds.py): consultas por segundo
+com as caudas memoizadas x recalcular a binomial a cada chamada, e apostas
+avaliadas por segundo na API em lote.
+
+Uso:
+    python benchmarks/bench_odds.py [--unknown 25] [--number 20000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from math import comb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import odds
+
+def naive_probability(hand, unknown_dice, quantity, face, wild_ones=True):
+    """
+    Mesma conta sem tabelas: soma a binomial inteira a cada consulta.
+    """
+    have = sum(1 for d in hand if d == face or (wild_ones and face != 1 and d == 1))
+    need = quantity - have
+    if need <= 0:
+        return 1.0
+    p = odds.face_probability(face, wild_ones)
+    return sum(comb(unknown_dice, k) * p ** k * (1 - p) ** (unknown_dice - k)
+               for k in range(need, unknown_dice + 1))
+
+def run(unknown=25, number=20000):
+    rng = random.Random(1)
+    hand = [rng.randint(1, 6) for _ in range(5)]
+    queries = [(rng.randint(1, unknown + 5), rng.randint(1, 6)) for _ in range(256)]
+    odds.tail_table(unknown, odds.P_WILD)  # aquece o cache, como num servidor rodando
+
+    def loop(fn):
+        it = iter(queries * (number // len(queries) + 1))
+        return lambda: fn(hand, unknown, *next(it))
+
+    naive = timeit.timeit(loop(naive_probability), number=number)
+    memo = timeit.timeit(loop(odds.bid_probability), number=number)
+    batch_n = max(1, number // 100)
+    batch = timeit.timeit(lambda: odds.bid_probabilities(hand, unknown), number=batch_n)
+    bids_per_call = (len(hand) + unknown + 1) * 6
+    return {
+        "naive_calls_per_s": number / naive,
+        "memo_calls_per_s": number / memo,
+        "batch_tables_per_s": batch_n / batch,
+        "batch_bids_per_s": batch_n * bids_per_call / batch,
+        "numpy": odds.np is not None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--unknown", type=int, default=25)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    r = run(args.unknown, args.number)
+    print(f"{args.unknown} dados desconhecidos (NumPy: {'sim' if r['numpy'] else 'não'})")
+    print(f"  binomial por chamada   {r['naive_calls_per_s']:>12,.0f} consultas/s")
+    print(f"  caudas memoizadas      {r['memo_calls_per_s']:>12,.0f} consultas/s")
+    print(f"  lote (tabela inteira)  {r['batch_tables_per_s']:>12,.0f} tabelas/s = {r['batch_bids_per_s']:,.0f} apostas/s")
+
+if __name__ == "__main__":
+    main()
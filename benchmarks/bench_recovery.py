@@ -0,0 +1,154 @@
+"""
+Recuperação após reinício: quanto custa gravar o snapshot de N mesas e
+quanto tempo o servidor leva para voltar com elas (ler snapshot + WAL e
+remontar as mesas do server.py), por 10 mil mesas.
+
+Cada mesa é uma partida no meio do jogo (algumas rodadas já jogadas com o
+engine.GameState). Depois do snapshot, o WAL recebe 'wal_rounds' rodadas
+inteiras de cada mesa (sorteio, apostas, 'duvido') -- o pior caso é o WAL de
+um intervalo inteiro entre snapshots.
+
+Uso:
+    python benchmarks/bench_recovery.py [--tables 10000] [--players 2 6] [--wal-rounds 1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import secrets
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from engine import GameState
+from logger import WARNING
+from recovery import StateStore, SavedTable, SAVED_BETWEEN, SAVED_BIDDING
+
+def play_round(store, saved, rng):
+    """
+    Uma rodada inteira da mesa, registrada no WAL como o servidor registraria.
+    """
+    game = saved.game
+    if game.winner() is not None:
+        return
+    hands = game.roll(rng)
+    store.roll(saved.id, game.turn, hands)
+    while True:
+        q, f = game.last_bid
+        if q and q > game.total_dice() / 3:
+            store.challenge(saved.id)
+            game.resolve_challenge()
+            saved.phase = SAVED_BETWEEN
+            return
+        face = rng.randint(2, 6)
+        store.bid(saved.id, q + 1, face)
+        game.apply_bid(q + 1, face)
+
+def make_tables(count, players, rng):
+    tables = []
+    for table_id in range(1, count + 1):
+        game = GameState(players)
+        for _ in range(rng.randint(0, 2 * players)):
+            if game.winner() is not None:
+                break
+            game.roll(rng)
+            game.apply_bid(1, rng.randint(2, 6))
+            game.resolve_challenge()
+        game.roll(rng)
+        tables.append(SavedTable(table_id, [f"Pirata{i}" for i in range(players)],
+                                 [secrets.token_hex(8) for _ in range(players)], game, SAVED_BIDDING))
+    return tables
+
+def fingerprint(saved):
+    if saved is None:
+        return None
+    g = saved.game
+    return g.dice_counts, g.hands, g.turn, g.last_bid, g.last_bidder, saved.phase, saved.tokens
+
+async def rebuild(saved_tables):
+    """
+    O que GameServer._recover faz com cada mesa recuperada.
+    """
+    tables = {}
+    for saved in saved_tables.values():
+        table = server.Table.restore(saved, saved.id)
+        table.resume()
+        tables[table.id] = table
+    for table in tables.values():
+        # Desarma a próxima rodada antes de sair do loop
+        if table._timer is not None:
+            table._timer.cancel()
+    return len(tables)
+
+def measure(count, players, wal_rounds, seed):
+    rng = random.Random(seed)
+    directory = tempfile.mkdtemp(prefix="bench_recovery-")
+    try:
+        tables = make_tables(count, players, rng)
+        store = StateStore(directory)
+        store.recover()
+
+        start = time.perf_counter()
+        generation, data = store.rotate(tables)
+        encode_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store.write_snapshot(generation, data)
+        write_s = time.perf_counter() - start
+
+        for _ in range(wal_rounds):
+            for saved in tables:
+                play_round(store, saved, rng)
+        store.flush()
+        wal_bytes = store.wal_bytes
+        store.close()
+
+        start = time.perf_counter()
+        recovered, records = StateStore(directory).recover()
+        load_s = time.perf_counter() - start
+        mismatches = sum(fingerprint(recovered.get(t.id)) != fingerprint(t) for t in tables)
+
+        start = time.perf_counter()
+        asyncio.run(rebuild(recovered))
+        rebuild_s = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    per_10k = 10_000 / count * 1000
+    return {
+        "tables": count, "players": players, "wal_rounds": wal_rounds,
+        "snapshot_bytes": len(data), "wal_bytes": wal_bytes, "wal_records": records,
+        "snapshot_encode_ms_per_10k": encode_s * per_10k,
+        "snapshot_write_ms_per_10k": write_s * per_10k,
+        "load_ms_per_10k": load_s * per_10k,
+        "rebuild_ms_per_10k": rebuild_s * per_10k,
+        "recovery_ms_per_10k": (load_s + rebuild_s) * per_10k,
+        "mismatches": mismatches,
+    }
+
+def run(tables=10_000, players=(2, 6), wal_rounds=1, seed=1):
+    server.logger.level = WARNING  # Os RESTORED de cada mesa não interessam aqui
+    return [measure(tables, n, wal_rounds, seed) for n in players]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tables", type=int, default=10_000)
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 6])
+    parser.add_argument("--wal-rounds", type=int, default=1,
+                        help="rodadas de cada mesa no WAL depois do snapshot")
+    args = parser.parse_args()
+
+    print(f"{args.tables} mesas, {args.wal_rounds} rodada(s) por mesa no WAL; tempos em ms por 10 mil mesas")
+    print(f"{'jogadores':>9} {'snapshot':>10} {'WAL':>10} {'codifica':>9} {'grava':>7} "
+          f"{'lê':>7} {'remonta':>8} {'volta':>7}")
+    for r in run(args.tables, args.players, args.wal_rounds):
+        print(f"{r['players']:>9} {r['snapshot_bytes'] / 1024:>8.0f}KB {r['wal_bytes'] / 1024:>8.0f}KB "
+              f"{r['snapshot_encode_ms_per_10k']:>9.0f} {r['snapshot_write_ms_per_10k']:>7.0f} "
+              f"{r['load_ms_per_10k']:>7.0f} {r['rebuild_ms_per_10k']:>8.0f} {r['recovery_ms_per_10k']:>7.0f}"
+              + (f"  DIVERGÊNCIAS: {r['mismatches']}" if r["mismatches"] else ""))
+
+if __name__ == "__main__":
+    main()
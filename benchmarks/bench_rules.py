@@ -0,0 +1,72 @@
+"""
+Micro-benchmark das regras: ns por chamada da contagem de dados
+(server.count_matches_in_hand numa mão e GameState.count na mesa inteira)
+e da validação de apostas (GameState.check_bid válida e em cada um dos
+três motivos de recusa, check_challenge), em mesas de 2 a 100 jogadores.
+
+Cada medida é o melhor de --repeat rodadas de --number chamadas.
+
+Uso:
+    python benchmarks/bench_rules.py [--players 2 6 100] [--number 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import DiceStream, GameState
+from server import count_matches_in_hand
+
+def best_ns(func, number, repeat):
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e9
+
+def run(players=(2, 6, 100), number=200_000, repeat=3, seed=1):
+    """
+    Retorna [{"players", "dice", "<medida>_ns", ...}] por tamanho de mesa.
+    """
+    results = []
+    for n in players:
+        game = GameState(n)
+        game.roll(DiceStream(seed))
+        total = game.total_dice()
+        hand = game.hands[0]
+        face = random.Random(seed).randint(2, 6)
+        game.apply_bid(total // 3, face)
+        q, f = game.last_bid
+        results.append({
+            "players": n, "dice": total,
+            "count_hand_ns": best_ns(lambda: count_matches_in_hand(face, hand), number, repeat),
+            "count_table_ns": best_ns(lambda: game.count(face), number, repeat),
+            "bid_valid_ns": best_ns(lambda: game.check_bid(q + 1, f), number, repeat),
+            "bid_bad_face_ns": best_ns(lambda: game.check_bid(q + 1, 7), number, repeat),
+            "bid_too_many_ns": best_ns(lambda: game.check_bid(total + 1, f), number, repeat),
+            "bid_not_higher_ns": best_ns(lambda: game.check_bid(q, f), number, repeat),
+            "challenge_ns": best_ns(game.check_challenge, number, repeat),
+        })
+    return results
+
+COLUMNS = (
+    ("count_hand_ns", "mão"), ("count_table_ns", "mesa"), ("bid_valid_ns", "válida"),
+    ("bid_bad_face_ns", "face"), ("bid_too_many_ns", "excesso"), ("bid_not_higher_ns", "menor"),
+    ("challenge_ns", "duvido"),
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 6, 100])
+    parser.add_argument("--number", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"ns por chamada (melhor de {args.repeat} x {args.number}); contagem: mão = "
+          f"count_matches_in_hand, mesa = GameState.count; aposta: válida e recusada por face, "
+          f"excesso de dados ou por não aumentar")
+    print(f"{'jogadores':>9} {'dados':>6} " + " ".join(f"{title:>8}" for _, title in COLUMNS))
+    for r in run(args.players, args.number, args.repeat):
+        print(f"{r['players']:>9} {r['dice']:>6} " + " ".join(f"{r[key]:>8.0f}" for key, _ in COLUMNS))
+
+if __name__ == "__main__":
+    main()
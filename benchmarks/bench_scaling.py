@@ -0,0 +1,93 @@
+"""
+Escalonamento multiprocesso: sobe supervisor.py com 1, 2, 4... processos na
+mesma porta (SO_REUSEPORT), mede partidas/s com o loadgen e compara com um
+processo só. Numa máquina Linux com N núcleos livres o ganho deve ficar
+perto de N (o gerador de carga também usa núcleos: ver --loadgen-procs).
+
+Uso:
+    python benchmarks/bench_scaling.py [--workers 1 2 4] [--bots 400] [--duration 10]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_listening(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"servidor não abriu a porta {port}")
+
+def measure(workers, bots, duration, loadgen_procs, players):
+    """
+    Um ponto da curva: supervisor com 'workers' processos + loadgen. Retorna o relatório do loadgen.
+    """
+    port = free_port()
+    sup = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "supervisor.py"), "--workers", str(workers), "--",
+         "--pacing", "0", "--quiet", "--port", str(port), "--players", str(players)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_listening(port)
+        time.sleep(0.5)  # Espera os outros processos entrarem na porta
+        out = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "loadgen.py"), "--port", str(port),
+             "--bots", str(bots), "--duration", str(duration), "--procs", str(loadgen_procs),
+             "--seed", "1", "--json"],
+            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        return json.loads(out)
+    finally:
+        sup.send_signal(signal.SIGINT)
+        try:
+            sup.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            sup.kill()
+
+def run(workers=(1, 2, 4), bots=400, duration=10.0, loadgen_procs=None, players=2):
+    results = {}
+    for n in workers:
+        procs = loadgen_procs or max(1, min(n, (os.cpu_count() or 1) // 2))
+        results[n] = measure(n, bots, duration, procs, players)
+    base = results[workers[0]]["games_per_s"] or 1.0
+    return {
+        "cpus": os.cpu_count(),
+        "points": [{"workers": n, "games_per_s": r["games_per_s"],
+                    "speedup": r["games_per_s"] / base,
+                    "bid_p99_ms": r["bid_latency_ms"]["p99"], "errors": r["errors"]}
+                   for n, r in results.items()],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--bots", type=int, default=400)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--loadgen-procs", type=int, default=None,
+                        help="processos do gerador (padrão: min(workers, núcleos/2))")
+    parser.add_argument("--players", type=int, default=2, help="jogadores por mesa")
+    args = parser.parse_args()
+
+    r = run(args.workers, args.bots, args.duration, args.loadgen_procs, args.players)
+    print(f"{r['cpus']} núcleos, {args.bots} bots, {args.duration:g} s por ponto")
+    for p in r["points"]:
+        print(f"  {p['workers']:>2} processo(s): {p['games_per_s']:8.1f} partidas/s  "
+              f"x{p['speedup']:.2f}  p99 bid {p['bid_p99_ms']:.1f} ms  erros {p['errors'] or 'nenhum'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Bytes por turno: 'game_update' completo x 'state_snapshot' + 'state_delta'
+versionados, em JSON e no binário, para mesas de 6 e 50 jogadores.
+
+Joga partidas com o núcleo do jogo (engine.GameState) e, a cada anúncio de
+turno, monta o mesmo estado que o servidor monta em Table.prompt_turn.
+
+Uso:
+    python benchmarks/bench_state.py [--players 6 50] [--games 3]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import GameState
+from protocol import encode_message, diff_state, CODEC_JSON, CODEC_BINARY
+
+def turn_states(num_players, rng):
+    """
+    Gera o estado público de cada anúncio de turno de uma partida inteira.
+    """
+    names = [f"Pirata{i}" for i in range(num_players)]
+    game = GameState(num_players)
+    while game.winner() is None:
+        game.roll(rng)
+        while True:
+            q, f = game.last_bid
+            yield {
+                "players": [{"name": n, "dice_count": c} for n, c in zip(names, game.dice_counts)],
+                "last_bid": {"quantity": q, "face": f},
+                "current_turn": names[game.turn],
+            }
+            # Aumenta pelo mínimo até passar de ~1/3 dos dados na mesa, aí duvida
+            if q and q > game.total_dice() / 3:
+                game.resolve_challenge()
+                break
+            game.apply_bid(q + 1, rng.randint(2, 6))
+
+def run(players=(6, 50), games=3, seed=1):
+    rng = random.Random(seed)
+    results = []
+    for n in players:
+        full = {CODEC_JSON: 0, CODEC_BINARY: 0}
+        delta = {CODEC_JSON: 0, CODEC_BINARY: 0}
+        turns = 0
+        for _ in range(games):
+            previous = None
+            for seq, state in enumerate(turn_states(n, rng), 1):
+                changes = diff_state(previous, state) if previous is not None else None
+                for codec in full:
+                    full[codec] += len(encode_message(
+                        "game_update", {"state": state, "message": f"Vez de {state['current_turn']}"}, codec))
+                    if changes is None:
+                        delta[codec] += len(encode_message("state_snapshot", {"seq": seq, "state": state}, codec))
+                    else:
+                        delta[codec] += len(encode_message("state_delta", {"seq": seq, **changes}, codec))
+                previous = state
+                turns += 1
+        for codec in full:
+            results.append({
+                "players": n, "codec": codec, "turns": turns,
+                "full_bytes_per_turn": full[codec] / turns,
+                "delta_bytes_per_turn": delta[codec] / turns,
+                "reduction": 1 - delta[codec] / full[codec],
+            })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[6, 50])
+    parser.add_argument("--games", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'jogadores':>9} {'codec':>6} {'completo':>10} {'delta':>8} {'redução':>8}   (bytes por turno, por destinatário)")
+    for r in run(args.players, args.games):
+        print(f"{r['players']:>9} {r['codec']:>6} {r['full_bytes_per_turn']:>10.1f} "
+              f"{r['delta_bytes_per_turn']:>8.1f} {r['reduction']:>8.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Placar persistente (stats.py): custo de record_game() para o servidor,
+partidas gravadas por segundo com lotes x uma transação por partida, e
+latência das consultas (placar e posição de um jogador) com o banco cheio.
+
+As partidas são de --table jogadores sorteados entre --pool nomes, com
+dados perdidos e blefes aleatórios. A vazão conta do primeiro
+record_game() até o close() devolver (tudo gravado). Depois das partidas
+gravadas pelo StatsStore, --fill partidas sintéticas entram direto no
+banco (um único INSERT em massa) para as consultas rodarem com milhões de
+partidas e jogadores.
+
+Uso:
+    python benchmarks/bench_stats.py [--games 100000] [--pool 100000] [--fill 2000000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stats import StatsStore
+
+def make_games(games, pool, table, seed=1):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(games):
+        names = [f"p{i}" for i in rng.sample(range(pool), table)]
+        players = [(name, rng.randint(0, 5), rng.randint(0, 3), rng.randint(0, 3)) for name in names]
+        out.append((names[rng.randrange(table)], players, rng.randint(5, 25)))
+    return out
+
+def write(path, games, batch_max):
+    """
+    Grava 'games' por um StatsStore. Retorna (ns por record_game, partidas/s até gravar tudo).
+    """
+    store = StatsStore(path, batch_max=batch_max)
+    start = time.perf_counter()
+    for table_id, (winner, players, rounds) in enumerate(games):
+        store.record_game(table_id, rounds, winner, players)
+    enqueued = time.perf_counter()
+    store.close()
+    done = time.perf_counter()
+    return (enqueued - start) / len(games) * 1e9, len(games) / (done - start)
+
+def fill(path, games, players, seed=2):
+    """
+    Acrescenta 'games' partidas e 'players' jogadores sintéticos direto no banco.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.executemany("INSERT INTO games (finished, table_id, players, rounds, winner) VALUES (?, 0, 6, ?, ?)",
+                         ((time.time(), rng.randint(5, 25), f"f{rng.randrange(players)}") for _ in range(games)))
+        per_player = max(1, games * 6 // max(1, players))
+        conn.executemany("INSERT OR IGNORE INTO players VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         ((f"f{i}", per_player, rng.randint(0, per_player), rng.randint(0, 5 * per_player),
+                           rng.randint(0, per_player), rng.randint(0, per_player), time.time())
+                          for i in range(players)))
+    conn.close()
+
+def best_us(func, number=200, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e6
+
+def run(games=100_000, pool=100_000, table=6, unbatched=2000, fill_games=2_000_000, fill_players=1_000_000):
+    """
+    Retorna {"enqueue_ns", "games_per_s", "unbatched_games_per_s", "games_total",
+    "players_total", "leaderboard_us", "leaderboard_cached_us", "player_us"}.
+    """
+    sample = make_games(games, pool, table)
+    with tempfile.TemporaryDirectory() as workdir:
+        # Sem lotes: uma transação (e um fsync do WAL a cada checkpoint) por partida
+        unbatched_rate = write(os.path.join(workdir, "single.db"), sample[:unbatched], batch_max=1)[1]
+        path = os.path.join(workdir, "stats.db")
+        enqueue_ns, rate = write(path, sample, batch_max=500)
+        fill(path, fill_games, fill_players)
+
+        store = StatsStore(path)
+        conn = sqlite3.connect(path)
+        games_total = conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+        players_total = conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+        conn.close()
+        names = [f"f{i}" for i in random.Random(3).sample(range(fill_players), 200)] if fill_players else ["p0"]
+
+        def uncached():
+            store._top = (-1, [])
+            store.leaderboard(10)
+
+        i = iter(range(10 ** 9))
+        leaderboard_us = best_us(uncached)
+        cached_us = best_us(lambda: store.leaderboard(10))
+        player_us = best_us(lambda: store.player(names[next(i) % len(names)]))
+        store.close()
+    return {
+        "enqueue_ns": enqueue_ns, "games_per_s": rate, "unbatched_games_per_s": unbatched_rate,
+        "games_total": games_total, "players_total": players_total,
+        "leaderboard_us": leaderboard_us, "leaderboard_cached_us": cached_us, "player_us": player_us,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=100_000, help="partidas gravadas pelo StatsStore")
+    parser.add_argument("--pool", type=int, default=100_000, help="nomes sorteados para essas partidas")
+    parser.add_argument("--table", type=int, default=6, help="jogadores por partida")
+    parser.add_argument("--unbatched", type=int, default=2000, help="partidas gravadas uma por transação")
+    parser.add_argument("--fill", type=int, default=2_000_000, help="partidas sintéticas para as consultas")
+    parser.add_argument("--fill-players", type=int, default=1_000_000, help="jogadores sintéticos")
+    args = parser.parse_args()
+
+    r = run(args.games, args.pool, args.table, args.unbatched, args.fill, args.fill_players)
+    print(f"record_game (fila): {r['enqueue_ns']:,.0f} ns por partida")
+    print(f"gravação: {r['games_per_s']:,.0f} partidas/s em lotes x "
+          f"{r['unbatched_games_per_s']:,.0f} partidas/s uma por transação")
+    print(f"consultas com {r['games_total']:,} partidas e {r['players_total']:,} jogadores:")
+    print(f"  placar (top 10): {r['leaderboard_us']:,.1f} µs lendo o banco, "
+          f"{r['leaderboard_cached_us']:,.2f} µs em memória")
+    print(f"  jogador (totais + posição): {r['player_us']:,.1f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Custo de uma aposta no servidor em função do tamanho da mesa (2 a 500
+jogadores): Table.handle_action do server.py de verdade, da validação ao
+estado enfileirado para todos os jogadores, e só o núcleo do jogo
+(check_bid + apply_bid) numa mesa com metade dos assentos já eliminada.
+Também o 'duvido' inteiro (contagem, revelação e resultado), em tempo e em
+quadros enfileirados.
+
+O envio pelos sockets fica de fora: cada jogador tem uma fila que só conta
+o que recebe. O que sobra de O(n) por aposta é o próprio fan-out (um push
+por jogador); o resto não depende do tamanho da mesa.
+
+Uso:
+    python benchmarks/bench_table.py [--players 2 6 50 100 500] [--bids 20000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+from engine import GameState
+from logger import WARNING
+from protocol import CODEC_BINARY
+
+class CountingOutbox:
+    """
+    No lugar da server.Outbox: aceita tudo e só conta quadros e bytes.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    def push(self, msg_type, data):
+        self.frames += 1
+        self.bytes += len(data)
+        return True
+
+    def close(self):
+        pass
+
+def next_bid(quantity, face, total):
+    """
+    O menor aumento; volta para 1x1 quando passaria do total da mesa.
+    """
+    if face < 6:
+        return quantity, face + 1
+    if quantity < total:
+        return quantity + 1, 1
+    return None
+
+def make_table(players, delta=True):
+    table = server.Table(1)
+    for i in range(players):
+        table.add_player({
+            "name": f"Pirata{i}", "seat": None, "table": None, "queued_at": 0.0,
+            "outbox": CountingOutbox(), "addr": None, "codec": CODEC_BINARY, "delta": delta,
+            "token": f"{i:016x}", "connected": True, "grace": None})
+    table.start()
+    table._timer.cancel()
+    table.start_new_round()
+    table._timer.cancel()
+    table.prompt_turn()
+    return table
+
+async def table_bids(players, bids, delta):
+    table = make_table(players, delta)
+    game = table.game
+    frames = sum(p["outbox"].frames for p in table.players)
+    msg = {"type": "bid", "payload": {}}
+    start = time.perf_counter()
+    for _ in range(bids):
+        raise_to = next_bid(*game.last_bid, game.total_dice())
+        if raise_to is None:
+            game.last_bid = (0, 0)  # Reinicia a escada de apostas sem sair da rodada
+            raise_to = (1, 1)
+        msg["payload"] = {"quantity": raise_to[0], "face": raise_to[1]}
+        table.handle_action(table.current_player(), msg)
+    elapsed = time.perf_counter() - start
+    frames = sum(p["outbox"].frames for p in table.players) - frames
+    table.close()
+    return elapsed / bids, frames / bids
+
+async def table_challenges(players, rounds):
+    """
+    Rodadas de uma aposta + 'duvido', sem pausas (PACING zerado): as etapas
+    agendadas rodam nas voltas seguintes do loop.
+    Retorna (s por 'duvido', quadros por 'duvido').
+    """
+    pacing = dict(server.PACING)
+    server.PACING.update(dict.fromkeys(pacing, 0))
+    table = make_table(players)
+    elapsed = frames = 0
+    for _ in range(rounds):
+        if table.ended:
+            table = make_table(players)
+        table.handle_action(table.current_player(), {"type": "bid", "payload": {"quantity": 1, "face": 2}})
+        before = sum(p["outbox"].frames for p in table.players)
+        start = time.perf_counter()
+        table.handle_action(table.current_player(), {"type": "challenge"})
+        while table.phase != server.PHASE_RESULT:
+            await asyncio.sleep(0)
+        elapsed += time.perf_counter() - start
+        frames += sum(p["outbox"].frames for p in table.players) - before
+        while table.phase not in (server.PHASE_BIDDING, server.PHASE_OVER):
+            await asyncio.sleep(0)  # Próxima rodada (ou fim da partida)
+    table.close()
+    server.PACING.update(pacing)
+    return elapsed / rounds, frames / rounds
+
+def engine_bids(players, bids, rng):
+    """
+    Só o GameState, com metade dos assentos (aleatórios) já sem dados.
+    """
+    game = GameState(players)
+    for seat in rng.sample(range(players), players // 2):
+        if game.active > 2:
+            game.eliminate(seat)
+    game.roll(rng)
+    start = time.perf_counter()
+    for _ in range(bids):
+        raise_to = next_bid(*game.last_bid, game.total_dice())
+        if raise_to is None:
+            game.last_bid = (0, 0)
+            raise_to = (1, 1)
+        if game.check_bid(*raise_to) is None:
+            game.apply_bid(*raise_to)
+    return (time.perf_counter() - start) / bids
+
+def run(players=(2, 6, 50, 100, 500), bids=20_000, seed=1):
+    server.logger.level = WARNING  # BID/TURN de cada aposta não interessam aqui
+    rng = random.Random(seed)
+    results = []
+    for n in players:
+        per_bid, frames = asyncio.run(table_bids(n, bids, True))
+        legacy, _ = asyncio.run(table_bids(n, max(1, bids // 10), False))
+        challenge, challenge_frames = asyncio.run(table_challenges(n, max(1, bids // 100)))
+        results.append({
+            "players": n, "large": n >= server.LARGE_TABLE,
+            "table_us_per_bid": per_bid * 1e6, "frames_per_bid": frames,
+            "table_ns_per_recipient": per_bid * 1e9 / frames,
+            "legacy_us_per_bid": legacy * 1e6,
+            "challenge_us": challenge * 1e6, "frames_per_challenge": challenge_frames,
+            "engine_ns_per_bid": engine_bids(n, bids, rng) * 1e9,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 6, 50, 100, 500])
+    parser.add_argument("--bids", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{args.bids} apostas por mesa; jogadores com 'state_delta' (binário), legado = 'game_update' completo")
+    print(f"{'jogadores':>9} {'µs/aposta':>10} {'quadros':>8} {'ns/destinatário':>16} "
+          f"{'legado µs':>10} {'núcleo ns':>10} {'duvido µs':>10} {'quadros':>8}")
+    for r in run(args.players, args.bids):
+        print(f"{r['players']:>9} {r['table_us_per_bid']:>10.1f} {r['frames_per_bid']:>8.0f} "
+              f"{r['table_ns_per_recipient']:>16.0f} {r['legacy_us_per_bid']:>10.1f} "
+              f"{r['engine_ns_per_bid']:>10.0f} {r['challenge_us']:>10.1f} "
+              f"{r['frames_per_challenge']:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Custo dos prazos com muitos timers em voo: armar, cancelar e o "rearma"
+de cada jogada (cancela o prazo do turno anterior e arma o do próximo),
+na roda de timers do servidor (timers.TimerWheel) e no loop.call_later do
+asyncio, com 1 mil a 500 mil prazos já armados.
+
+Os prazos são de 1 a 60 s, então nada dispara durante a medida; o disparo
+da roda é medido à parte, avançando os tiques sem esperar o relógio.
+
+Uso:
+    python benchmarks/bench_timers.py [--inflight 1000 100000 500000] [--ops 200000]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timers import TimerWheel
+
+def noop(*args):
+    pass
+
+def schedulers(loop):
+    wheel = TimerWheel(resolution=0.1)
+    return {"roda": (wheel.call_later, wheel), "call_later": (loop.call_later, None)}
+
+def measure(call_later, inflight, ops, rng):
+    """
+    Retorna (ns por arme, ns por cancelamento, ns por rearme) com 'inflight' prazos armados.
+    """
+    delays = [rng.uniform(1, 60) for _ in range(inflight + ops)]
+    live = [call_later(d, noop) for d in delays[:inflight]]
+
+    start = time.perf_counter()
+    armed = [call_later(d, noop) for d in delays[inflight:]]
+    arm = (time.perf_counter() - start) / ops
+    start = time.perf_counter()
+    for timer in armed:
+        timer.cancel()
+    cancel = (time.perf_counter() - start) / ops
+
+    # Jogadas: o prazo do turno anterior cai e o do próximo é armado
+    order = [rng.randrange(inflight) for _ in range(ops)]
+    start = time.perf_counter()
+    for i in order:
+        live[i].cancel()
+        live[i] = call_later(30.0, noop, i)
+    rearm = (time.perf_counter() - start) / ops
+
+    for timer in live:
+        timer.cancel()
+    return arm * 1e9, cancel * 1e9, rearm * 1e9
+
+def fire(inflight, rng):
+    """
+    ns por timer disparado na roda: arma 'inflight' prazos de até 60 s e
+    avança os tiques todos de uma vez (inclui as descidas entre níveis).
+    """
+    wheel = TimerWheel(resolution=0.1)
+    for _ in range(inflight):
+        wheel.call_later(rng.uniform(1, 60), noop)
+    start = time.perf_counter()
+    while len(wheel):
+        wheel._advance()
+    return (time.perf_counter() - start) / inflight * 1e9
+
+async def measure_all(inflight, ops, seed):
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    results = []
+    for n in inflight:
+        row = {"inflight": n}
+        for name, (call_later, wheel) in schedulers(loop).items():
+            gc.collect()
+            row[name] = dict(zip(("arm_ns", "cancel_ns", "rearm_ns"), measure(call_later, n, ops, rng)))
+            if wheel is not None:
+                wheel.close()
+        row["roda"]["fire_ns"] = fire(n, rng)
+        results.append(row)
+    return results
+
+def run(inflight=(1000, 100_000, 500_000), ops=200_000, seed=1):
+    return asyncio.run(measure_all(inflight, ops, seed))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inflight", type=int, nargs="+", default=[1000, 100_000, 500_000])
+    parser.add_argument("--ops", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{args.ops} operações por medida; ns por operação")
+    print(f"{'em voo':>8} {'':<11} {'arma':>6} {'cancela':>8} {'rearma':>7} {'dispara':>8} {'armas/s':>10}")
+    for r in run(args.inflight, args.ops):
+        for name in ("roda", "call_later"):
+            m = r[name]
+            fire_ns = f"{m['fire_ns']:>8.0f}" if "fire_ns" in m else f"{'-':>8}"
+            print(f"{r['inflight']:>8} {name:<11} {m['arm_ns']:>6.0f} {m['cancel_ns']:>8.0f} "
+                  f"{m['rearm_ns']:>7.0f} {fire_ns} {1e9 / m['rearm_ns']:>10,.0f}")
+
+if __name__ == "__main__":
+    main()
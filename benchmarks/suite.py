@@ -0,0 +1,204 @@
+"""
+Bateria de benchmarks com resultado em JSON e comparação com uma linha de
+base: codecs por tipo de mensagem (bench_codec), regras (bench_rules),
+custo de uma aposta e de um 'duvido' na mesa (bench_table) e partidas de
+ponta a ponta no loopback (bench_e2e), em tamanhos que rodam em segundos.
+
+Cada grupo roda --repeat vezes e cada medida fica com o melhor valor (o
+menor tempo, a maior vazão), o que tira boa parte do ruído da máquina.
+Com --compare, cada medida é comparada com a do arquivo de base e as que
+pioraram mais que --threshold são marcadas como regressão (código de saída 1).
+Numa máquina virtual compartilhada o ruído entre duas execuções do mesmo
+código passa fácil de 10%: compare execuções feitas na mesma máquina, em
+seguida uma da outra, e suba --repeat ou --threshold se preciso.
+
+Uso:
+    python benchmarks/suite.py --out base.json
+    (mudança no servidor)
+    python benchmarks/suite.py --out novo.json --compare base.json [--threshold 0.1]
+    python benchmarks/suite.py --only codec rules
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bench_codec
+import bench_e2e
+import bench_rules
+import bench_table
+
+LOWER, HIGHER = "lower", "higher"   # Qual direção é melhor para a medida
+
+# =======================
+# Grupos
+# =======================
+# Cada grupo devolve {nome: (valor, unidade, direção)}
+
+def group_codec():
+    metrics = {}
+    for r in bench_codec.run(num_players=6, number=5000):
+        prefix = f"codec.{r['type']}.{r['codec']}"
+        metrics[f"{prefix}.encode_ns"] = (r["encode_ns"], "ns", LOWER)
+        metrics[f"{prefix}.decode_ns"] = (r["decode_ns"], "ns", LOWER)
+        metrics[f"{prefix}.bytes"] = (r["bytes"], "B", LOWER)
+    return metrics
+
+def group_rules():
+    metrics = {}
+    for r in bench_rules.run(players=(6, 100), number=50_000, repeat=1):
+        for key, _ in bench_rules.COLUMNS:
+            metrics[f"rules.{r['players']}.{key}"] = (r[key], "ns", LOWER)
+    return metrics
+
+def group_table():
+    metrics = {}
+    for r in bench_table.run(players=(6, 100), bids=5000):
+        prefix = f"table.{r['players']}"
+        metrics[f"{prefix}.bid_us"] = (r["table_us_per_bid"], "µs", LOWER)
+        metrics[f"{prefix}.challenge_us"] = (r["challenge_us"], "µs", LOWER)
+        metrics[f"{prefix}.engine_bid_ns"] = (r["engine_ns_per_bid"], "ns", LOWER)
+    return metrics
+
+def group_e2e():
+    r = bench_e2e.run(players=4, games=20)
+    metrics = {
+        "e2e.round_p50_ms": (r["round_ms"]["p50"], "ms", LOWER),
+        "e2e.round_p95_ms": (r["round_ms"]["p95"], "ms", LOWER),
+        "e2e.bid_p50_ms": (r["bid_latency_ms"]["p50"], "ms", LOWER),
+        "e2e.bid_p95_ms": (r["bid_latency_ms"]["p95"], "ms", LOWER),
+        "e2e.messages_per_s": (r["messages_per_s"], "msg/s", HIGHER),
+        "e2e.errors": (sum(r["errors"].values()), "", LOWER),
+    }
+    if r["server_cpu_ms_per_game"] is not None:
+        metrics["e2e.server_cpu_ms_per_game"] = (r["server_cpu_ms_per_game"], "ms", LOWER)
+    return metrics
+
+GROUPS = {
+    "codec": group_codec,
+    "rules": group_rules,
+    "table": group_table,
+    "e2e": group_e2e,
+}
+
+def best(a, b):
+    """
+    A melhor de duas medidas do mesmo nome (menor tempo / maior vazão).
+    """
+    pick = min if a[2] == LOWER else max
+    return (pick(a[0], b[0]),) + a[1:]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(groups=tuple(GROUPS), repeat=3):
+    """
+    Retorna o documento de resultados: {"meta": {...}, "metrics": {nome: {"value", "unit", "better"}}}.
+    """
+    metrics = {}
+    for name in groups:
+        for _ in range(repeat):
+            for key, m in GROUPS[name]().items():
+                metrics[key] = best(metrics[key], m) if key in metrics else m
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "groups": list(groups),
+            "repeat": repeat,
+        },
+        "metrics": {key: {"value": value, "unit": unit, "better": better}
+                    for key, (value, unit, better) in metrics.items()},
+    }
+
+# =======================
+# Comparação
+# =======================
+def compare(current, baseline, threshold):
+    """
+    Retorna [(nome, base, atual, variação, estado)] para as medidas presentes
+    nos dois; variação > 0 é sempre piora, na direção da medida.
+    """
+    rows = []
+    for key, m in current["metrics"].items():
+        base = baseline["metrics"].get(key)
+        if base is None:
+            continue
+        old, new = base["value"], m["value"]
+        if old == new:
+            change = 0.0
+        elif old == 0:
+            change = float("inf")
+        else:
+            change = (new - old) / abs(old)
+            if m["better"] == HIGHER:
+                change = -change
+        if change > threshold:
+            status = "REGRESSÃO"
+        elif change < -threshold:
+            status = "melhora"
+        else:
+            status = ""
+        rows.append((key, old, new, change, status))
+    return rows
+
+def print_results(doc):
+    print(f"{'medida':<36} {'valor':>12} unidade")
+    for key, m in doc["metrics"].items():
+        print(f"{key:<36} {m['value']:>12,.2f} {m['unit']}")
+
+def print_comparison(rows, baseline, threshold):
+    meta = baseline["meta"]
+    print(f"base: {meta.get('created')} (commit {meta.get('commit') or '?'}); "
+          f"limite: {threshold:.0%} de piora")
+    print(f"{'medida':<36} {'base':>12} {'atual':>12} {'piora':>8}")
+    for key, old, new, change, status in rows:
+        print(f"{key:<36} {old:>12,.2f} {new:>12,.2f} {change:>+8.1%} {status}")
+    regressions = [row[0] for row in rows if row[4] == "REGRESSÃO"]
+    print(f"{len(regressions)} regressões em {len(rows)} medidas" +
+          (f": {', '.join(regressions)}" if regressions else ""))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=list(GROUPS), default=list(GROUPS),
+                        help="grupos a rodar (padrão: todos)")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por grupo; vale a melhor")
+    parser.add_argument("--out", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--compare", metavar="BASE", help="compara com um arquivo gravado por --out")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="piora relativa que conta como regressão (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    doc = run(args.only, args.repeat)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(doc, f, indent=1, ensure_ascii=False)
+            f.write("\n")
+
+    if baseline is None:
+        print_results(doc)
+        return
+    if print_comparison(compare(doc, baseline, args.threshold), baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
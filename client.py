@@ -1,3 +1,4 @@
+import argparse
 import socket # permite criar, conectar, enviar e receber dados em "soquetes"
 import threading # usamos para ouvir o servidor e esperar pelo input do usuário ao mesmo tempo.
 import json
@@ -8,15 +9,25 @@ import os #######
 import sys ######
 import time #####
 #################
-from protocol import encode_message, decode_message
-
-# Imports da biblioteca rich para uma UI avançada
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
-
-# Cria uma instância do console do rich para gerenciar a exibição
-console = Console()
+from protocol import encode_message, apply_delta, FrameDecoder, ProtocolError, CODEC_BINARY, CODEC_JSON
+
+from render import LiveScreen, style, BOLD, DIM, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN
+
+"""
+Cliente do jogo. Por padrão desenha a mesa no terminal (render.py) e lê as
+jogadas do teclado. Para bots, testes e os vários clientes de curta duração
+que sobem em scripts, --plain e --jsonl não criam a tela nem a thread de
+desenho nem o arquivo de log: cada evento vira uma linha no stdout (texto
+simples ou a mensagem do servidor em JSON) e as jogadas ('3 4', 'duvido')
+vêm uma por linha do stdin. 'placar' (na sua vez) ou --leaderboard (só
+consulta, sem entrar numa mesa) mostram o placar do servidor (--stats-db).
+
+Uso:
+    python client.py
+    python client.py --host 127.0.0.1 --name Jack --plain
+    python client.py --host 127.0.0.1 --name Jack --jsonl < jogadas.txt
+    python client.py --host 127.0.0.1 --name Jack --leaderboard 20
+"""
 
 # Dicionário que mapeia o número da face do dado para o ícone.
 DICE_ICONS = {
@@ -25,10 +36,33 @@ DICE_ICONS = {
 }
 
 # Variáveis globais para armazenar estado do cliente
-my_turn = False           # Indica se é a vez do jogador
+my_turn = threading.Event()  # Sinaliza que é a vez do jogador (setado pela thread listen)
 my_dice = []              # Lista de dados do jogador
 game_state = {}           # Estado geral do jogo (todos os jogadores)
-log_file = "partida_log.txt"  # Arquivo onde o histórico será salvo
+log_file = "partida_log.txt"  # Arquivo onde o histórico será salvo (None nos modos --plain / --jsonl)
+output_mode = "tui"       # 'tui' (painel), 'plain' ou 'jsonl' (uma linha por evento no stdout)
+screen = None             # LiveScreen do modo 'tui' (criada em main); None nos outros modos
+send_codec = CODEC_JSON   # Codec das mensagens enviadas; muda para o binário se o servidor aceitar
+state_seq = 0             # Versão de game_state recebida (state_snapshot / state_delta)
+resync_pending = False    # Já pedimos um snapshot depois de perder uma versão
+send_lock = threading.Lock()  # As duas threads enviam (ações / pedido de resync)
+_log = None               # Arquivo de log_file, aberto no primeiro evento
+server_addr = None        # (host, porta)
+server_sock = None        # Conexão atual (trocada por reconnect() se cair)
+session_token = None      # Recebido no 'session': volta à mesa com 'resume' se a conexão cair
+reconnect_grace = 0       # Segundos que o servidor segura o lugar na mesa
+turn_timeout = 0          # Segundos para jogar antes da jogada automática do servidor (0 = sem prazo)
+
+# Oferece o codec binário compacto e o estado em versões (só o que muda a cada turno);
+# se o servidor não conhecer, tudo segue em JSON com 'game_update' completo
+OFFER = {'codecs': [CODEC_BINARY, CODEC_JSON], 'features': ['delta']}
+
+def send(sock, msg_type, payload=None):
+    """
+    Envia uma mensagem inteira ao servidor sem misturar quadros das duas threads.
+    """
+    with send_lock:
+        sock.sendall(encode_message(msg_type, payload, send_codec))
 
 def format_dice(dice_list):
     """
@@ -39,146 +73,378 @@ def format_dice(dice_list):
 
 def log_event(text):
     """
-    Salva um evento no arquivo de log.
+    Salva um evento no arquivo de log (aberto uma vez, com buffer de linha).
     """
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(text + "\n")
+    global _log
+    if log_file is None:
+        return
+    if _log is None:
+        _log = open(log_file, "a", encoding="utf-8", buffering=1)
+    _log.write(text + "\n")
 
-def clear_screen():
+def emit(line):
     """
-    Limpa a tela do terminal.
+    Escreve uma linha no stdout (modos --plain / --jsonl). O flush fica para o
+    fim de cada leitura do socket: um write por lote de mensagens.
     """
-    os.system('cls' if os.name == 'nt' else 'clear')
+    sys.stdout.write(line + "\n")
 
-def print_game_state():
+def notice(text, *codes):
     """
-    Exibe o estado do jogo na tela usando painéis da biblioteca rich.
+    Aviso do próprio cliente (conexão, comando inválido): no painel ou como
+    uma linha do modo texto.
     """
-    clear_screen()
-
-    player_lines = []
-    if game_state.get('players'):
-        block_width = 50  # Largura do bloco de texto para alinhamento
-        for p in game_state['players']:
-            # A parte da esquerda começa apenas com o nome
-            left_part = Text(p['name'])
-            # A parte da direita é sempre a contagem de dados
-            right_part = Text(f"{p['dice_count']} dados")
-
-            # Adiciona o indicador de turno à parte esquerda, se for o caso
-            if p['name'] == game_state.get('current_turn'):
-                left_part.append("  ")  # Adiciona um espaço
-                left_part.append(Text.from_markup("[bold green]<- TURNO ATUAL[/bold green]"))
+    if screen is not None:
+        screen.message(style(text, *codes))
+    else:
+        emit(json.dumps({"type": "client", "payload": {"message": text}}, ensure_ascii=False)
+             if output_mode == "jsonl" else f"client {text}")
+        sys.stdout.flush()
 
-            # Calcula o preenchimento para alinhar nas extremidades
-            padding = " " * (block_width - len(left_part) - len(right_part))
-            line = Text.assemble(left_part, padding, right_part)
-            player_lines.append(line)
+PANEL_WIDTH = 54    # Largura do painel da mesa, com as bordas
 
-    player_text = Text("\n").join(player_lines)
+def _border(left, label, right, label_style):
+    fill = PANEL_WIDTH - 2 - len(label) - 2
+    return (style(left + "─", BLUE) + style(label, *label_style)
+            + style("─" * (fill + 1) + right, BLUE))
 
-    # Cria o conteúdo para a aposta na mesa
-    if game_state.get('last_bid') and game_state['last_bid']['quantity'] > 0:
-        b = game_state['last_bid']
-        face_char = DICE_ICONS.get(b['face'], str(b['face']))
-        bid_text = Text.from_markup(f"Aposta na mesa: [bold yellow]{b['quantity']}x {face_char}[/bold yellow]")
+def table_rows():
+    """
+    Linhas do painel da mesa (jogadores, aposta e seus dados). Chamada pelo
+    renderizador só quando vai desenhar um quadro; ele reescreve apenas as
+    linhas que mudaram.
+    """
+    inner = PANEL_WIDTH - 4
+    side = style("│", BLUE)
+    rows = [_border("╭", " LIAR'S DICE ", "╮", (BOLD, CYAN))]
+    for p in game_state.get('players', ()):
+        name = p['name']
+        right = f"{p['dice_count']} dados"
+        marker = "  <- TURNO ATUAL" if name == game_state.get('current_turn') else ""
+        padding = " " * max(1, inner - len(name) - len(marker) - len(right))
+        rows.append(f"{side} {name}{style(marker, BOLD, GREEN)}{padding}{right} {side}")
+    rows.append(f"{side}{' ' * (PANEL_WIDTH - 2)}{side}")
+    b = game_state.get('last_bid')
+    if b and b['quantity'] > 0:
+        bid = f"{b['quantity']}x {DICE_ICONS.get(b['face'], str(b['face']))}"
+        text = "Aposta na mesa: "
+        rows.append(f"{side} {text}{style(bid, BOLD, YELLOW)}{' ' * (inner - len(text) - len(bid))} {side}")
     else:
-        bid_text = Text("Nenhuma aposta ainda.")
-
-    # Monta o conteúdo principal do painel
-    main_content = Text("\n\n").join([
-        player_text,
-        bid_text
-    ])
-
-    # Cria e exibe o painel principal com título e subtítulo
-    console.print(
-        Panel(
-            main_content,
-            title="[bold cyan]LIAR'S DICE[/bold cyan]",
-            subtitle=Text.from_markup(f"Seus dados: [bold yellow]{format_dice(my_dice)}[/bold yellow]"),
-            border_style="blue"
-        )
-    )
+        text = "Nenhuma aposta ainda."
+        rows.append(f"{side} {text}{' ' * (inner - len(text))} {side}")
+    rows.append(_border("╰", f" Seus dados: {format_dice(my_dice)} ", "╯", (BOLD, YELLOW)))
+    return rows
 
 def listen(sock):
     """
     Thread responsável por ouvir mensagens do servidor e atualizar o estado.
     """
-    global my_turn, my_dice, game_state
+    resumed = False
     while True:
+        decoder = FrameDecoder() # remonta mensagens que o TCP junta ou divide
+        received = 0
         try:
-            raw = sock.recv(4096) # chamada bloqueante -> thread para e aguarda dados do servidor através da conexão sock. Lê até 4096 bytes e continua
-            if not raw:
-                break
-
-            msg = decode_message(raw) # decodifica a mensagem recebida
-            tipo = msg.get('type') # extrai o tipo da mensagem
-            payload = msg.get('payload') # extrai os dados secundários da mensagem
-
-            if tipo == 'round_start':
-                my_dice = payload['dice']
-                log_event(f"Nova rodada - seus dados: {my_dice}")
-
-            elif tipo == 'game_update':
-                game_state = payload['state']
-                print_game_state()
-                console.print(f"[dim]{payload['message']}[/dim]")
-                log_event(f"Atualização: {payload['message']}")
-
-            elif tipo == 'your_turn':
-                my_turn = True # crucial. Desbloqueia a thread principal para a ação do jogador.
-                console.print("\nSua vez! Digite aposta (ex: '3 4') ou 'duvido'")
-                log_event("Sua vez de jogar.")
-
-            elif tipo in ['info', 'error']:
-                message = payload['message']
-                style = ""
-                # Colore mensagens de resultado com base no conteúdo
-                if 'perde 1 dado' in message:
-                    style = "red" if 'VERDADEIRA' in message else "green"
-                elif 'entrou no jogo' in message:
-                    style = "yellow"
-
-                console.print(f"\n[bold {style}][SERVIDOR] {message}[/bold {style}]")
-                log_event(f"[SERVIDOR] {message}")
-
-            elif tipo == 'reveal_all':
-                dados_revelados = payload['dice_data']
-
-                reveal_lines = []
-                for entry in dados_revelados:
-                    formatted_hand = format_dice(entry['dice'])
-                    reveal_lines.append(f"[bold]{entry['player']}:[/bold] {formatted_hand}")
-
-                console.print(Panel("\n".join(reveal_lines), title="[yellow]DADOS REVELADOS[/yellow]", border_style="yellow"))
-                log_event(f"Revelação final: {dados_revelados}")
-
-            elif tipo == 'game_over':
-                print_game_state()
-                console.print(f"\n[bold magenta]!!! {payload['message']} !!![/bold magenta]")
-                log_event(f"FIM: {payload['message']}")
-                sock.close()
-                os._exit(0)
+            while True:
+                raw = sock.recv(4096) # chamada bloqueante -> thread para e aguarda dados do servidor através da conexão sock. Lê até 4096 bytes e continua
+                if not raw:
+                    break
+
+                for msg in decoder.feed(raw): # decodifica todas as mensagens completas recebidas
+                    received += msg.get('type') != 'error'  # 'resume' recusado = só um 'error'
+                    handle_message(sock, msg)
+                if screen is None:
+                    sys.stdout.flush()
 
         # Robustez e detecção de erros
-        except (ConnectionAbortedError, ConnectionResetError, json.JSONDecodeError):
-            console.print("\n[bold red]Conexão com o servidor foi perdida.[/bold red]")
-            sock.close()
-            os._exit(1)
+        except (ConnectionAbortedError, ConnectionResetError, json.JSONDecodeError, ProtocolError):
+            pass
         except Exception as e:
-            console.print(f"\n[bold red]Ocorreu um erro inesperado: {e}[/bold red]")
+            notice(f"Ocorreu um erro inesperado: {e}", BOLD, RED)
             break
 
-def main():
-    global my_turn
+        # Caiu: volta à mesa com o token, a não ser que a própria volta tenha sido recusada
+        sock.close()
+        sock = reconnect() if received or not resumed else None
+        resumed = True
+        if sock is None:
+            notice("Conexão com o servidor foi perdida.", BOLD, RED)
+            if screen is not None:
+                screen.stop()
+            os._exit(1)
 
-    host = input("IP do servidor (padrão: 127.0.0.1): ") or "127.0.0.1"
-    port = 65432
-    nome = input("Seu nome: ")
+def reconnect():
+    """
+    Tenta voltar à mesa ('resume' com o token da sessão) enquanto o servidor
+    segura o lugar. Retorna o socket novo, ou None.
+    """
+    global server_sock, state_seq
+    if session_token is None:
+        return None
+    notice("Conexão perdida. Tentando voltar à mesa...", BOLD, YELLOW)
+    log_event("Conexão perdida; tentando voltar à mesa.")
+    deadline = time.monotonic() + reconnect_grace
+    while time.monotonic() < deadline:
+        try:
+            sock = socket.create_connection(server_addr, timeout=2)
+        except OSError:
+            time.sleep(1)
+            continue
+        sock.settimeout(None)
+        state_seq = 0  # O servidor manda um state_snapshot logo na volta
+        server_sock = sock
+        send(sock, 'resume', {'token': session_token, **OFFER})
+        return sock
+    return None
+
+def show_turn():
+    """
+    Redesenha a mesa depois de uma nova versão do estado.
+    """
+    message = f"Vez de {game_state.get('current_turn')}"
+    screen.invalidate()
+    screen.message(style(message, DIM))
+    log_event(f"Atualização: {message}")
 
-    if os.path.exists(log_file):
-        os.remove(log_file)
+def animate_reveal(payload):
+    """
+    Mostra as mãos reveladas uma por vez, a cada payload['step'] segundos,
+    com os dados que contam para a aposta em destaque e a contagem parcial.
+    """
+    face = payload.get('face')
+    wild = payload.get('wild_ones', True)
+    step = payload.get('step', 0)
+    counted = 0
+    screen.message(style("── DADOS REVELADOS ──", BOLD, YELLOW))
+    for entry in payload['dice_data']:
+        dice = entry['dice']
+        hits = [d == face or (wild and d == 1 and face != 1) for d in dice]
+        counted += sum(hits)
+        formatted_hand = ' '.join(style(DICE_ICONS.get(d, str(d)), BOLD, YELLOW) if hit
+                                  else DICE_ICONS.get(d, str(d)) for d, hit in zip(dice, hits))
+        tally = style(f"({counted})", DIM) if face else ""
+        screen.message(f"{style(entry['player'] + ':', BOLD)} {formatted_hand} {tally}")
+        if step:
+            time.sleep(step)
+
+def handle_message(sock, msg):
+    """
+    Trata uma mensagem do servidor: atualiza o estado local e mostra o evento
+    (no painel ou, nos modos --plain / --jsonl, numa linha do stdout).
+    """
+    global my_dice, game_state, send_codec, state_seq, resync_pending, session_token, reconnect_grace, turn_timeout
+    tipo = msg.get('type') # extrai o tipo da mensagem
+    payload = msg.get('payload') # extrai os dados secundários da mensagem
+
+    if tipo == 'codec':
+        send_codec = payload['codec'] # servidor confirmou o codec negociado no set_name
+
+    elif tipo == 'session':
+        session_token = payload['token']
+        reconnect_grace = payload.get('grace', 0)
+        turn_timeout = payload.get('turn_timeout', 0)
+
+    elif tipo == 'round_start':
+        my_dice = payload['dice']
+
+    elif tipo == 'game_update':
+        game_state = payload['state']
+
+    elif tipo == 'state_snapshot':
+        # Estado inteiro (início da mesa ou resposta ao 'resync')
+        game_state = payload['state']
+        state_seq = payload['seq']
+        resync_pending = False
+
+    elif tipo == 'state_delta':
+        seq = payload['seq']
+        if seq <= state_seq or resync_pending:
+            return  # Versão antiga, ou aguardando o snapshot pedido
+        if seq != state_seq + 1:
+            # Perdemos uma versão: os campos ausentes não são confiáveis
+            resync_pending = True
+            send(sock, 'resync')
+            log_event(f"Versão {state_seq + 1} perdida (recebida {seq}); pedindo resync.")
+            return
+        apply_delta(game_state, payload)
+        state_seq = seq
+
+    elif tipo == 'your_turn':
+        my_turn.set() # crucial. Acorda na hora a thread principal para a ação do jogador.
+
+    if screen is not None:
+        show_message(tipo, payload)
+    elif output_mode == "jsonl":
+        emit(json.dumps(msg, ensure_ascii=False))
+    else:
+        line = event_line(tipo, payload)
+        if line is not None:
+            emit(line)
+
+    if tipo == 'game_over':
+        if screen is not None:
+            screen.stop()
+        else:
+            sys.stdout.flush()
+        sock.close()
+        os._exit(0)
+
+def show_message(tipo, payload):
+    """
+    Modo interativo: mostra o evento no painel e guarda no log da partida.
+    """
+    if tipo == 'round_start':
+        screen.invalidate()
+        log_event(f"Nova rodada - seus dados: {my_dice}")
+
+    elif tipo == 'game_update':
+        screen.invalidate()
+        screen.message(style(payload['message'], DIM))
+        log_event(f"Atualização: {payload['message']}")
+
+    elif tipo in ('state_snapshot', 'state_delta'):
+        show_turn()
+
+    elif tipo == 'your_turn':
+        limit = f" (até {turn_timeout:g} s)" if turn_timeout else ""
+        screen.message(f"Sua vez{limit}! Digite aposta (ex: '3 4') ou 'duvido' ('placar' mostra o ranking)")
+        log_event("Sua vez de jogar.")
+
+    elif tipo in ['info', 'error']:
+        message = payload['message']
+        color = ()
+        # Colore mensagens de resultado com base no conteúdo
+        if 'perde 1 dado' in message:
+            color = (RED,) if 'VERDADEIRA' in message else (GREEN,)
+        elif 'entrou no jogo' in message:
+            color = (YELLOW,)
+
+        screen.message(style(f"[SERVIDOR] {message}", BOLD, *color))
+        log_event(f"[SERVIDOR] {message}")
+
+    elif tipo == 'reveal_all':
+        # Todas as mãos numa mensagem só; a animação é local, numa thread à parte
+        # (o resultado do servidor chega quando ela termina)
+        threading.Thread(target=animate_reveal, args=(payload,), daemon=True).start()
+        log_event(f"Revelação final: {payload['dice_data']}")
+
+    elif tipo == 'leaderboard':
+        for line in leaderboard_lines(payload):
+            screen.message(line)
+
+    elif tipo == 'game_over':
+        screen.invalidate()
+        screen.message(style(f"!!! {payload['message']} !!!", BOLD, MAGENTA))
+        log_event(f"FIM: {payload['message']}")
+
+def event_line(tipo, payload):
+    """
+    Modo --plain: o tipo do evento e o essencial dele numa linha, sem cores.
+    Retorna None para mensagens que não são eventos do jogo ('codec', 'session').
+    """
+    if tipo == 'round_start':
+        return f"round_start {' '.join(map(str, my_dice))}"
+    if tipo in ('game_update', 'state_snapshot', 'state_delta'):
+        bid = game_state.get('last_bid') or {}
+        return (f"state vez={game_state.get('current_turn')} "
+                f"aposta={bid.get('quantity', 0)}x{bid.get('face', 0)}")
+    if tipo == 'your_turn':
+        return f"your_turn {turn_timeout:g}" if turn_timeout else "your_turn"
+    if tipo in ('info', 'error', 'game_over'):
+        return f"{tipo} {' '.join(payload['message'].split())}"
+    if tipo == 'reveal_all':
+        hands = ' '.join(f"{e['player']}={''.join(map(str, e['dice']))}" for e in payload['dice_data'])
+        return f"reveal_all {payload['quantity']}x{payload['face']} total={payload['total_count']} {hands}"
+    if tipo == 'leaderboard':
+        # posição:nome=vitórias/partidas; 'eu=' é quem perguntou
+        top = ' '.join(f"{e['rank']}:{e['name']}={e['wins']}/{e['games']}" for e in payload['top'])
+        me = payload.get('player')
+        return f"leaderboard {top}" + (f" eu={me['rank']}:{me['name']}={me['wins']}/{me['games']}" if me else "")
+    return None
+
+def leaderboard_lines(payload):
+    """
+    O placar em linhas de texto: os primeiros colocados e, se estiver fora
+    deles, quem perguntou.
+    """
+    def row(e):
+        return (f"{e['rank']:>4} {e['name'][:16]:<16} {e['games']:>8} {e['wins']:>8} {e['dice_lost']:>7} "
+                f"{e['bluffs_called']:>7} {e['bluffs_caught']:>7}")
+
+    lines = [f"{'#':>4} {'jogador':<16} {'partidas':>8} {'vitórias':>8} {'dados-':>7} "
+             f"{'pegou':>7} {'pego':>7}"]
+    lines += [row(e) for e in payload['top']] or ["     (nenhuma partida registrada)"]
+    me = payload.get('player')
+    if me is not None and all(e['name'] != me['name'] for e in payload['top']):
+        lines += ["   ...", row(me)]
+    return lines
+
+def query_leaderboard(sock, limit, name):
+    """
+    --leaderboard: pede o placar, escreve no stdout e volta (sem entrar na fila de mesas).
+    """
+    send(sock, 'leaderboard', {'limit': limit, 'player': name} if name else {'limit': limit})
+    decoder = FrameDecoder()
+    while True:
+        raw = sock.recv(4096)
+        if not raw:
+            notice("O servidor fechou a conexão.")
+            return
+        for msg in decoder.feed(raw):
+            if output_mode == "jsonl":
+                emit(json.dumps(msg, ensure_ascii=False))
+            elif msg.get('type') == 'leaderboard':
+                for line in leaderboard_lines(msg['payload']):
+                    emit(line)
+            else:
+                emit(event_line(msg.get('type'), msg.get('payload')) or str(msg))
+            return
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cliente de Liar's Dice")
+    parser.add_argument("--host", help="IP do servidor (sem ele, o cliente pergunta)")
+    parser.add_argument("--port", type=int, default=65432)
+    parser.add_argument("--name", help="apelido (sem ele, o cliente pergunta)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--plain", dest="output", action="store_const", const="plain",
+                      help="uma linha de texto por evento no stdout, jogadas pelo stdin")
+    mode.add_argument("--jsonl", dest="output", action="store_const", const="jsonl",
+                      help="cada mensagem do servidor como uma linha JSON no stdout, jogadas pelo stdin")
+    parser.add_argument("--leaderboard", type=int, nargs="?", const=10, metavar="N",
+                        help="só mostra os N primeiros do placar (e a posição de --name) e sai")
+    parser.set_defaults(output="tui")
+    args = parser.parse_args(argv)
+    if args.output != "tui" and args.name is None and args.leaderboard is None:
+        parser.error(f"--{args.output} precisa de --name")
+    return args
+
+def main(argv=None):
+    global server_addr, server_sock, output_mode, log_file, screen
+    args = parse_args(argv)
+    output_mode = args.output
+    if args.leaderboard is not None:
+        # Só a consulta: sem painel, sem log da partida
+        try:
+            sock = socket.create_connection((args.host or "127.0.0.1", args.port))
+        except OSError as e:
+            notice(f"Falha ao conectar: {e}")
+            return
+        with sock:
+            query_leaderboard(sock, args.leaderboard, args.name)
+        sys.stdout.flush()
+        return
+    if output_mode == "tui":
+        host = args.host or input("IP do servidor (padrão: 127.0.0.1): ") or "127.0.0.1"
+        nome = args.name or input("Seu nome: ")
+        # Tela: painel da mesa redesenhado por linhas, no máximo 20 quadros/s (ver render.py)
+        screen = LiveScreen(lambda: table_rows(), fps=20)
+        if os.path.exists(log_file):
+            os.remove(log_file)
+    else:
+        # O stdout já é o histórico; vários clientes na mesma pasta não disputam o arquivo
+        host = args.host or "127.0.0.1"
+        nome = args.name
+        log_file = None
+    port = args.port
 
     # Cria socket e conecta ao servidor
     # AF_INET -> protocolo IPV4 +
@@ -187,11 +453,18 @@ def main():
     try:
         sock.connect((host, port)) # outra chamada bloqueante
     except Exception as e:
-        print(f"Falha ao conectar: {e}")
+        if screen is None:
+            notice(f"Falha ao conectar: {e}")
+        else:
+            print(f"Falha ao conectar: {e}")
         return
+    server_addr = (host, port)
+    server_sock = sock
 
-    sock.sendall(encode_message('set_name', {'name': nome}))
+    send(sock, 'set_name', {'name': nome, **OFFER})
 
+    if screen is not None:
+        screen.start()
     threading.Thread(target=listen, args=(sock,), daemon=True).start()
     """
     threading.Thread(...): Cria um objeto de thread.
@@ -207,23 +480,36 @@ def main():
 
     # Loop principal do jogador
     while True:
-        if my_turn: # Executa esta parte do IF assim que a função listen envia 'your_turn'
-            cmd = input("> ").strip().lower() # Bloqueia thread até que o usuário digite algo
+        my_turn.wait() # Dorme (sem polling) até a thread listen receber 'your_turn'
+        if screen is None:
+            line = sys.stdin.readline() # Uma jogada por linha; fim do stdin = sai da mesa
+            if not line:
+                server_sock.close()
+                return
+            cmd = line.strip().lower()
+        else:
+            cmd = screen.prompt("> ").strip().lower() # Bloqueia thread até que o usuário digite algo
+            screen.message(style(f"> {cmd}", DIM))
 
+        try:
             if cmd == 'duvido':
-                sock.sendall(encode_message('challenge'))
-                my_turn = False
+                my_turn.clear()
+                send(server_sock, 'challenge')
+            elif cmd == 'placar':
+                send(server_sock, 'leaderboard')  # Continua sendo a sua vez
             elif len(cmd.split()) == 2:
                 try:
                     q, f = map(int, cmd.split())
-                    sock.sendall(encode_message('bid', {'quantity': q, 'face': f}))
-                    my_turn = False
+                    my_turn.clear()
+                    send(server_sock, 'bid', {'quantity': q, 'face': f})
                 except ValueError:
-                    console.print("[red]Formato inválido. Use dois números inteiros.[/red]")
+                    notice("Formato inválido. Use dois números inteiros.", RED)
             else:
-                console.print("[red]Comando inválido.[/red]")
-        else:
-            time.sleep(0.1)
+                notice("Comando inválido.", RED)
+        except OSError:
+            # Conexão caindo: a thread listen reconecta e o servidor manda 'your_turn' de novo
+            my_turn.clear()
+            notice("Sem conexão; a jogada não foi enviada.", RED)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
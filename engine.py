@@ -0,0 +1,524 @@
+import hashlib
+import random
+import secrets
+from collections import Counter, namedtuple
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # NumPy só é necessária para a simulação em lote
+    np = None
+
+"""
+Núcleo do jogo, sem sockets e sem estado global.
+
+- GameState: uma partida, com estado compacto (listas indexadas por assento).
+  É o que o servidor usa para validar apostas, resolver 'duvido' e rolar dados,
+  então as regras vivem num lugar só.
+- DiceStream: os dados de uma mesa, um sorteio por rodada a partir de uma
+  semente própria; qualquer rodada pode ser refeita com (semente, rodada).
+- BatchSimulator: muitas partidas independentes andando juntas, com os dados
+  em arrays NumPy (G partidas x P jogadores x D dados). Serve para avaliar
+  estratégias de bots e variações de regra sem subir servidor.
+"""
+
+DICE_PER_PLAYER = 5
+
+ChallengeResult = namedtuple(
+    "ChallengeResult",
+    "challenger bidder quantity face total_count valid_bid loser")
+
+def count_matches(face, hand, wild_ones=True):
+    """
+    Conta quantos dados da mão 'hand' batem com a aposta considerando a regra do coringa.
+    - face == 1: contam apenas os 1.
+    - face 2..6: contam face OU 1 se wild_ones == True.
+    """
+    if face == 1:
+        return sum(1 for d in hand if d == 1)
+    if wild_ones:
+        return sum(1 for d in hand if d == face or d == 1)
+    return sum(1 for d in hand if d == face)
+
+# =======================
+# Dados de uma mesa
+# =======================
+# Byte aleatório -> face: só os bytes < 252 (= 6 * 42) são usados, então as
+# seis faces têm exatamente a mesma chance.
+_FACE_OF_BYTE = bytes(b % 6 + 1 for b in range(256))
+_UNFAIR_BYTES = bytes(range(252, 256))
+
+class DiceStream:
+    """
+    Fonte de dados de uma mesa, independente do 'random' global e das
+    outras mesas. Os dados da rodada r são os primeiros bytes úteis de
+    SHAKE-128(semente, r): um único hash para a rodada inteira, convertido em
+    faces por bytes.translate (em C), sem um randint por dado.
+
+    Como cada rodada depende só de (semente, rodada, dados de cada assento),
+    basta guardar a semente para refazer qualquer rodada, em qualquer ordem
+    (roll_round), sem repassar pelas anteriores.
+
+    Atributos:
+        seed (int) - semente da mesa (64 bits; aleatória se não for dada).
+        round (int) - última rodada sorteada (a primeira é 1).
+    """
+
+    __slots__ = ("seed", "round", "_key")
+
+    def __init__(self, seed=None, round=0):
+        self.seed = secrets.randbits(64) if seed is None else seed
+        self.round = round
+        self._key = self.seed.to_bytes(16, "little", signed=True)
+
+    def roll(self, counts):
+        """
+        Sorteia a próxima rodada. Retorna (mãos, faces) -- faces[f] = dados com a face f.
+        """
+        self.round += 1
+        return self.roll_round(self.round, counts)
+
+    def roll_round(self, round_no, counts):
+        """
+        Os dados da rodada 'round_no' com 'counts' dados por assento (sempre os mesmos).
+        """
+        total = sum(counts)
+        shake = hashlib.shake_128(self._key + round_no.to_bytes(8, "little"))
+        size = total + (total >> 4) + 16  # Folga para os bytes descartados (~1,6%)
+        data = shake.digest(size).translate(None, _UNFAIR_BYTES)
+        while len(data) < total:
+            size *= 2
+            data = shake.digest(size).translate(None, _UNFAIR_BYTES)
+        dice = data[:total].translate(_FACE_OF_BYTE)
+        flat = list(dice)
+        hands = []
+        pos = 0
+        for n in counts:
+            hands.append(flat[pos:pos + n])
+            pos += n
+        return hands, [0] + [dice.count(face) for face in range(1, 7)]
+
+# =======================
+# Uma partida
+# =======================
+class GameState:
+    """
+    Estado de uma partida. Os jogadores são assentos 0..n-1; quem controla
+    nomes e conexões é o chamador (ex.: server.Table).
+
+    Atributos:
+        dice_counts (list[int]) - dados de cada assento.
+        hands (list[list[int]]) - mão de cada assento na rodada atual.
+        turn (int) - assento da vez.
+        last_bid (tuple) - (quantidade, face); (0, 0) = nenhuma aposta na rodada.
+        last_bidder (int | None) - assento que fez a última aposta.
+        faces (list[int]) - quantos dados de cada face (índice 1..6) há na mesa
+            nesta rodada, montado ao rolar: o 'duvido' é uma consulta.
+
+    Para mesas grandes (centenas de assentos) nada por jogada depende do
+    tamanho da mesa: os assentos com dados formam um anel duplamente ligado
+    (_next/_prev), então passar a vez, achar o vizinho e eliminar alguém são
+    O(1), e o total de dados e o número de ativos são mantidos a cada perda.
+    Quem muda dice_counts ou hands diretamente chama set_dice_counts() /
+    set_hands().
+    """
+
+    __slots__ = ("dice_counts", "hands", "faces", "turn", "last_bid", "last_bidder", "wild_ones",
+                 "total", "active", "_next", "_prev")
+
+    def __init__(self, num_players, dice_per_player=DICE_PER_PLAYER, wild_ones=True):
+        self.set_hands([[] for _ in range(num_players)])
+        self.turn = 0
+        self.last_bid = (0, 0)
+        self.last_bidder = None
+        self.wild_ones = wild_ones
+        self.set_dice_counts([dice_per_player] * num_players)
+
+    def set_dice_counts(self, counts):
+        """
+        Troca os dados de todos os assentos e remonta o anel e os totais (O(n)).
+        """
+        self.dice_counts = counts = list(counts)
+        self.total = sum(counts)
+        alive = [s for s, n in enumerate(counts) if n > 0]
+        self.active = len(alive)
+        n = len(counts)
+        # Cada assento aponta para o vivo seguinte/anterior; os sem dados também,
+        # como se tivessem acabado de sair do anel
+        self._next = list(range(n))
+        self._prev = list(range(n))
+        if alive:
+            nxt = alive[0]
+            for seat in reversed(range(n)):
+                self._next[seat] = nxt
+                if counts[seat]:
+                    nxt = seat
+            prev = alive[-1]
+            for seat in range(n):
+                self._prev[seat] = prev
+                if counts[seat]:
+                    prev = seat
+
+    def set_hands(self, hands):
+        """
+        Troca as mãos da rodada e remonta o histograma de faces.
+        """
+        self.hands = hands
+        tally = Counter(chain.from_iterable(hands))
+        self.faces = [tally[face] for face in range(7)]
+
+    def count(self, face):
+        """
+        Quantos dados da mesa valem para uma aposta em 'face' (regra do coringa), O(1).
+        """
+        if face == 1 or not self.wild_ones:
+            return self.faces[face]
+        return self.faces[face] + self.faces[1]
+
+    def active_players(self):
+        return [s for s, n in enumerate(self.dice_counts) if n > 0]
+
+    def total_dice(self):
+        return self.total
+
+    def winner(self):
+        """
+        Assento vencedor quando sobra no máximo um jogador com dados, senão None.
+        Retorna -1 se ninguém sobrou.
+        """
+        if self.active > 1:
+            return None
+        if not self.active:
+            return -1
+        return self.turn if self.dice_counts[self.turn] else self.next_active(self.turn)
+
+    def next_active(self, seat):
+        """
+        Próximo assento com dados depois de 'seat' (que pode já estar fora).
+        """
+        seat = self._next[seat]
+        while self.dice_counts[seat] == 0:  # Só acontece partindo de quem saiu
+            seat = self._next[seat]
+        return seat
+
+    def previous_active(self, seat):
+        """
+        Assento anterior a 'seat' que ainda tem dados.
+        """
+        seat = self._prev[seat]
+        while self.dice_counts[seat] == 0:
+            seat = self._prev[seat]
+        return seat
+
+    def _lose_die(self, seat):
+        """
+        Tira um dado de 'seat'; quem fica sem dados sai do anel.
+        """
+        self.dice_counts[seat] -= 1
+        self.total -= 1
+        if self.dice_counts[seat] == 0:
+            self._unlink(seat)
+
+    def _unlink(self, seat):
+        prev, nxt = self._prev[seat], self._next[seat]
+        self._next[prev] = nxt
+        self._prev[nxt] = prev
+        self.active -= 1
+
+    def eliminate(self, seat):
+        """
+        Tira o assento do jogo (ex.: saiu de uma mesa grande), com todos os dados.
+        Se era a vez dele, ela passa ao próximo com dados; uma aposta dele na
+        mesa continua valendo. Retorna False se o assento já estava fora.
+        """
+        count = self.dice_counts[seat]
+        if count == 0:
+            return False
+        self.dice_counts[seat] = 0
+        self.total -= count
+        for die in self.hands[seat]:
+            self.faces[die] -= 1
+        self.hands[seat] = []
+        self._unlink(seat)
+        if self.turn == seat and self.active:
+            self.turn = self.next_active(seat)
+        return True
+
+    def roll(self, rng=random):
+        """
+        Nova rodada: zera a aposta, rola os dados dos jogadores ativos e garante
+        que o turno está com alguém que tem dados. Retorna as mãos.
+
+        rng: DiceStream (a rodada inteira num sorteio só, reproduzível pela
+        semente) ou um random.Random / o módulo random (um randint por dado).
+        """
+        self.last_bid = (0, 0)
+        self.last_bidder = None
+        if isinstance(rng, DiceStream):
+            self.hands, self.faces = rng.roll(self.dice_counts)
+        else:
+            randint = rng.randint
+            self.set_hands([[randint(1, 6) for _ in range(n)] for n in self.dice_counts])
+        if self.dice_counts[self.turn] == 0:
+            self.turn = self.next_active(self.turn)
+        return self.hands
+
+    def check_bid(self, quantity, face):
+        """
+        Valida uma aposta do jogador da vez. Retorna a mensagem de erro ou None se for válida.
+        """
+        total_dice_in_play = self.total_dice()
+
+        # Validação 1: Face do dado deve ser entre 1 e 6
+        if not (1 <= face <= 6):
+            return "Aposta inválida. A face do dado deve ser entre 1 e 6."
+
+        # Validação 2: Quantidade apostada não pode exceder o total de dados em jogo
+        if quantity > total_dice_in_play:
+            return f"Aposta inválida. Existem apenas {total_dice_in_play} dados na mesa."
+
+        # Validação 3: Aposta deve ser maior que a anterior
+        last_quantity, last_face = self.last_bid
+        if not (quantity > last_quantity or (quantity == last_quantity and face > last_face)):
+            return "Aposta inválida. Aumente a quantidade ou a face."
+        return None
+
+    def min_raise(self):
+        """
+        A menor aposta válida agora: (quantidade, face), ou None se não há
+        como aumentar (a aposta já é o total da mesa com face 6).
+        """
+        quantity, face = self.last_bid
+        if quantity == 0:
+            return 1, 1
+        if face < 6:
+            return quantity, face + 1
+        if quantity < self.total:
+            return quantity + 1, 1
+        return None
+
+    def apply_bid(self, quantity, face):
+        """
+        Registra uma aposta já validada e passa o turno para o próximo com dados.
+        """
+        self.last_bid = (quantity, face)
+        self.last_bidder = self.turn
+        self.turn = self.next_active(self.turn)
+
+    def check_challenge(self):
+        if self.last_bid[0] == 0:
+            return "Não pode duvidar antes da primeira aposta."
+        return None
+
+    def resolve_challenge(self):
+        """
+        Resolve o 'duvido' do jogador da vez contra a última aposta:
+        conta os dados (regra do coringa), tira um dado de quem perdeu e
+        passa o turno para ele (aposta verdadeira -> desafiante; falsa -> apostador).
+        """
+        quantity, face = self.last_bid
+        challenger = self.turn
+        bidder = self.last_bidder if self.last_bidder is not None else self.previous_active(challenger)
+        total_count = self.count(face)
+        valid_bid = total_count >= quantity
+        loser = challenger if valid_bid else bidder
+        if self.dice_counts[loser] > 0:
+            self._lose_die(loser)
+        # Quem perde começa a próxima rodada (roll passa adiante se ele saiu ou zerou)
+        self.turn = loser
+        return ChallengeResult(challenger, bidder, quantity, face, total_count, valid_bid, loser)
+
+# =======================
+# Simulação em lote (NumPy)
+# =======================
+def _tail_matrix(max_dice, p):
+    """
+    T[n, k] = P(X >= k), X ~ Bin(n, p), para n = 0..max_dice e k = 0..max_dice+1.
+    """
+    from odds import tail_table
+    out = np.zeros((max_dice + 1, max_dice + 2))
+    for n in range(max_dice + 1):
+        out[n, :n + 2] = tail_table(n, p)
+    return out
+
+def threshold_policy(threshold=0.5):
+    """
+    Política vetorizada: duvida quando a aposta na mesa tem chance < threshold
+    (probabilidade exata, ver odds.py); senão aumenta o mínimo possível na face
+    (2..6) em que tem mais dados.
+    """
+    def policy(view):
+        m = view["matches"]
+        lq, lf = view["last_q"], view["last_f"]
+        tails = view["tails"]
+        _, rows, cols = tails.shape
+        have = np.take(m.ravel(), np.arange(len(lq)) * 7 + lf)
+        need = np.clip(lq - have, 0, cols - 1)
+        kind = (lf != 1) & view["wild_ones"]   # 0 = só a face, 1 = face ou ás
+        prob = np.take(tails.ravel(), (kind * rows + view["unknown"]) * cols + need)
+        face = np.argmax(m[:, 2:], axis=1) + 2
+        quantity = np.where(face > lf, np.maximum(lq, 1), lq + 1)
+        challenge = (lq > 0) & ((prob < threshold) | (quantity > view["total"]))
+        return challenge, quantity, face
+    return policy
+
+class BatchSimulator:
+    """
+    Simula 'num_games' partidas independentes em passo único (lockstep).
+    A cada passo, o jogador da vez de cada partida aposta ou duvida segundo a
+    política do seu assento. Partidas que terminam recomeçam na hora, então a
+    carga é constante; vitórias por assento ficam em 'wins'.
+
+    Os dados em si não são guardados: ao rolar, cada mão vira um histograma
+    de faces (G*P x 7, já com os ases somados nas faces 2..6 quando eles são
+    coringas), que é tudo o que as políticas precisam; a soma das mãos dá o
+    histograma da mesa, então o 'duvido' é uma consulta. A tabela 'nxt' (próximo assento com dados) também é
+    montada na rolagem, então passar o turno é uma indexação.
+
+    Parâmetros:
+        policies (list | callable) - uma política vetorizada por assento
+            (ver threshold_policy), ou uma só para todos.
+    """
+
+    def __init__(self, num_games, num_players, policies=None, dice_per_player=DICE_PER_PLAYER,
+                 wild_ones=True, seed=None):
+        if np is None:
+            raise ImportError("BatchSimulator precisa de NumPy (pip install numpy).")
+        if policies is None or callable(policies):
+            policies = [policies or threshold_policy()] * num_players
+        self.G, self.P, self.D = num_games, num_players, dice_per_player
+        self.policies = list(policies)
+        self._distinct = list(dict.fromkeys(self.policies))
+        self._seat_policy = np.array([self._distinct.index(p) for p in self.policies])
+        self.wild_ones = wild_ones
+        self.rng = np.random.default_rng(seed)
+        max_dice = num_players * dice_per_player
+        # tails[0] -> p = 1/6 (face exata); tails[1] -> p = 2/6 (face ou ás)
+        self.tails = np.stack([_tail_matrix(max_dice, 1 / 6), _tail_matrix(max_dice, 2 / 6)])
+
+        G, P = self.G, self.P
+        self._games = np.arange(G)
+        self.counts = np.full((G, P), dice_per_player, dtype=np.intp)
+        self.total = np.full(G, P * dice_per_player, dtype=np.intp)  # Dados na mesa (mantido a cada perda)
+        self.faces = np.zeros((G * P, 7), dtype=np.int16)  # Histograma de faces da mão de (partida, assento)
+        self.hist = np.zeros((G, 7), dtype=np.intp)        # Histograma da mesa (soma das mãos)
+        self.nxt = np.zeros(G * P, dtype=np.intp)          # Próximo assento com dados depois de (partida, assento)
+        self.turn = np.zeros(G, dtype=np.intp)
+        self.last_q = np.zeros(G, dtype=np.intp)
+        self.last_f = np.zeros(G, dtype=np.intp)
+        self.last_bidder = np.zeros(G, dtype=np.intp)
+        self.rounds = 0
+        self.games = 0
+        self.bids = 0
+        self.wins = np.zeros(P, dtype=np.int64)
+        self._roll(self._games)
+
+    def _roll(self, games):
+        n, P, D = len(games), self.P, self.D
+        counts = self.counts[games]
+        dice = self.rng.integers(1, 7, size=(n, P, D), dtype=np.int8)
+        dice[np.arange(D)[None, None, :] >= counts[:, :, None]] = 0   # Dados perdidos -> face 0
+        dice = dice.astype(np.intp)
+        # Histogramas por mão e por mesa com um bincount cada (face + 7 * índice)
+        faces = np.bincount((dice + 7 * np.arange(n * P).reshape(n, P, 1)).ravel(),
+                            minlength=7 * n * P).reshape(n, P, 7)
+        hist = np.bincount((dice + 7 * np.arange(n).reshape(n, 1, 1)).ravel(),
+                           minlength=7 * n).reshape(n, 7)
+        faces[:, :, 0] = 0
+        hist[:, 0] = 0
+        if self.wild_ones:
+            # Já guarda as contagens com os ases somados nas faces 2..6
+            faces[:, :, 2:] += faces[:, :, 1:2]
+            hist[:, 2:] += hist[:, 1:2]
+        self.faces.reshape(self.G, P, 7)[games] = faces
+        self.hist[games] = hist
+        self.last_q[games] = 0
+        self.last_f[games] = 0
+
+        # nxt[s] = primeiro assento com dados depois de s
+        cand = (np.arange(P)[:, None] + np.arange(1, P + 1)[None, :]) % P        # (P, P)
+        alive = counts[:, cand] > 0                                                # (n, P, P)
+        nxt = cand[np.arange(P)[None, :], np.argmax(alive, axis=2)]               # (n, P)
+        self.nxt.reshape(self.G, P)[games] = nxt
+        turn = self.turn[games]
+        dead = counts[np.arange(n), turn] == 0
+        self.turn[games] = np.where(dead, nxt[np.arange(n), turn], turn)
+
+    def _view(self, games=None):
+        """
+        Visão do jogador da vez nas partidas 'games' (None = todas).
+        'matches' já conta os ases como coringa nas faces 2..6.
+        """
+        if games is None:
+            games, turn, total = self._games, self.turn, self.total
+            last_q, last_f = self.last_q, self.last_f
+        else:
+            turn, total = self.turn[games], self.total[games]
+            last_q, last_f = self.last_q[games], self.last_f[games]
+        seat = games * self.P + turn
+        own_faces = np.take(self.faces, seat, axis=0)
+        own = np.take(self.counts.ravel(), seat)
+        return {
+            "matches": own_faces, "own": own, "total": total, "unknown": total - own,
+            "last_q": last_q, "last_f": last_f, "tails": self.tails, "wild_ones": self.wild_ones,
+        }
+
+    def step(self):
+        """
+        Um passo de todas as partidas: cada jogador da vez aposta ou duvida.
+        """
+        G = self._games
+        if len(self._distinct) == 1:
+            challenge, quantity, face = self._distinct[0](self._view())
+        else:
+            challenge = np.zeros(self.G, dtype=bool)
+            quantity = np.zeros(self.G, dtype=np.int64)
+            face = np.zeros(self.G, dtype=np.int64)
+            which = self._seat_policy[self.turn]
+            for k, policy in enumerate(self._distinct):
+                games = G[which == k]
+                if len(games):
+                    challenge[games], quantity[games], face[games] = policy(self._view(games))
+
+        # Apostas
+        bidders = G[~challenge]
+        self.last_q[bidders] = quantity[bidders]
+        self.last_f[bidders] = face[bidders]
+        turn = self.turn[bidders]
+        self.last_bidder[bidders] = turn
+        self.turn[bidders] = np.take(self.nxt, bidders * self.P + turn)
+        self.bids += len(bidders)
+
+        # Desafios: contagem direto do histograma da rodada
+        games = G[challenge]
+        if len(games) == 0:
+            return
+        f = self.last_f[games]
+        total_count = self.hist[games, f]   # Com coringa, hist[2..6] já inclui os ases
+        valid = total_count >= self.last_q[games]
+        loser = np.where(valid, self.turn[games], self.last_bidder[games])
+        self.counts[games, loser] -= 1
+        self.total[games] -= 1
+        self.turn[games] = loser
+        self.rounds += len(games)
+
+        # Fim de partida: sobra um jogador com dados -> conta a vitória e recomeça
+        alive = (self.counts[games] > 0).sum(axis=1)
+        over = games[alive <= 1]
+        if len(over):
+            winners = np.argmax(self.counts[over] > 0, axis=1)
+            self.wins += np.bincount(winners, minlength=self.P)
+            self.games += len(over)
+            self.counts[over] = self.D
+            self.total[over] = self.P * self.D
+            self.turn[over] = 0
+        self._roll(games)
+
+    def run(self, rounds):
+        """
+        Avança até completar pelo menos 'rounds' rodadas (somando todas as partidas).
+        """
+        target = self.rounds + rounds
+        while self.rounds < target:
+            self.step()
+        return self
@@ -0,0 +1,330 @@
+import queue
+import struct
+import threading
+import time
+from bisect import bisect_right
+from protocol import pack_dice, unpack_dice
+
+"""
+Diário (journal) de partidas: um arquivo só de acréscimo por mesa, com
+registros binários pequenos, e um índice de tamanho fixo ao lado.
+
+Arquivo <nome>.lj:
+    cabeçalho: MAGIC, nº de assentos (varint), coringa (1 byte), início (varint, epoch s)
+    registros: tipo (1 byte), ms desde o registro anterior (varint), campos:
+        REC_JOIN       assento, tamanho do nome, nome (UTF-8)
+        REC_ROLL       rodada, assento que começa; por assento: nº de dados + dados
+                       (3 dados por byte, como no codec binário do protocolo)
+        REC_BID        assento, quantidade, face
+        REC_CHALLENGE  desafiante, apostador, dados que bateram, perdedor
+        REC_LEAVE      assento (desconectou)
+        REC_END        vencedor + 1 (0 = ninguém / partida abandonada)
+        REC_SEED       semente dos dados da mesa (engine.DiceStream), logo depois
+                       das entradas: a rodada r pode ser refeita a partir dela
+    Todos os inteiros são varint (LEB128): valores < 128 ocupam 1 byte.
+
+Arquivo <nome>.lj.idx: uma entrada INDEX_ENTRY (rodada, posição no .lj, ms desde
+o início) a cada 'index_every' rodadas. Como as entradas têm tamanho fixo, o
+replay acha qualquer rodada com uma busca binária, sem ler o diário inteiro.
+
+A mesa acumula os registros em memória e os entrega no começo de cada rodada
+e no fim da partida (um open/write/close por rodada), então milhares de
+mesas não seguram milhares de arquivos abertos. Com um JournalFiles, quem
+abre e grava é a thread dele: a mesa só enfileira os bytes e o event loop
+não espera o disco.
+"""
+
+MAGIC = b"LDJ1"
+REC_JOIN = 1
+REC_ROLL = 2
+REC_BID = 3
+REC_CHALLENGE = 4
+REC_LEAVE = 5
+REC_END = 6
+REC_SEED = 7
+
+INDEX_ENTRY = struct.Struct("!III")
+INDEX_SUFFIX = ".idx"
+
+def put_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+def get_varint(data, pos):
+    """
+    Retorna (valor, próxima posição).
+    """
+    result = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+def append_file(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+# =======================
+# Escrita
+# =======================
+class JournalFiles:
+    """
+    Thread que grava os diários de todas as mesas, como o AsyncLogger: write()
+    só enfileira (caminho, bytes) e volta. Uma fila só, então os pedaços de um
+    mesmo arquivo chegam ao disco na ordem em que foram entregues.
+    """
+
+    def __init__(self):
+        self.written = 0            # Bytes gravados
+        self.errors = 0             # Pedaços perdidos por erro de I/O
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="journal", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """
+        Pedaços na fila, ainda não gravados.
+        """
+        return self._queue.qsize()
+
+    def write(self, path, data):
+        """
+        Enfileira 'data' (bytes, não mais alterados) para o fim de 'path'.
+        """
+        self._queue.put((path, data))
+
+    def close(self):
+        """
+        Grava o que ainda estiver na fila e encerra a thread.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        get = self._queue.get
+        while True:
+            item = get()
+            if item is None:
+                break
+            path, data = item
+            try:
+                append_file(path, data)
+            except OSError:
+                self.errors += 1
+                continue
+            self.written += len(data)
+
+class JournalWriter:
+    """
+    Parâmetros:
+        path (str) - Arquivo .lj (o índice vai em path + ".idx").
+        num_players (int) - Assentos da mesa.
+        wild_ones (bool) - Regra do coringa em vigor.
+        index_every (int) - Uma entrada de índice a cada N rodadas.
+        files (JournalFiles | None) - Thread que grava; None = grava na hora,
+            na thread de quem chamou (ferramentas e testes).
+    """
+
+    def __init__(self, path, num_players, wild_ones=True, index_every=1, files=None):
+        self.path = path
+        self.files = files
+        self.index_every = index_every
+        self.rounds = 0
+        self.size = 0               # Bytes já entregues para gravação
+        self._buf = bytearray(MAGIC)
+        put_varint(self._buf, num_players)
+        self._buf.append(1 if wild_ones else 0)
+        put_varint(self._buf, int(time.time()))
+        self._index = bytearray()
+        self._started = time.monotonic()
+        self._last_ms = 0           # ms desde o início até o último registro
+        self.closed = False
+
+    def _record(self, kind, *fields):
+        now_ms = int((time.monotonic() - self._started) * 1000)
+        buf = self._buf
+        buf.append(kind)
+        put_varint(buf, now_ms - self._last_ms)
+        self._last_ms = now_ms
+        for value in fields:
+            put_varint(buf, value)
+
+    def join(self, seat, name):
+        raw = name.encode("utf-8")
+        self._record(REC_JOIN, seat, len(raw))
+        self._buf += raw
+
+    def seed(self, seed):
+        self._record(REC_SEED, seed)
+
+    def roll(self, start_seat, hands):
+        """
+        Nova rodada. Grava o que estava pendente e marca a posição no índice.
+        """
+        self.rounds += 1
+        if (self.rounds - 1) % self.index_every == 0:
+            offset = self.size + len(self._buf)
+            # ms até o registro anterior: quem lê soma o intervalo do próprio ROLL
+            self._index += INDEX_ENTRY.pack(self.rounds, offset, self._last_ms)
+        self._record(REC_ROLL, self.rounds, start_seat)
+        buf = self._buf
+        for hand in hands:
+            put_varint(buf, len(hand))
+            buf += pack_dice(hand)
+        self.flush()
+
+    def bid(self, seat, quantity, face):
+        self._record(REC_BID, seat, quantity, face)
+
+    def challenge(self, challenger, bidder, total_count, loser):
+        self._record(REC_CHALLENGE, challenger, bidder, total_count, loser)
+
+    def leave(self, seat):
+        self._record(REC_LEAVE, seat)
+
+    def end(self, winner):
+        """
+        Fim da partida; winner = assento, ou -1 / None se ninguém venceu.
+        """
+        self._record(REC_END, winner + 1 if winner is not None and winner >= 0 else 0)
+        self.close()
+
+    def flush(self):
+        write = append_file if self.files is None else self.files.write
+        if self._buf:
+            write(self.path, bytes(self._buf))
+            self.size += len(self._buf)
+            self._buf.clear()
+        if self._index:
+            write(self.path + INDEX_SUFFIX, bytes(self._index))
+            self._index.clear()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.flush()
+
+# =======================
+# Leitura
+# =======================
+class JournalReader:
+    """
+    Lê um diário inteiro para a memória (arquivos de poucos KB) e decodifica
+    os registros sob demanda.
+
+    Atributos:
+        num_players, wild_ones, started (epoch s), players ({assento: nome}),
+        seed (int | None) - semente dos dados (diários antigos não têm),
+        index (list[(rodada, posição, ms)]).
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: não é um diário de partida")
+        pos = len(MAGIC)
+        self.num_players, pos = get_varint(data, pos)
+        self.wild_ones = bool(data[pos])
+        self.started, pos = get_varint(data, pos + 1)
+        self.body = pos
+        self.index = []
+        try:
+            with open(path + INDEX_SUFFIX, "rb") as f:
+                raw = f.read()
+            self.index = [INDEX_ENTRY.unpack_from(raw, i)
+                          for i in range(0, len(raw) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)]
+        except FileNotFoundError:
+            pass
+        self.players = {}
+        self.seed = None
+        for rec in self.records():
+            if rec[0] == REC_JOIN:
+                self.players[rec[2]] = rec[3]
+            elif rec[0] == REC_SEED:
+                self.seed = rec[2]
+            elif rec[0] != REC_LEAVE:
+                break
+
+    def seek_round(self, round_no):
+        """
+        Posição (e ms desde o início) da rodada 'round_no', ou da última rodada
+        indexada antes dela. Sem índice, volta para o começo.
+        """
+        i = bisect_right(self.index, (round_no, float("inf"), 0)) - 1
+        if i < 0:
+            return self.body, 0
+        _, offset, elapsed = self.index[i]
+        return offset, elapsed
+
+    def records(self, pos=None, elapsed=0):
+        """
+        Gera (tipo, ms desde o início, *campos) a partir de 'pos'.
+        Campos por tipo: ver a docstring do módulo; ROLL traz (rodada, assento, mãos).
+        """
+        data = self.data
+        end = len(data)
+        pos = self.body if pos is None else pos
+        while pos < end:
+            kind = data[pos]
+            dt, pos = get_varint(data, pos + 1)
+            elapsed += dt
+            if kind == REC_BID:
+                seat, pos = get_varint(data, pos)
+                quantity, pos = get_varint(data, pos)
+                face, pos = get_varint(data, pos)
+                yield kind, elapsed, seat, quantity, face
+            elif kind == REC_ROLL:
+                round_no, pos = get_varint(data, pos)
+                start, pos = get_varint(data, pos)
+                hands = []
+                for _ in range(self.num_players):
+                    count, pos = get_varint(data, pos)
+                    size = (count + 2) // 3
+                    hands.append(unpack_dice(data[pos:pos + size], count))
+                    pos += size
+                yield kind, elapsed, round_no, start, hands
+            elif kind == REC_CHALLENGE:
+                fields = []
+                for _ in range(4):
+                    value, pos = get_varint(data, pos)
+                    fields.append(value)
+                yield (kind, elapsed, *fields)
+            elif kind == REC_JOIN:
+                seat, pos = get_varint(data, pos)
+                size, pos = get_varint(data, pos)
+                yield kind, elapsed, seat, data[pos:pos + size].decode("utf-8")
+                pos += size
+            elif kind == REC_LEAVE:
+                seat, pos = get_varint(data, pos)
+                yield kind, elapsed, seat
+            elif kind == REC_END:
+                winner, pos = get_varint(data, pos)
+                yield kind, elapsed, winner - 1
+            elif kind == REC_SEED:
+                seed, pos = get_varint(data, pos)
+                yield kind, elapsed, seed
+            else:
+                raise ValueError(f"Registro desconhecido {kind} na posição {pos}")
+
+    def from_round(self, round_no):
+        """
+        Registros a partir do começo da rodada 'round_no' (usa o índice).
+        """
+        pos, elapsed = self.seek_round(round_no)
+        found = False
+        for rec in self.records(pos, elapsed):
+            if not found:
+                # Índice esparso: pula o resto da rodada indexada anterior
+                if rec[0] != REC_ROLL or rec[2] < round_no:
+                    continue
+                found = True
+            yield rec
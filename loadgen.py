@@ -0,0 +1,435 @@
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+from odds import bid_probability
+from protocol import encode_message, apply_delta, FrameDecoder, ProtocolError, CODEC_BINARY, CODEC_JSON
+
+"""
+Gerador de carga headless: abre milhares de bots num único processo (asyncio),
+todos falando o protocolo real (protocol.py). Cada bot envia 'set_name',
+responde 'your_turn' com uma política plugável e, ao fim da partida, volta
+para a fila com uma nova conexão até acabar o tempo.
+
+Relatório: latência p50/p95/p99 entre enviar um 'bid' e receber a próxima
+versão do estado ('state_delta' ou 'game_update'), duração de cada rodada
+(do 'round_start' ao 'reveal_all': as apostas e o 'duvido'), partidas por
+segundo e contagem de erros.
+
+Com --spectators N, abre também N espectadores ('spectate') que só leem os
+eventos públicos da mesa; ao fim de cada partida eles voltam e assistem à
+próxima. Rodando os espectadores num processo à parte (--bots 0), a latência
+medida pelos bots não disputa CPU com eles.
+
+Uso:
+    python server.py --pacing 0 --quiet
+    python loadgen.py --bots 2000 --duration 30
+    python loadgen.py --policy meu_modulo:minha_politica
+    python loadgen.py --bots 0 --spectators 5000 --duration 40 & python loadgen.py --bots 100 --duration 30
+"""
+
+# =======================
+# Políticas de jogo
+# =======================
+# Uma política recebe a visão do bot e devolve (msg_type, payload):
+#   ("bid", {"quantity": q, "face": f}) ou ("challenge", None)
+# Visão: {"dice": [...], "last_bid": {...}, "total_dice": int, "players": [...], "name": str}
+
+def _min_raise(last_bid, total_dice, rng):
+    """
+    Menor aumento válido: mesma quantidade com face maior, ou quantidade + 1.
+    """
+    q, f = last_bid["quantity"], last_bid["face"]
+    if q > 0 and f < 6 and rng.random() < 0.5:
+        return q, rng.randint(f + 1, 6)
+    if q + 1 <= total_dice:
+        return q + 1, rng.randint(1, 6)
+    if f < 6:
+        return q, f + 1
+    return None
+
+def random_policy(view, rng=random):
+    """
+    Aumenta a aposta pelo mínimo; duvida quando a aposta passa do esperado
+    (dados próprios que batem + 1/3 dos dados desconhecidos) ou não dá para aumentar.
+    """
+    last_bid = view["last_bid"]
+    q, f = last_bid["quantity"], last_bid["face"]
+    if q > 0:
+        mine = sum(1 for d in view["dice"] if d == f or (d == 1 and f != 1))
+        unknown = view["total_dice"] - len(view["dice"])
+        expected = mine + unknown / (6 if f == 1 else 3)
+        if q > expected + 1:
+            return "challenge", None
+    raise_to = _min_raise(last_bid, view["total_dice"], rng)
+    if raise_to is None:
+        return "challenge", None
+    return "bid", {"quantity": raise_to[0], "face": raise_to[1]}
+
+def always_challenge_policy(view, rng=random):
+    """
+    Abre com '1x <face>' e duvida de qualquer aposta: partidas curtas, bom para medir vazão.
+    """
+    if view["last_bid"]["quantity"] == 0:
+        return "bid", {"quantity": 1, "face": rng.randint(2, 6)}
+    return "challenge", None
+
+def odds_policy(view, rng=random):
+    """
+    Usa o oráculo exato (odds.py): duvida se a aposta na mesa tem menos de 50%
+    de chance; senão faz, entre os aumentos próximos, o mais provável.
+    """
+    dice = view["dice"]
+    total = view["total_dice"]
+    unknown = total - len(dice)
+    q, f = view["last_bid"]["quantity"], view["last_bid"]["face"]
+    if q > 0 and bid_probability(dice, unknown, q, f) < 0.5:
+        return "challenge", None
+    candidates = [(nq, nf) for nq in range(max(q, 1), min(total, q + 2) + 1) for nf in range(1, 7)
+                  if nq > q or nf > f]
+    if not candidates:
+        return "challenge", None
+    best = max(candidates, key=lambda b: (bid_probability(dice, unknown, b[0], b[1]), -b[0], rng.random()))
+    return "bid", {"quantity": best[0], "face": best[1]}
+
+POLICIES = {
+    "random": random_policy,
+    "challenge": always_challenge_policy,
+    "odds": odds_policy,
+}
+
+def load_policy(spec):
+    """
+    'random' / 'challenge' ou 'modulo:funcao' para uma política externa.
+    """
+    if spec in POLICIES:
+        return POLICIES[spec]
+    module, _, func = spec.partition(":")
+    return getattr(importlib.import_module(module), func)
+
+# =======================
+# Estatísticas
+# =======================
+class Stats:
+    def __init__(self):
+        self.bid_latencies = []   # segundos entre 'bid' enviado e a próxima versão do estado
+        self.first_turn = []      # segundos entre 'set_name' e o primeiro estado da mesa (fila + início)
+        self.rounds = []          # segundos entre o 'round_start' e o 'reveal_all' da mesma rodada
+        self.games = 0.0          # cada bot soma 1/len(mesa) ao ver 'game_over'
+        self.errors = Counter()   # {"error_msg": n, "connect": n, "protocol": n, ...}
+        self.messages = 0
+        self.spectator_messages = 0
+        self.spectator_bytes = 0
+        self.spectated = 0        # Partidas assistidas até o 'game_over'
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def merge(self, other):
+        """
+        Soma os números de outro processo gerador (ver --procs).
+        """
+        self.bid_latencies += other.bid_latencies
+        self.first_turn += other.first_turn
+        self.rounds += other.rounds
+        self.games += other.games
+        self.errors.update(other.errors)
+        self.messages += other.messages
+        self.spectator_messages += other.spectator_messages
+        self.spectator_bytes += other.spectator_bytes
+        self.spectated += other.spectated
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def report(self):
+        lat = sorted(self.bid_latencies)
+        first = sorted(self.first_turn)
+        rounds = sorted(self.rounds)
+        elapsed = self.elapsed()
+        return {
+            "elapsed_s": elapsed,
+            "bids": len(lat),
+            "bid_latency_ms": {
+                "p50": percentile(lat, 50) * 1000,
+                "p95": percentile(lat, 95) * 1000,
+                "p99": percentile(lat, 99) * 1000,
+            },
+            "first_turn_ms": {
+                "p50": percentile(first, 50) * 1000,
+                "p95": percentile(first, 95) * 1000,
+                "p99": percentile(first, 99) * 1000,
+            },
+            "round_ms": {
+                "p50": percentile(rounds, 50) * 1000,
+                "p95": percentile(rounds, 95) * 1000,
+                "p99": percentile(rounds, 99) * 1000,
+            },
+            "games": round(self.games),
+            "games_per_s": self.games / elapsed if elapsed else 0.0,
+            "messages_per_s": self.messages / elapsed if elapsed else 0.0,
+            "spectator_messages_per_s": self.spectator_messages / elapsed if elapsed else 0.0,
+            "spectator_bytes_per_s": self.spectator_bytes / elapsed if elapsed else 0.0,
+            "spectated_games": self.spectated,
+            "errors": dict(self.errors),
+        }
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+# =======================
+# Bot
+# =======================
+async def play_game(bot_id, args, stats, policy, rng):
+    """
+    Uma conexão = uma partida. Retorna quando a partida termina ou a conexão cai.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError:
+        stats.errors["connect"] += 1
+        await asyncio.sleep(0.5)
+        return
+
+    name = f"bot{bot_id}"
+    offered = [CODEC_BINARY, CODEC_JSON] if args.codec == CODEC_BINARY else None
+    codec = CODEC_JSON
+    hello = {"name": name}
+    if offered:
+        hello["codecs"] = offered
+    if args.state == "delta":
+        hello["features"] = ["delta"]
+    if args.rating_spread:
+        hello["rating"] = rng.randint(1500 - args.rating_spread, 1500 + args.rating_spread)
+    writer.write(encode_message("set_name", hello))
+    joined_at = time.perf_counter()
+
+    decoder = FrameDecoder()
+    dice = []
+    state = {"players": [], "last_bid": {"quantity": 0, "face": 0}}
+    seq = 0
+    resyncing = False
+    bid_sent_at = None
+    round_at = None
+    last_error = False
+    try:
+        while True:
+            raw = await reader.read(65536)
+            if not raw:
+                stats.errors["disconnected"] += 1
+                return
+            for msg in decoder.feed(raw):
+                stats.messages += 1
+                tipo = msg.get("type")
+                payload = msg.get("payload")
+
+                if tipo == "codec":
+                    codec = payload["codec"]
+                elif tipo == "round_start":
+                    dice = payload["dice"]
+                    round_at = time.perf_counter()
+                elif tipo == "reveal_all":
+                    if round_at is not None:
+                        stats.rounds.append(time.perf_counter() - round_at)
+                        round_at = None
+                elif tipo in ("game_update", "state_snapshot", "state_delta"):
+                    if tipo == "game_update":
+                        state = payload["state"]
+                    elif tipo == "state_snapshot":
+                        state, seq = payload["state"], payload["seq"]
+                        resyncing = False
+                    elif payload["seq"] == seq + 1 and not resyncing:
+                        apply_delta(state, payload)
+                        seq += 1
+                    else:
+                        if not resyncing and payload["seq"] > seq:
+                            stats.errors["seq_gap"] += 1
+                            writer.write(encode_message("resync", None, codec))
+                            resyncing = True
+                        continue
+                    if joined_at is not None:
+                        stats.first_turn.append(time.perf_counter() - joined_at)
+                        joined_at = None
+                    if bid_sent_at is not None:
+                        stats.bid_latencies.append(time.perf_counter() - bid_sent_at)
+                        bid_sent_at = None
+                elif tipo == "your_turn":
+                    view = {
+                        "name": name,
+                        "dice": dice,
+                        "last_bid": state["last_bid"],
+                        "players": state["players"],
+                        "total_dice": sum(p["dice_count"] for p in state["players"]),
+                    }
+                    action, action_payload = policy(view, rng)
+                    if last_error and state["last_bid"]["quantity"] > 0:
+                        # A política errou na jogada anterior: não insiste
+                        action, action_payload = "challenge", None
+                    last_error = False
+                    if action == "bid":
+                        bid_sent_at = time.perf_counter()
+                    writer.write(encode_message(action, action_payload, codec))
+                elif tipo == "error":
+                    stats.errors["error_msg"] += 1
+                    last_error = True
+                elif tipo == "game_over":
+                    stats.games += 1 / max(1, len(state["players"]))
+                    return
+    except ProtocolError:
+        stats.errors["protocol"] += 1
+    except (ConnectionError, OSError):
+        stats.errors["connection"] += 1
+    finally:
+        writer.close()
+
+async def watch_game(args, stats):
+    """
+    Um espectador: assiste a uma partida até o 'game_over' (ou até a conexão cair).
+    """
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError:
+        stats.errors["spectator_connect"] += 1
+        await asyncio.sleep(0.5)
+        return
+    request = {"codecs": [CODEC_BINARY, CODEC_JSON]} if args.codec == CODEC_BINARY else {}
+    writer.write(encode_message("spectate", request))
+    decoder = FrameDecoder()
+    try:
+        while True:
+            raw = await reader.read(65536)
+            if not raw:
+                return
+            stats.spectator_bytes += len(raw)
+            for msg in decoder.feed(raw):
+                stats.spectator_messages += 1
+                tipo = msg.get("type")
+                if tipo == "error":
+                    await asyncio.sleep(0.2)  # Nenhuma mesa em andamento ainda
+                    return
+                if tipo == "game_over":
+                    stats.spectated += 1
+                elif tipo == "round_start":
+                    stats.errors["spectator_saw_dice"] += 1
+    except ProtocolError:
+        stats.errors["spectator_protocol"] += 1
+    except (ConnectionError, OSError):
+        stats.errors["spectator_connection"] += 1
+    finally:
+        writer.close()
+
+async def run_spectator(args, stats, deadline):
+    while time.perf_counter() < deadline:
+        await watch_game(args, stats)
+
+async def run_bot(bot_id, args, stats, policy, deadline):
+    rng = random.Random(args.seed * 1_000_003 + bot_id if args.seed is not None else None)
+    while time.perf_counter() < deadline:
+        await play_game(bot_id, args, stats, policy, rng)
+
+async def run(args, stats=None, first_id=0):
+    """
+    Dispara args.bots bots (no ritmo de args.ramp conexões/s, 0 = todos de uma vez)
+    e espera até args.duration segundos. Retorna o Stats preenchido.
+    """
+    stats = stats or Stats()
+    policy = load_policy(args.policy)
+    deadline = time.perf_counter() + args.duration
+    tasks = []
+    for i in range(first_id, first_id + args.bots):
+        tasks.append(asyncio.create_task(run_bot(i, args, stats, policy, deadline)))
+        if args.ramp:
+            await asyncio.sleep(1 / args.ramp)
+    for _ in range(args.spectators):
+        tasks.append(asyncio.create_task(run_spectator(args, stats, deadline)))
+    # Bots no meio de uma partida quando o tempo acaba são cancelados
+    await asyncio.wait(tasks, timeout=max(0, deadline - time.perf_counter()))
+    stats.finished = time.perf_counter()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+def _run_shard(shard):
+    args, first_id = shard
+    return asyncio.run(run(args, first_id=first_id))
+
+def run_procs(args):
+    """
+    Divide os bots entre args.procs processos: contra um servidor com vários
+    processos (supervisor.py), um gerador de um processo só vira o gargalo.
+    """
+    shards = []
+    first_id = 0
+    for i in range(args.procs):
+        shard = argparse.Namespace(**vars(args))
+        shard.bots = args.bots // args.procs + (1 if i < args.bots % args.procs else 0)
+        shard.spectators = args.spectators // args.procs + (1 if i < args.spectators % args.procs else 0)
+        shard.ramp = args.ramp / args.procs
+        shards.append((shard, first_id))
+        first_id += shard.bots
+    stats = Stats()
+    elapsed = 0.0
+    with multiprocessing.Pool(args.procs) as pool:
+        for part in pool.map(_run_shard, shards):
+            stats.merge(part)
+            elapsed = max(elapsed, part.elapsed())
+    stats.finished = stats.started + elapsed
+    return stats
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gerador de carga headless para o servidor de Liar's Dice")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=65432)
+    parser.add_argument("--bots", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10, help="segundos de carga")
+    parser.add_argument("--ramp", type=float, default=0, help="novas conexões por segundo (0 = todas de uma vez)")
+    parser.add_argument("--policy", default="random", help="random | challenge | odds | modulo:funcao")
+    parser.add_argument("--codec", default=CODEC_JSON, choices=[CODEC_JSON, CODEC_BINARY])
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--state", default="delta", choices=["delta", "full"],
+                        help="delta = state_snapshot/state_delta; full = game_update a cada turno")
+    parser.add_argument("--rating-spread", type=int, default=0,
+                        help="envia rating aleatório em 1500 ± N (0 = sem rating)")
+    parser.add_argument("--spectators", type=int, default=0,
+                        help="conexões que só assistem ('spectate') à mesa mais antiga em andamento")
+    parser.add_argument("--procs", type=int, default=1,
+                        help="processos geradores (divide os bots entre eles)")
+    parser.add_argument("--json", action="store_true", help="imprime o relatório em JSON")
+    return parser.parse_args(argv)
+
+def print_report(r):
+    lat = r["bid_latency_ms"]
+    print(f"tempo:        {r['elapsed_s']:.1f} s")
+    print(f"partidas:     {r['games']} ({r['games_per_s']:.1f}/s)")
+    print(f"mensagens/s:  {r['messages_per_s']:.0f}")
+    print(f"bid -> estado ({r['bids']} amostras): "
+          f"p50 {lat['p50']:.2f} ms  p95 {lat['p95']:.2f} ms  p99 {lat['p99']:.2f} ms")
+    rounds = r["round_ms"]
+    print(f"rodada:       p50 {rounds['p50']:.1f} ms  p95 {rounds['p95']:.1f} ms  p99 {rounds['p99']:.1f} ms")
+    first = r["first_turn_ms"]
+    print(f"set_name -> 1º turno: p50 {first['p50']:.0f} ms  p95 {first['p95']:.0f} ms  p99 {first['p99']:.0f} ms")
+    if r["spectated_games"] or r["spectator_messages_per_s"]:
+        print(f"espectadores: {r['spectator_messages_per_s']:.0f} mensagens/s, "
+              f"{r['spectator_bytes_per_s'] / 1024:.0f} KB/s, {r['spectated_games']} partidas assistidas")
+    print(f"erros:        {r['errors'] or 'nenhum'}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    stats = run_procs(args) if args.procs > 1 else asyncio.run(run(args))
+    report = stats.report()
+    if args.json:
+        json.dump(report, sys.stdout)
+        print()
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    main()
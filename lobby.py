@@ -0,0 +1,175 @@
+import time
+from bisect import bisect_left, insort
+from collections import deque
+
+"""
+Matchmaking contínuo.
+
+Quem manda 'set_name' entra numa fila; mesas são formadas assim que há
+jogadores suficientes, sem esperar um "lote" fechar:
+- 'table_size' jogadores no mesmo balde de rating -> mesa cheia na hora;
+- alguém esperando há mais de 'max_wait' segundos -> a mesa sai com quem
+  houver (mínimo 'min_size'), completando com os baldes de rating vizinhos.
+
+Estruturas (todas sublineares no número de jogadores na fila):
+- _buckets: {balde: deque de entradas}, em ordem de chegada;
+- _keys: lista ordenada dos baldes não vazios (bisect para achar vizinhos);
+- _by_age: todas as entradas em ordem de chegada, para o 'sweep' só olhar
+  o começo da fila.
+Quem sai da fila (desconectou ou já foi sentado) é só marcado como inativo
+e descartado quando aparece na frente de uma deque (remoção preguiçosa).
+"""
+
+class _Entry:
+    __slots__ = ("player", "key", "queued_at", "active")
+
+    def __init__(self, player, key, queued_at):
+        self.player = player
+        self.key = key
+        self.queued_at = queued_at
+        self.active = True
+
+class Matchmaker:
+    """
+    Parâmetros:
+        on_match (callable) - on_match(players, queued_at) chamado a cada mesa
+            formada, com os jogadores em ordem de chegada e o instante em que
+            cada um entrou na fila.
+        table_size (int) - jogadores de uma mesa cheia.
+        min_size (int) - mínimo para sair uma mesa incompleta depois de max_wait.
+        max_wait (float) - segundos até aceitar mesa incompleta / baldes vizinhos.
+        bucket_width (int | None) - largura do balde de rating; None = um balde só.
+        clock (callable) - fonte de tempo (time.monotonic); injetável para simulações.
+    """
+
+    def __init__(self, on_match, table_size, min_size=2, max_wait=10.0,
+                 bucket_width=None, clock=time.monotonic):
+        self.on_match = on_match
+        self.table_size = table_size
+        self.min_size = min(min_size, table_size)
+        self.max_wait = max_wait
+        self.bucket_width = bucket_width
+        self.clock = clock
+        self._buckets = {}        # {balde: deque[_Entry]}
+        self._sizes = {}          # {balde: entradas ativas}
+        self._keys = []           # baldes com alguém esperando, ordenados
+        self._by_age = deque()    # todas as entradas, por ordem de chegada
+        self._entries = {}        # {id(player): _Entry}
+        self.waiting = 0
+
+    def bucket_of(self, rating):
+        if self.bucket_width is None or rating is None:
+            return 0
+        return int(rating) // self.bucket_width
+
+    # =======================
+    # Entrada e saída da fila
+    # =======================
+    def enqueue(self, player, rating=None):
+        """
+        Coloca o jogador na fila e tenta formar uma mesa cheia no balde dele.
+        """
+        key = self.bucket_of(rating)
+        entry = _Entry(player, key, self.clock())
+        self._entries[id(player)] = entry
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+            self._sizes[key] = 0
+            insort(self._keys, key)
+        bucket.append(entry)
+        self._sizes[key] += 1
+        self._by_age.append(entry)
+        self.waiting += 1
+
+        if self._sizes[key] >= self.table_size:
+            self._match(self._take(key, self.table_size))
+
+    def remove(self, player):
+        """
+        Tira da fila um jogador que desconectou antes de ser sentado.
+        """
+        entry = self._entries.pop(id(player), None)
+        if entry is not None and entry.active:
+            self._deactivate(entry)
+
+    def queued(self):
+        """
+        Jogadores ainda na fila, em ordem de chegada.
+        """
+        return [e.player for e in self._by_age if e.active]
+
+    def wait_time(self, player, now=None):
+        entry = self._entries.get(id(player))
+        if entry is None:
+            return None
+        return (now if now is not None else self.clock()) - entry.queued_at
+
+    # =======================
+    # Formação de mesas
+    # =======================
+    def sweep(self, now=None):
+        """
+        Chamado periodicamente: para cada jogador que passou de max_wait
+        (só o começo de _by_age é visitado), tenta formar uma mesa com quem houver.
+        Retorna quantas mesas foram formadas.
+        """
+        now = now if now is not None else self.clock()
+        formed = 0
+        by_age = self._by_age
+        while by_age:
+            head = by_age[0]
+            if not head.active:
+                by_age.popleft()
+                continue
+            if now - head.queued_at < self.max_wait or self.waiting < self.min_size:
+                break  # Ainda dentro do prazo, ou não há gente para mesa nenhuma
+            # Com 'waiting' >= min_size, abrir para os vizinhos sempre junta o mínimo
+            self._match(self._gather_around(head.key, self.table_size))
+            formed += 1
+        return formed
+
+    def _gather_around(self, key, count):
+        """
+        Junta até 'count' jogadores começando pelo balde 'key' e abrindo para
+        os baldes vizinhos, o mais próximo primeiro.
+        """
+        group = self._take(key, count)
+        keys = self._keys
+        # Cada balde visitado é esvaziado (e sai de _keys) ou completa o grupo
+        while len(group) < count:
+            i = bisect_left(keys, key)
+            left = keys[i - 1] if i > 0 else None
+            right = keys[i] if i < len(keys) else None
+            if left is None and right is None:
+                break
+            if left is None or (right is not None and right - key < key - left):
+                group += self._take(right, count - len(group))
+            else:
+                group += self._take(left, count - len(group))
+        return group
+
+    def _take(self, key, count):
+        bucket = self._buckets.get(key)
+        group = []
+        while bucket and len(group) < count:
+            entry = bucket.popleft()
+            if entry.active:
+                group.append(entry)
+                self._deactivate(entry)
+        return group
+
+    def _deactivate(self, entry):
+        entry.active = False
+        self.waiting -= 1
+        self._entries.pop(id(entry.player), None)
+        key = entry.key
+        self._sizes[key] -= 1
+        if self._sizes[key] == 0:
+            del self._sizes[key]
+            del self._buckets[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+    def _match(self, group):
+        group.sort(key=lambda e: e.queued_at)
+        self.on_match([e.player for e in group], [e.queued_at for e in group])
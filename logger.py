@@ -0,0 +1,186 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+"""
+Logger estruturado assíncrono.
+
+Quem chama log() só monta o registro e o coloca numa fila (deque: append e
+popleft são atômicos no CPython, sem lock). Uma thread de fundo acorda a cada
+'flush_interval' segundos (ou quando a fila passa de 'batch_size'), serializa
+o lote em JSON e grava tudo com um único write, rotacionando o arquivo por
+tamanho e/ou por tempo. Assim nenhum open()/print()/json.dumps() acontece
+no caminho do jogo.
+"""
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "ERROR": ERROR}
+
+def _ts(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%d-%m-%Y %H:%M:%S")
+
+class AsyncLogger:
+    """
+    Parâmetros:
+        path (str) - Arquivo de log.
+        level (int | str) - Nível mínimo gravado (DEBUG, INFO, WARNING, ERROR).
+        sampling (dict) - {evento: fração em 0..1} para amostrar eventos ruidosos,
+            ex.: {"SEND": 0.01} grava ~1% dos SEND. 0 desliga o evento.
+        console (bool) - Também ecoa as linhas no stdout (pela thread de fundo).
+        max_bytes (int) - Rotaciona quando o arquivo passa desse tamanho (0 = nunca).
+        rotate_seconds (float) - Rotaciona a cada N segundos (0 = nunca).
+        backup_count (int) - Quantos arquivos antigos (path.1, path.2, ...) manter.
+        flush_interval (float) - Intervalo máximo entre gravações.
+        batch_size (int) - Acorda a thread antes do intervalo quando a fila chega nesse tamanho.
+        max_pending (int) - Limite da fila; acima dele os registros são descartados e contados.
+    """
+
+    def __init__(self, path, level=INFO, sampling=None, console=False,
+                 max_bytes=10 * 1024 * 1024, rotate_seconds=0, backup_count=5,
+                 flush_interval=0.5, batch_size=1024, max_pending=100000):
+        self.path = path
+        self.level = LEVELS.get(level, level)
+        self.sampling = dict(sampling or {})
+        self.console = console
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.dropped = 0            # Registros descartados por fila cheia
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._file = None
+        self._opened_at = 0.0
+        self._rng = random.Random()  # Não mexe no estado global do 'random' (usado nos dados)
+
+    # =======================
+    # Lado de quem loga (caminho quente)
+    # =======================
+    def enabled_for(self, level):
+        return level >= self.level
+
+    @property
+    def pending(self):
+        """
+        Registros na fila, ainda não gravados.
+        """
+        return len(self._queue)
+
+    def log(self, event, level=INFO, **fields):
+        """
+        Enfileira um registro. Nunca faz I/O nem bloqueia.
+        Os campos não devem ser alterados depois (são serializados depois, na thread de fundo).
+        """
+        if level < self.level:
+            return
+        rate = self.sampling.get(event)
+        if rate is not None and (rate <= 0 or self._rng.random() >= rate):
+            return
+        queue = self._queue
+        if len(queue) >= self.max_pending:
+            self.dropped += 1
+            return
+        queue.append((time.time(), event, fields))
+        if len(queue) >= self.batch_size:
+            self._wakeup.set()
+
+    # =======================
+    # Thread de escrita
+    # =======================
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="logger", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Grava o que ainda estiver na fila e encerra a thread.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self._flush()
+        self._close_file()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        queue = self._queue
+        if not queue:
+            return
+        lines = []
+        popleft = queue.popleft
+        try:
+            while True:
+                epoch, event, fields = popleft()
+                record = {"ts": _ts(epoch), "event": event, **fields}
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+        except IndexError:
+            pass
+        if self.dropped:
+            lines.append(json.dumps({"ts": _ts(time.time()), "event": "LOG_DROPPED", "count": self.dropped}))
+            self.dropped = 0
+        data = "\n".join(lines) + "\n"
+        if self.console:
+            try:
+                sys.stdout.write(data)
+                sys.stdout.flush()
+            except Exception:
+                pass
+        try:
+            f = self._open_file()
+            f.write(data)
+            f.flush()
+            self._maybe_rotate(f)
+        except Exception:
+            pass
+
+    # =======================
+    # Arquivo e rotação
+    # =======================
+    def _open_file(self):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._opened_at = time.time()
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
+
+    def _maybe_rotate(self, f):
+        by_size = self.max_bytes and f.tell() >= self.max_bytes
+        by_time = self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds
+        if not (by_size or by_time):
+            return
+        self._close_file()
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+
+"""
+Métricas do servidor: contadores, medidores e histogramas baratos o bastante
+para o caminho quente, expostos em texto no formato do Prometheus por um
+endpoint HTTP local (GET /metrics), e um profiler por amostragem opcional
+(GET /profile).
+
+Custo por medida: um inc() é uma soma num atributo; um observe() é uma busca
+binária em ~12 limites + duas somas. Nada é formatado até alguém pedir /metrics.
+Métricas com rótulos guardam um filho por combinação de valores (labels()),
+que o chamador pode guardar para não repetir a busca no dicionário.
+
+    registry = Registry()
+    msgs = registry.counter("ld_messages_total", "Mensagens recebidas", ["type"])
+    msgs.labels("bid").inc()
+    await serve_metrics(registry, "127.0.0.1", 9100)
+"""
+
+# Segundos: de 50 µs a 2,5 s
+TIME_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024)
+
+def _fmt(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+def _label_str(names, values, extra=""):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# =======================
+# Tipos de métrica
+# =======================
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+
+    def labels(self, *values):
+        """
+        O filho de uma combinação de rótulos (criado na primeira vez).
+        """
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self):
+        if self.labelnames:
+            for values, child in sorted(self._children.items()):
+                yield from child._child_samples(self.name, self.labelnames, values)
+        else:
+            yield from self._child_samples(self.name, (), ())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name="", help_text="", labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter()
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def _child_samples(self, name, names, values):
+        yield f"{name}{_label_str(names, values)} {_fmt(self.value)}"
+
+class Gauge(_Metric):
+    """
+    Valor instantâneo. Com 'fn', o valor é lido na hora do /metrics
+    (ex.: tamanho de uma fila), sem custo nenhum no caminho quente.
+    """
+    kind = "gauge"
+
+    def __init__(self, name="", help_text="", labelnames=(), fn=None):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+        self.fn = fn
+
+    def _new_child(self):
+        return Gauge()
+
+    def set(self, value):
+        self.value = value
+
+    def _child_samples(self, name, names, values):
+        value = self.fn() if self.fn is not None else self.value
+        yield f"{name}{_label_str(names, values)} {_fmt(value)}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name="", help_text="", labelnames=(), buckets=TIME_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # O último é o +Inf
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(buckets=self.bounds)
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """
+        Estimativa pelo limite superior do balde (para relatórios locais).
+        """
+        total = self.count
+        if not total:
+            return 0.0
+        target = q * total
+        running = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            running += n
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def _child_samples(self, name, names, values):
+        running = 0
+        for bound, n in zip(self.bounds + ("+Inf",), self.counts):
+            running += n
+            le = 'le="%s"' % (bound if bound == "+Inf" else _fmt(bound))
+            yield f"{name}_bucket{_label_str(names, values, le)} {running}"
+        yield f"{name}_sum{_label_str(names, values)} {_fmt(self.sum)}"
+        yield f"{name}_count{_label_str(names, values)} {running}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), fn=None):
+        return self._add(Gauge(name, help_text, labelnames, fn))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=TIME_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """
+        Texto no formato de exposição do Prometheus (versão 0.0.4).
+        """
+        return "\n".join(m.render() for m in self.metrics) + "\n"
+
+# =======================
+# Profiler por amostragem
+# =======================
+class SamplingProfiler:
+    """
+    Uma thread que, 'hz' vezes por segundo, olha a pilha da thread alvo
+    (sys._current_frames) e conta a pilha inteira. Não instrumenta nada:
+    o custo é só o da amostra (a thread segura o GIL por alguns µs).
+
+    report() devolve as pilhas no formato "colapsado" (func;func;func N),
+    que ferramentas de flame graph leem direto.
+    """
+
+    def __init__(self, hz=100, thread_id=None, max_depth=40):
+        self.interval = 1.0 / hz
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks = _Tally()
+        self._lock = threading.Lock()   # stacks: a thread de amostragem soma, report() lê no event loop
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        target = self.thread_id
+        while self._running:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(target)
+            # Só os objetos de código: o texto é montado em report(), fora da amostra
+            stack = []
+            depth = self.max_depth
+            while frame is not None and depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+                depth -= 1
+            key = tuple(stack)
+            with self._lock:
+                self.stacks[key] += 1
+                self.samples += 1
+
+    def report(self, limit=200):
+        with self._lock:
+            stacks = self.stacks.copy()  # Iterar o original enquanto a amostragem soma quebra o dict
+        lines = []
+        for stack, n in stacks.most_common(limit):
+            names = (f"{os.path.basename(c.co_filename)}:{c.co_name}" for c in reversed(stack))
+            lines.append(f"{';'.join(names)} {n}")
+        return "\n".join(lines) + "\n"
+
+# =======================
+# Endpoint HTTP
+# =======================
+async def serve_metrics(registry, host="127.0.0.1", port=9100, profiler=None):
+    """
+    HTTP mínimo (uma requisição por conexão): GET /metrics e, com profiler,
+    GET /profile. Roda no mesmo event loop do servidor; gerar o texto leva
+    microssegundos por métrica.
+    """
+    async def handle(reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+                pass  # Cabeçalhos: ignorados
+            parts = request.decode("latin-1").split()
+            path = parts[1] if len(parts) > 1 else "/"
+            if path.startswith("/metrics"):
+                status, body = "200 OK", registry.render()
+            elif path.startswith("/profile") and profiler is not None:
+                status, body = "200 OK", profiler.report()
+            else:
+                status, body = "404 Not Found", "not found\n"
+            data = body.encode("utf-8")
+            writer.write(f"HTTP/1.0 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,115 @@
+from functools import lru_cache
+from math import comb
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ela a API em lote devolve listas
+    np = None
+
+"""
+Oráculo exato de probabilidade de apostas.
+
+Dado a mão do jogador e quantos dados ele não vê, qual a chance de a aposta
+(quantidade, face) ser verdadeira? Cada dado desconhecido bate com a face com
+probabilidade:
+- face 1 -> 1/6 (só contam os 1);
+- face 2..6 com ases coringas (RULE_WILD_ONES) -> 2/6 (a face ou um 1);
+- face 2..6 sem coringas -> 1/6.
+Então a resposta é a cauda de uma binomial: P(X >= quantidade - já_tenho),
+X ~ Bin(dados_desconhecidos, p). As caudas são calculadas uma vez por
+(n, p) e memoizadas; depois cada consulta é só uma indexação.
+"""
+
+P_SINGLE = 1 / 6  # face exata
+P_WILD = 2 / 6    # face ou ás
+
+@lru_cache(maxsize=None)
+def tail_table(n, p):
+    """
+    Parâmetros:
+        n (int) - Número de dados desconhecidos.
+        p (float) - Chance de um dado bater (P_SINGLE ou P_WILD).
+
+    Retorna:
+        tuple[float] - t[k] = P(X >= k) para k = 0..n+1, com X ~ Bin(n, p) (t[n+1] = 0).
+    """
+    pmf = [comb(n, k) * p ** k * (1 - p) ** (n - k) for k in range(n + 1)]
+    tail = [0.0] * (n + 2)
+    acc = 0.0
+    for k in range(n, -1, -1):
+        acc += pmf[k]
+        tail[k] = min(acc, 1.0)
+    tail[0] = 1.0
+    return tuple(tail)
+
+@lru_cache(maxsize=None)
+def _tail_array(n, p):
+    return np.array(tail_table(n, p))
+
+def face_probability(face, wild_ones=True):
+    return P_WILD if wild_ones and face != 1 else P_SINGLE
+
+def matches_by_face(hand, wild_ones=True):
+    """
+    Retorna [0, m1, ..., m6]: quantos dados da mão contam para cada face
+    (mesma regra de server.count_matches_in_hand).
+    """
+    counts = [0] * 7
+    for d in hand:
+        counts[d] += 1
+    aces = counts[1]
+    return [0, aces] + [c + aces if wild_ones else c for c in counts[2:]]
+
+def bid_probability(hand, unknown_dice, quantity, face, wild_ones=True):
+    """
+    Probabilidade exata de haver pelo menos 'quantity' dados que contam como 'face'
+    na mesa, sabendo a própria mão e que existem 'unknown_dice' dados escondidos.
+    """
+    need = quantity - matches_by_face(hand, wild_ones)[face]
+    if need <= 0:
+        return 1.0
+    if need > unknown_dice:
+        return 0.0
+    return tail_table(unknown_dice, face_probability(face, wild_ones))[need]
+
+def bid_probabilities(hand, unknown_dice, wild_ones=True):
+    """
+    Avalia todas as apostas de uma vez.
+
+    Retorna:
+        P[q][f] para q = 0..len(hand)+unknown_dice e f = 0..6 (a coluna 0 fica zerada).
+        Com NumPy é um ndarray (total+1, 7); sem NumPy, lista de listas.
+    """
+    total = len(hand) + unknown_dice
+    matches = matches_by_face(hand, wild_ones)
+
+    if np is None:
+        table = [[0.0] * 7 for _ in range(total + 1)]
+        for f in range(1, 7):
+            tail = tail_table(unknown_dice, face_probability(f, wild_ones))
+            for q in range(total + 1):
+                need = q - matches[f]
+                table[q][f] = 1.0 if need <= 0 else tail[min(need, unknown_dice + 1)]
+        return table
+
+    q = np.arange(total + 1)[:, None]
+    need = np.clip(q - np.array(matches)[None, 1:], 0, unknown_dice + 1)
+    single = _tail_array(unknown_dice, P_SINGLE)
+    wild = _tail_array(unknown_dice, P_WILD if wild_ones else P_SINGLE)
+    out = np.zeros((total + 1, 7))
+    out[:, 1] = single[need[:, 0]]
+    out[:, 2:] = wild[need[:, 1:]]
+    return out
+
+def legal_bids_mask(last_bid, total_dice):
+    """
+    Máscara (total+1, 7) das apostas que superam 'last_bid' (mesmas regras de server.handle_action):
+    quantidade maior, ou mesma quantidade com face maior; face 1..6; quantidade <= total.
+    """
+    lq, lf = last_bid["quantity"], last_bid["face"]
+    if np is None:
+        return [[1 <= f <= 6 and q >= 1 and (q > lq or (q == lq and f > lf))
+                 for f in range(7)] for q in range(total_dice + 1)]
+    q = np.arange(total_dice + 1)[:, None]
+    f = np.arange(7)[None, :]
+    return (f >= 1) & (q >= 1) & ((q > lq) | ((q == lq) & (f > lf)))
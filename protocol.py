@@ -1,10 +1,342 @@
 import json #Importa a biblioteca json nativa do Python.
+import struct
 """ 
 O JSON (JavaScript Object Notation) é um formato de texto leve e legível que serve como um intermediário.
 Nós convertemos nosso dicionário Python em uma string de texto formatada em JSON, enviamos essa string pela rede e, no outro lado, a convertemos de volta para um dicionário.
+
+Enquadramento (framing):
+O TCP é um fluxo de bytes, não de mensagens. Um único recv() pode trazer duas mensagens
+coladas (ex.: 'game_update' + 'your_turn') ou só metade de uma ('reveal_all' grande).
+Por isso cada mensagem é enviada como um quadro:
+
+    [tamanho: 4 bytes, big-endian] [corpo JSON: 'tamanho' bytes]
+
+e o lado que recebe usa um FrameDecoder para remontar as mensagens completas.
+
+Codecs:
+O corpo pode ser JSON (padrão, qualquer tipo de mensagem) ou binário compacto
+(CODEC_BINARY) para as mensagens mais frequentes: 'bid', 'challenge', 'your_turn',
+'round_start' e 'game_update'. O cliente pede o binário no 'set_name'
+({"name": ..., "codecs": ["bin1"]}) e o servidor confirma com uma mensagem 'codec'.
+Um corpo JSON começa com '{' (ou com espaços antes dele); um corpo binário começa
+com um byte de tipo (TAG_*), que não é nenhum dos dois. Assim quem recebe detecta
+o formato quadro a quadro, e qualquer mensagem sem layout binário continua indo
+em JSON.
+
+Estado versionado:
+Clientes que pedem {"features": ["delta"]} no 'set_name' recebem, em vez do
+'game_update' completo a cada turno, um 'state_snapshot' ({"seq", "state"}) e
+depois só o que mudou em 'state_delta' ({"seq", "last_bid"?, "turn"?, "dice"?}).
+Se um 'seq' pular, o cliente pede 'resync' e recebe um novo snapshot.
+
+Espectadores:
+Uma conexão que começa com 'spectate' ({"table"?, "codecs"?}) em vez de
+'set_name' recebe 'spectating' ({"table", "players"}) e, daí em diante, só os
+eventos públicos da mesa: 'game_update' (sempre o estado completo; versões
+intermediárias podem ser puladas), 'info', 'reveal_all' e 'game_over'. Dados
+dos jogadores nunca; o que o espectador enviar é ignorado.
+
+Placar:
+Com o placar ligado no servidor (--stats-db), 'leaderboard' ({"limit"?,
+"player"?}), antes ou depois do 'set_name', é respondido com 'leaderboard'
+({"top": [{"rank", "name", "games", "wins", "dice_lost", "bluffs_caught",
+"bluffs_called"}], "player": {...} | None}); sem 'player', vale o nome de
+quem pergunta. Servidor sem placar responde com 'error'.
 """
 
-def encode_message(msg_type, payload=None):
+HEADER = struct.Struct('!I')      # Prefixo de tamanho (unsigned int de 32 bits, ordem de rede)
+MAX_FRAME_SIZE = 64 * 1024        # Maior corpo aceito; evita que um peer nos faça alocar memória sem limite
+
+CODEC_JSON = "json"
+CODEC_BINARY = "bin1"
+SUPPORTED_CODECS = (CODEC_BINARY, CODEC_JSON)   # Em ordem de preferência
+
+class ProtocolError(ValueError):
+    """
+    Fluxo recebido viola o protocolo (quadro grande demais, corpo que não decodifica).
+    """
+
+class FrameTooLarge(ProtocolError):
+    """
+    Um quadro anunciou tamanho maior que o limite do FrameDecoder.
+    """
+
+def choose_codec(offered):
+    """
+    Escolhe o codec da conexão a partir da lista enviada pelo cliente no 'set_name'.
+    Sem lista (cliente antigo) ou sem codec em comum -> JSON.
+    """
+    for codec in SUPPORTED_CODECS:
+        if offered and codec in offered:
+            return codec
+    return CODEC_JSON
+
+# =======================
+# Codec binário
+# =======================
+TAG_BID = 0x01          # !BHB  -> tag, quantidade, face
+TAG_CHALLENGE = 0x02    # !B    -> tag
+TAG_YOUR_TURN = 0x03    # !B    -> tag
+TAG_ROUND_START = 0x04  # !BH   -> tag, nº de dados; depois 1 byte para cada 3 dados
+TAG_GAME_UPDATE = 0x05  # !BHBHH -> tag, aposta (qtd, face), índice do turno, nº de jogadores;
+                        #   por jogador: !BB (dados, tamanho do nome) + nome;
+                        #   no fim: !H (tamanho da mensagem) + mensagem
+TAG_STATE_SNAPSHOT = 0x06  # !BI -> tag, seq; depois o estado no layout do game_update, sem a mensagem
+TAG_STATE_DELTA = 0x07     # !BIB -> tag, seq, campos presentes (DELTA_*); depois, nessa ordem:
+                           #   aposta !HB; turno !H; dados !H (n) + n x !HB (índice, dados)
+
+DELTA_BID = 0x01
+DELTA_TURN = 0x02
+DELTA_DICE = 0x04
+
+_TAG = struct.Struct('!B')
+_BID = struct.Struct('!BHB')
+_ROUND_START = struct.Struct('!BH')
+_GAME_UPDATE = struct.Struct('!BHBHH')
+_STATE = struct.Struct('!HBHH')         # Mesmo layout do _GAME_UPDATE, sem a tag
+_SEQ = struct.Struct('!BI')
+_DELTA = struct.Struct('!BIB')
+_PAIR = struct.Struct('!HB')           # (quantidade, face) da aposta ou (índice, dados) de um jogador
+_TURN = struct.Struct('!H')
+_PLAYER = struct.Struct('!BB')
+_STR16 = struct.Struct('!H')
+_NO_TURN = 0xFFFF
+
+# Tabela de inteiros pequenos para os dados: 3 faces (1..6) cabem em um byte (6**3 = 216).
+# DICE_TRIPLES[b] devolve as 3 faces do byte b; codificar é (a-1)*36 + (b-1)*6 + (c-1).
+DICE_TRIPLES = tuple((a, b, c) for a in range(1, 7) for b in range(1, 7) for c in range(1, 7))
+
+_TRIPLE_INDEX = {t: i for i, t in enumerate(DICE_TRIPLES)}
+_FACES = frozenset(range(1, 7))
+
+def pack_dice(dice):
+    """
+    Faces 1..6 -> 1 byte para cada 3 dados (também usado pelo journal.py).
+    """
+    padded = tuple(dice) + (1,) * (-len(dice) % 3)
+    return bytes([_TRIPLE_INDEX[padded[i:i + 3]] for i in range(0, len(padded), 3)])
+
+def unpack_dice(data, count):
+    """
+    Inverso de pack_dice: os 'count' primeiros dados de 'data'.
+    """
+    dice = []
+    for b in data:
+        dice.extend(DICE_TRIPLES[b])
+    return dice[:count]
+
+def _encode_bid(payload):
+    q, f = payload['quantity'], payload['face']
+    if not (type(q) is int and type(f) is int and 0 <= q <= 0xFFFF and 0 <= f <= 0xFF):
+        return None
+    return _BID.pack(TAG_BID, q, f)
+
+def _encode_round_start(payload):
+    dice = payload['dice']
+    if len(payload) != 1 or not _FACES.issuperset(dice):
+        return None
+    return _ROUND_START.pack(TAG_ROUND_START, len(dice)) + pack_dice(dice)
+
+def _pack_state(state, parts):
+    """
+    Acrescenta a 'parts' o estado no layout binário (_STATE + jogadores).
+    Retorna False se o estado foge do layout.
+    """
+    if state.keys() != {'players', 'last_bid', 'current_turn'}:
+        return False
+    players = state['players']
+    bid = state['last_bid']
+    names = [p['name'] for p in players]
+    if state['current_turn'] is None:
+        turn = _NO_TURN
+    elif state['current_turn'] in names:
+        turn = names.index(state['current_turn'])
+    else:
+        return False
+    parts.append(_STATE.pack(bid['quantity'], bid['face'], turn, len(players)))
+    for p in players:
+        if p.keys() != {'name', 'dice_count'}:
+            return False
+        name = p['name'].encode('utf-8')
+        if len(name) > 0xFF or not 0 <= p['dice_count'] <= 0xFF:
+            return False
+        parts.append(_PLAYER.pack(p['dice_count'], len(name)))
+        parts.append(name)
+    return True
+
+def _encode_game_update(payload):
+    parts = [_TAG.pack(TAG_GAME_UPDATE)]
+    if payload.keys() != {'state', 'message'} or not _pack_state(payload['state'], parts):
+        return None
+    message = payload['message'].encode('utf-8')
+    parts.append(_STR16.pack(len(message)))
+    parts.append(message)
+    return b''.join(parts)
+
+def _encode_state_snapshot(payload):
+    parts = [_SEQ.pack(TAG_STATE_SNAPSHOT, payload['seq'])]
+    if payload.keys() != {'seq', 'state'} or not _pack_state(payload['state'], parts):
+        return None
+    return b''.join(parts)
+
+def _encode_state_delta(payload):
+    if not payload.keys() <= {'seq', 'last_bid', 'turn', 'dice'}:
+        return None
+    flags = 0
+    parts = [b'']
+    if 'last_bid' in payload:
+        flags |= DELTA_BID
+        parts.append(_PAIR.pack(payload['last_bid']['quantity'], payload['last_bid']['face']))
+    if 'turn' in payload:
+        flags |= DELTA_TURN
+        parts.append(_TURN.pack(_NO_TURN if payload['turn'] is None else payload['turn']))
+    if 'dice' in payload:
+        flags |= DELTA_DICE
+        parts.append(_STR16.pack(len(payload['dice'])))
+        parts.extend(_PAIR.pack(i, n) for i, n in payload['dice'])
+    parts[0] = _DELTA.pack(TAG_STATE_DELTA, payload['seq'], flags)
+    return b''.join(parts)
+
+# Cada encoder devolve o corpo binário, ou None quando o payload foge do layout
+# (aí a mensagem vai em JSON).
+_BINARY_ENCODERS = {
+    'bid': _encode_bid,
+    'challenge': lambda payload: _TAG.pack(TAG_CHALLENGE),
+    'your_turn': lambda payload: _TAG.pack(TAG_YOUR_TURN),
+    'round_start': _encode_round_start,
+    'game_update': _encode_game_update,
+    'state_snapshot': _encode_state_snapshot,
+    'state_delta': _encode_state_delta,
+}
+
+def _unpack_state(view, pos):
+    """
+    Lê o estado no layout binário a partir de 'pos'. Retorna (estado, próxima posição).
+    """
+    q, f, turn, n = _STATE.unpack_from(view, pos)
+    pos += _STATE.size
+    players = []
+    for _ in range(n):
+        dice_count, size = _PLAYER.unpack_from(view, pos)
+        pos += _PLAYER.size
+        players.append({"name": str(view[pos:pos + size], 'utf-8'), "dice_count": dice_count})
+        pos += size
+    state = {
+        "players": players,
+        "last_bid": {"quantity": q, "face": f},
+        "current_turn": players[turn]["name"] if turn != _NO_TURN else None
+    }
+    return state, pos
+
+def _decode_game_update(view):
+    state, pos = _unpack_state(view, _TAG.size)
+    (size,) = _STR16.unpack_from(view, pos)
+    pos += _STR16.size
+    return {"type": "game_update",
+            "payload": {"state": state, "message": str(view[pos:pos + size], 'utf-8')}}
+
+def _decode_state_snapshot(view):
+    _, seq = _SEQ.unpack_from(view, 0)
+    state, _ = _unpack_state(view, _SEQ.size)
+    return {"type": "state_snapshot", "payload": {"seq": seq, "state": state}}
+
+def _decode_state_delta(view):
+    _, seq, flags = _DELTA.unpack_from(view, 0)
+    pos = _DELTA.size
+    payload = {"seq": seq}
+    if flags & DELTA_BID:
+        q, f = _PAIR.unpack_from(view, pos)
+        payload["last_bid"] = {"quantity": q, "face": f}
+        pos += _PAIR.size
+    if flags & DELTA_TURN:
+        (turn,) = _TURN.unpack_from(view, pos)
+        payload["turn"] = None if turn == _NO_TURN else turn
+        pos += _TURN.size
+    if flags & DELTA_DICE:
+        (n,) = _STR16.unpack_from(view, pos)
+        pos += _STR16.size
+        changes = []
+        for _ in range(n):
+            changes.append(list(_PAIR.unpack_from(view, pos)))
+            pos += _PAIR.size
+        payload["dice"] = changes
+    return {"type": "state_delta", "payload": payload}
+
+def _decode_round_start(view):
+    _, n = _ROUND_START.unpack_from(view, 0)
+    return {"type": "round_start", "payload": {"dice": unpack_dice(view[_ROUND_START.size:], n)}}
+
+def _decode_bid(view):
+    _, q, f = _BID.unpack_from(view, 0)
+    return {"type": "bid", "payload": {"quantity": q, "face": f}}
+
+_BINARY_DECODERS = {
+    TAG_BID: _decode_bid,
+    TAG_CHALLENGE: lambda view: {"type": "challenge", "payload": None},
+    TAG_YOUR_TURN: lambda view: {"type": "your_turn", "payload": None},
+    TAG_ROUND_START: _decode_round_start,
+    TAG_GAME_UPDATE: _decode_game_update,
+    TAG_STATE_SNAPSHOT: _decode_state_snapshot,
+    TAG_STATE_DELTA: _decode_state_delta,
+}
+
+# =======================
+# Estado versionado (state_snapshot / state_delta)
+# =======================
+def diff_state(old, new, turn_index=None):
+    """
+    Compara dois estados de mesa ({"players", "last_bid", "current_turn"}).
+    Se os dois compartilham a mesma lista 'players' (o servidor só monta uma
+    nova quando algum jogador perde dados), a comparação é O(1); com
+    'turn_index' (índice de current_turn em players, se o chamador já sabe)
+    nem o jogador da vez é procurado.
+
+    Retorna:
+        dict | None - Só os campos que mudaram: "last_bid", "turn" (índice em
+            'players', ou None) e "dice" ([[índice, dados], ...]); None quando
+            a lista de jogadores mudou e é preciso mandar o estado inteiro.
+    """
+    old_players, new_players = old['players'], new['players']
+    same = old_players is new_players
+    if not same and (len(old_players) != len(new_players) or any(
+            a['name'] != b['name'] for a, b in zip(old_players, new_players))):
+        return None
+    delta = {}
+    if new['last_bid'] != old['last_bid']:
+        delta['last_bid'] = new['last_bid']
+    if new['current_turn'] != old['current_turn']:
+        turn = new['current_turn']
+        if turn is None:
+            delta['turn'] = None
+        elif turn_index is not None:
+            delta['turn'] = turn_index
+        else:
+            delta['turn'] = next(i for i, p in enumerate(new_players) if p['name'] == turn)
+    if not same:
+        dice = [[i, b['dice_count']] for i, (a, b) in enumerate(zip(old_players, new_players))
+                if a['dice_count'] != b['dice_count']]
+        if dice:
+            delta['dice'] = dice
+    return delta
+
+def apply_delta(state, delta):
+    """
+    Aplica um payload de 'state_delta' sobre o estado local (alterado no lugar).
+    """
+    players = state['players']
+    if 'last_bid' in delta:
+        state['last_bid'] = delta['last_bid']
+    if 'turn' in delta:
+        turn = delta['turn']
+        state['current_turn'] = None if turn is None else players[turn]['name']
+    for i, count in delta.get('dice', ()):
+        players[i]['dice_count'] = count
+    return state
+
+# =======================
+# API pública
+# =======================
+def encode_message(msg_type, payload=None, codec=CODEC_JSON):
     """
     Codifica uma mensagem para envio via socket.
 
@@ -12,23 +344,98 @@ def encode_message(msg_type, payload=None):
         msg_type (str) - Tipo da mensagem, por exemplo:
             'info', 'error', 'game_update', 'your_turn', etc.
         payload (dict) - Conteúdo adicional da mensagem.
+        codec (str) - CODEC_JSON ou CODEC_BINARY (negociado no 'set_name').
 
     Retorna:
-        bytes - A mensagem é convertida para JSON (.dumps) e depois para bytes (.encode).
+        bytes - Quadro pronto para o socket: prefixo de tamanho + corpo.
+            O corpo é binário quando o codec e o tipo permitem; caso contrário,
+            JSON (.dumps) em bytes (.encode).
     """
-    return json.dumps({
-        "type": msg_type,
-        "payload": payload
-    }).encode('utf-8')
+    body = None
+    if codec == CODEC_BINARY:
+        encoder = _BINARY_ENCODERS.get(msg_type)
+        if encoder is not None:
+            try:
+                body = encoder(payload)
+            except (KeyError, TypeError, AttributeError, struct.error):
+                body = None
+    if body is None:
+        body = json.dumps({
+            "type": msg_type,
+            "payload": payload
+        }).encode('utf-8')
+    return HEADER.pack(len(body)) + body
 
 def decode_message(msg_bytes):
     """
-    Decodifica bytes recebidos de um socket para um dicionário Python (.loads).
+    Decodifica o corpo de um quadro para um dicionário Python.
 
     Parâmetros:
-        msg_bytes (bytes) - Mensagem recebida no formato JSON.
+        msg_bytes (bytes | bytearray | memoryview) - Corpo (JSON ou binário), sem o prefixo de tamanho.
 
     Retorna:
-        dict - Mensagem convertida de JSON para dicionário Python.
+        dict - Mensagem no formato {"type": ..., "payload": ...}, qualquer que seja o codec.
+
+    Lança:
+        ProtocolError - corpo binário cortado, JSON inválido (inclui um primeiro
+            byte que não é TAG_* nem começa um JSON) ou que não é um objeto.
     """
-    return json.loads(msg_bytes.decode('utf-8'))
+    # Só um TAG_* registrado é binário: JSON pode começar com espaço ('\n', '\t' < 0x20)
+    decoder = _BINARY_DECODERS.get(msg_bytes[0]) if msg_bytes else None
+    if decoder is not None:
+        try:
+            return decoder(memoryview(msg_bytes))
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ProtocolError(f"Mensagem binária malformada: {e}")
+    # str(memoryview, ...) decodifica direto do buffer, sem uma cópia intermediária em bytes
+    try:
+        msg = json.loads(str(msg_bytes, 'utf-8'))
+    except ValueError as e:  # JSONDecodeError e UnicodeDecodeError
+        raise ProtocolError(f"JSON inválido: {e}")
+    if not isinstance(msg, dict):
+        raise ProtocolError("Mensagem JSON deve ser um objeto.")
+    return msg
+
+class FrameDecoder:
+    """
+    Decodificador incremental: recebe pedaços arbitrários do fluxo TCP (feed)
+    e devolve todas as mensagens completas que eles fecharem.
+
+    Mantém um único buffer crescente; os corpos são lidos por memoryview
+    (sem copiar) e os bytes consumidos são descartados uma vez por chamada.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buf = bytearray()
+
+    def feed(self, data):
+        """
+        Parâmetros:
+            data (bytes) - Pedaço recebido do socket (pode ser vazio).
+
+        Retorna:
+            list[dict] - Mensagens completas, na ordem em que chegaram.
+
+        Lança:
+            FrameTooLarge - se um quadro anunciar tamanho maior que max_frame_size.
+            ProtocolError - se um corpo não decodificar (ver decode_message).
+        """
+        buf = self._buf
+        buf += data
+        messages = []
+        pos = 0
+        end = len(buf)
+        with memoryview(buf) as view:
+            while end - pos >= HEADER.size:
+                (size,) = HEADER.unpack_from(view, pos)
+                if size > self.max_frame_size:
+                    raise FrameTooLarge(f"Quadro de {size} bytes excede o limite de {self.max_frame_size}.")
+                start = pos + HEADER.size
+                if end - start < size:
+                    break
+                messages.append(decode_message(view[start:start + size]))
+                pos = start + size
+        if pos:
+            del buf[:pos]  # bytearray descarta o início em O(1) amortizado
+        return messages
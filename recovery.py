@@ -0,0 +1,429 @@
+import glob
+import os
+import re
+from engine import DiceStream, GameState
+from journal import put_varint, get_varint
+from protocol import pack_dice, unpack_dice
+
+"""
+Recuperação depois de um reinício: snapshots compactos de todas as mesas +
+um log de escrita antecipada (WAL) com as ações desde o último snapshot.
+
+Arquivos no diretório de estado (geração G = número crescente):
+    snapshot-G.lds  MAGIC_SNAPSHOT + um registro W_TABLE por mesa em andamento
+    wal-G.ldw       MAGIC_WAL + registros das ações acontecidas depois do snapshot G
+
+Registros (tipo em 1 byte; inteiros varint, como no journal.py):
+    W_TABLE      mesa, nº de assentos, coringa, fase, turno, aposta (qtd, face),
+                 apostador + 1, versão do estado; por assento: nome, token,
+                 nº de dados, nº de dados na mão + dados (3 por byte)
+    W_ROLL       mesa, assento que começa; por assento: nº de dados + dados
+    W_BID        mesa, quantidade, face (o apostador é sempre o da vez)
+    W_CHALLENGE  mesa (o desafiante é sempre o da vez; o resultado é recalculado)
+    W_CLOSE      mesa
+    W_LEAVE      mesa, assento (saiu de uma mesa grande e foi eliminado)
+    W_DICE       mesa, semente dos dados, última rodada sorteada (logo depois do
+                 W_TABLE; a mesa continua a mesma sequência de dados na volta)
+Uma mesa nova entra no WAL como W_TABLE; o snapshot é só a lista desses
+registros, então abrir uma mesa e recuperá-la usam o mesmo código.
+
+Ciclo de um snapshot (StateStore.rotate + write_snapshot):
+    1. fecha wal-G e começa wal-(G+1);
+    2. grava snapshot-(G+1) num arquivo temporário e renomeia (os.replace é atômico);
+    3. apaga as gerações anteriores.
+Se o processo morrer no meio, o snapshot-G antigo continua lá e a
+recuperação lê wal-G e wal-(G+1) na sequência. Então o trabalho da
+recuperação é limitado: um snapshot + as ações de no máximo um intervalo
+entre snapshots. Um registro cortado no fim do WAL (queda no meio da
+escrita) é descartado; a leitura também para, sem erro, num registro
+inválido (lixo ou zeros no fim do arquivo), e StateStore.damaged diz onde.
+"""
+
+MAGIC_SNAPSHOT = b"LDS1"
+MAGIC_WAL = b"LDW1"
+W_TABLE = 1
+W_ROLL = 2
+W_BID = 3
+W_CHALLENGE = 4
+W_CLOSE = 5
+W_LEAVE = 6
+W_DICE = 7
+
+# Próxima etapa de uma mesa recuperada
+SAVED_BETWEEN = 0   # Sem rodada em andamento: sorteia a próxima
+SAVED_BIDDING = 1   # Rodada em andamento: anuncia o turno
+
+_FILE = re.compile(r"(snapshot|wal)-(\d+)\.(lds|ldw)$")
+
+class SavedTable:
+    """
+    Estado de uma mesa como vai para o disco (e como volta dele).
+
+    Atributos:
+        id (int), names (list[str]), tokens (list[str]) - por assento,
+        game (engine.GameState), phase (SAVED_BETWEEN / SAVED_BIDDING),
+        seq (int) - versão do estado público (Table.state_seq),
+        dice (engine.DiceStream | None) - dados da mesa (semente + rodada).
+    """
+    __slots__ = ("id", "names", "tokens", "game", "phase", "seq", "dice")
+
+    def __init__(self, table_id, names, tokens, game, phase=SAVED_BETWEEN, seq=0, dice=None):
+        self.id = table_id
+        self.names = names
+        self.tokens = tokens
+        self.game = game
+        self.phase = phase
+        self.seq = seq
+        self.dice = dice
+
+def _put_str(buf, text):
+    raw = text.encode("utf-8")
+    put_varint(buf, len(raw))
+    buf += raw
+
+def _get_str(data, pos):
+    size, pos = get_varint(data, pos)
+    if pos + size > len(data):
+        raise IndexError("texto cortado")
+    return data[pos:pos + size].decode("utf-8"), pos + size
+
+def _put_hand(buf, hand):
+    put_varint(buf, len(hand))
+    buf += pack_dice(hand)
+
+def _get_hand(data, pos):
+    count, pos = get_varint(data, pos)
+    size = (count + 2) // 3
+    if pos + size > len(data):
+        raise IndexError("mão cortada")  # O fatiamento não reclama: a mão viria menor
+    return unpack_dice(data[pos:pos + size], count), pos + size
+
+def encode_table(buf, saved):
+    """
+    Acrescenta o registro W_TABLE de 'saved' em 'buf'.
+    """
+    game = saved.game
+    quantity, face = game.last_bid
+    buf.append(W_TABLE)
+    for value in (saved.id, len(saved.names), 1 if game.wild_ones else 0, saved.phase, game.turn,
+                  quantity, face, 0 if game.last_bidder is None else game.last_bidder + 1, saved.seq):
+        put_varint(buf, value)
+    for seat, name in enumerate(saved.names):
+        _put_str(buf, name)
+        _put_str(buf, saved.tokens[seat])
+        put_varint(buf, game.dice_counts[seat])
+        _put_hand(buf, game.hands[seat])
+    if saved.dice is not None:
+        buf.append(W_DICE)
+        for value in (saved.id, saved.dice.seed, saved.dice.round):
+            put_varint(buf, value)
+
+def _decode_table(data, pos):
+    fields = []
+    for _ in range(9):
+        value, pos = get_varint(data, pos)
+        fields.append(value)
+    table_id, n, wild, phase, turn, quantity, face, bidder, seq = fields
+    game = GameState(n, wild_ones=bool(wild))
+    game.turn = turn
+    game.last_bid = (quantity, face)
+    game.last_bidder = bidder - 1 if bidder else None
+    names, tokens, counts, hands = [], [], [], []
+    for seat in range(n):
+        name, pos = _get_str(data, pos)
+        token, pos = _get_str(data, pos)
+        names.append(name)
+        tokens.append(token)
+        count, pos = get_varint(data, pos)
+        counts.append(count)
+        hand, pos = _get_hand(data, pos)
+        hands.append(hand)
+    game.set_dice_counts(counts)
+    game.set_hands(hands)
+    return SavedTable(table_id, names, tokens, game, phase, seq), pos
+
+def load_records(data, pos, tables, damaged=None):
+    """
+    Aplica os registros de data[pos:] em 'tables' ({id: SavedTable}).
+    Retorna quantos foram aplicados; para no primeiro registro incompleto ou
+    inválido (fim cortado, lixo ou zeros depois de uma queda, mesa que não
+    existe) -- perder os últimos registros é melhor que não subir.
+
+    Parâmetros:
+        damaged (list | None) - Recebe (posição do registro, motivo) se a
+            leitura parou antes do fim.
+    """
+    applied = 0
+    end = len(data)
+    start = pos
+    try:
+        while pos < end:
+            start = pos
+            kind = data[pos]
+            pos += 1
+            if kind == W_BID:
+                table_id, pos = get_varint(data, pos)
+                quantity, pos = get_varint(data, pos)
+                face, pos = get_varint(data, pos)
+                tables[table_id].game.apply_bid(quantity, face)
+            elif kind == W_ROLL:
+                table_id, pos = get_varint(data, pos)
+                saved = tables[table_id]
+                game = saved.game
+                # Lê o registro inteiro antes de mexer na mesa: se o fim estiver
+                # cortado, ela fica como estava depois do registro anterior
+                turn, pos = get_varint(data, pos)
+                hands = []
+                for _ in range(len(game.hands)):
+                    hand, pos = _get_hand(data, pos)
+                    hands.append(hand)
+                game.turn = turn
+                game.set_hands(hands)
+                game.last_bid = (0, 0)
+                game.last_bidder = None
+                saved.phase = SAVED_BIDDING
+                if saved.dice is not None:
+                    saved.dice.round += 1
+            elif kind == W_CHALLENGE:
+                table_id, pos = get_varint(data, pos)
+                saved = tables[table_id]
+                saved.game.resolve_challenge()
+                saved.phase = SAVED_BETWEEN
+            elif kind == W_TABLE:
+                saved, pos = _decode_table(data, pos)
+                tables[saved.id] = saved
+            elif kind == W_CLOSE:
+                table_id, pos = get_varint(data, pos)
+                tables.pop(table_id, None)
+            elif kind == W_LEAVE:
+                table_id, pos = get_varint(data, pos)
+                seat, pos = get_varint(data, pos)
+                tables[table_id].game.eliminate(seat)
+            elif kind == W_DICE:
+                table_id, pos = get_varint(data, pos)
+                seed, pos = get_varint(data, pos)
+                round_no, pos = get_varint(data, pos)
+                tables[table_id].dice = DiceStream(seed, round_no)
+            else:
+                raise ValueError(f"registro desconhecido {kind}")
+            applied += 1
+    except IndexError:
+        # Fim cortado: a escrita foi interrompida no meio do registro
+        if damaged is not None:
+            damaged.append((start, "registro cortado"))
+    except KeyError as e:
+        if damaged is not None:
+            damaged.append((start, f"mesa {e.args[0]} não existe"))
+    except ValueError as e:  # Tipo desconhecido (ex.: zeros no fim do arquivo), UTF-8 inválido
+        if damaged is not None:
+            damaged.append((start, str(e)))
+    return applied
+
+# =======================
+# Diretório de estado
+# =======================
+class StateStore:
+    """
+    Parâmetros:
+        directory (str) - Onde ficam os snapshots e o WAL (criado se não existir).
+        fsync (bool) - os.fsync a cada escrita do WAL e de cada snapshot. Sem ele
+            uma queda do processo não perde nada (os dados já estão no kernel),
+            só uma queda da máquina.
+        schedule_flush (callable | None) - Chamado com self.flush quando o primeiro
+            registro entra no buffer (o servidor passa loop.call_soon: o WAL vai
+            para o disco no fim da volta do loop, antes das respostas aos clientes).
+            None = quem usa chama flush().
+    """
+
+    def __init__(self, directory, fsync=False, schedule_flush=None):
+        self.dir = directory
+        self.fsync = fsync
+        self.schedule_flush = schedule_flush
+        self.generation = 0
+        self.wal_bytes = 0          # Bytes no WAL da geração atual
+        self.damaged = []           # [(arquivo, posição, motivo)] onde recover() parou de ler
+        self._buf = bytearray()
+        self._fd = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, kind, generation):
+        ext = "lds" if kind == "snapshot" else "ldw"
+        return os.path.join(self.dir, f"{kind}-{generation:08d}.{ext}")
+
+    def _generations(self):
+        found = {"snapshot": [], "wal": []}
+        for path in os.listdir(self.dir):
+            m = _FILE.match(path)
+            if m:
+                found[m.group(1)].append(int(m.group(2)))
+        return sorted(found["snapshot"]), sorted(found["wal"])
+
+    # =======================
+    # Recuperação
+    # =======================
+    def recover(self):
+        """
+        Lê o último snapshot completo e os WALs seguintes.
+        Retorna ({id: SavedTable} das mesas que estavam em andamento, registros do WAL aplicados);
+        os arquivos em que a leitura parou antes do fim ficam em self.damaged.
+        """
+        snapshots, wals = self._generations()
+        tables = {}
+        base = 0
+        self.damaged = []
+        if snapshots:
+            base = snapshots[-1]
+            path = self._path("snapshot", base)
+            with open(path, "rb") as f:
+                data = f.read()
+            if data[:len(MAGIC_SNAPSHOT)] == MAGIC_SNAPSHOT:
+                self._load(path, data, len(MAGIC_SNAPSHOT), tables)
+        applied = 0
+        for generation in wals:
+            if generation < base:
+                continue
+            path = self._path("wal", generation)
+            with open(path, "rb") as f:
+                data = f.read()
+            if data[:len(MAGIC_WAL)] == MAGIC_WAL:
+                applied += self._load(path, data, len(MAGIC_WAL), tables)
+        self.generation = max(snapshots[-1:] + wals[-1:] + [0])
+        return tables, applied
+
+    def _load(self, path, data, pos, tables):
+        damaged = []
+        applied = load_records(data, pos, tables, damaged)
+        self.damaged += [(path, position, reason) for position, reason in damaged]
+        return applied
+
+    # =======================
+    # WAL
+    # =======================
+    def _append(self):
+        if not self._buf and self.schedule_flush is not None:
+            self.schedule_flush(self.flush)
+        return self._buf
+
+    def open_table(self, saved):
+        encode_table(self._append(), saved)
+
+    def roll(self, table_id, start_seat, hands):
+        buf = self._append()
+        buf.append(W_ROLL)
+        put_varint(buf, table_id)
+        put_varint(buf, start_seat)
+        for hand in hands:
+            _put_hand(buf, hand)
+
+    def bid(self, table_id, quantity, face):
+        buf = self._append()
+        buf.append(W_BID)
+        put_varint(buf, table_id)
+        put_varint(buf, quantity)
+        put_varint(buf, face)
+
+    def challenge(self, table_id):
+        buf = self._append()
+        buf.append(W_CHALLENGE)
+        put_varint(buf, table_id)
+
+    def leave(self, table_id, seat):
+        buf = self._append()
+        buf.append(W_LEAVE)
+        put_varint(buf, table_id)
+        put_varint(buf, seat)
+
+    def close_table(self, table_id):
+        buf = self._append()
+        buf.append(W_CLOSE)
+        put_varint(buf, table_id)
+
+    def flush(self):
+        """
+        Grava o buffer do WAL (um write só para tudo o que acumulou).
+        """
+        if not self._buf or self._fd is None:
+            return
+        os.write(self._fd, self._buf)
+        if self.fsync:
+            os.fsync(self._fd)
+        self.wal_bytes += len(self._buf)
+        self._buf.clear()
+
+    # =======================
+    # Snapshot
+    # =======================
+    def rotate(self, tables):
+        """
+        Começa uma geração nova: fecha o WAL atual, abre o próximo e devolve
+        (geração, bytes do snapshot de 'tables' -- iterável de SavedTable).
+        A codificação é feita aqui, na hora, para o snapshot e o WAL novo
+        começarem exatamente no mesmo ponto; a escrita (write_snapshot) pode
+        ir para outra thread.
+        """
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+        self.generation += 1
+        self._fd = os.open(self._path("wal", self.generation),
+                           os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        os.write(self._fd, MAGIC_WAL)
+        self.wal_bytes = 0
+        buf = bytearray(MAGIC_SNAPSHOT)
+        for saved in tables:
+            encode_table(buf, saved)
+        return self.generation, bytes(buf)
+
+    def write_snapshot(self, generation, data):
+        """
+        Grava o snapshot de forma atômica e apaga as gerações anteriores.
+        Pode rodar fora do event loop (não mexe no WAL).
+        """
+        path = self._path("snapshot", generation)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+        snapshots, wals = self._generations()
+        for old in snapshots:
+            if old < generation:
+                os.remove(self._path("snapshot", old))
+        for old in wals:
+            if old < generation:
+                os.remove(self._path("wal", old))
+
+    def close(self):
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def destroy(self):
+        """
+        Apaga o diretório inteiro (estado já absorvido por outro StateStore).
+        """
+        self.close()
+        for path in glob.glob(os.path.join(self.dir, "*")):
+            os.remove(path)
+        os.rmdir(self.dir)
+
+def orphan_dirs(base, slot):
+    """
+    Diretórios de estado deixados por processos do supervisor que morreram
+    (base/w<slot>-<pid> com o pid já encerrado). O substituto recupera as
+    mesas deles; os de processos ainda vivos (drenando num reinício
+    escalonado) ficam com o dono.
+    """
+    found = []
+    for path in glob.glob(os.path.join(base, f"w{slot}-*")):
+        try:
+            pid = int(path.rsplit("-", 1)[1])
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            found.append(path)
+        except (ValueError, PermissionError):
+            pass
+    return sorted(found)
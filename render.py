@@ -0,0 +1,218 @@
+import os
+import re
+import sys
+import threading
+import time
+
+"""
+Renderizador incremental para terminal (usado pelo client.py).
+
+Em vez de limpar a tela (os.system('clear') abre um processo a cada
+atualização) e reimprimir tudo, a tela é dividida com códigos ANSI:
+
+    linhas 1..N       -> painel da mesa (fixo; só as linhas que mudaram são reescritas)
+    linhas N+1..H-1   -> região de rolagem com as mensagens
+    linha H           -> linha de digitação
+
+Quem recebe mensagens só chama invalidate() / message(); uma thread de
+desenho junta tudo o que chegou e desenha no máximo 'fps' quadros por
+segundo, num único write. Todo desenho salva e restaura o cursor, então o
+que o jogador está digitando na última linha não é apagado nem movido.
+
+Se a saída não for um terminal (ex.: redirecionada para arquivo), as mesmas
+chamadas viram texto simples, sem códigos de controle.
+"""
+
+ESC = "\x1b["
+SAVE, RESTORE = "\x1b7", "\x1b8"
+CLEAR_LINE = ESC + "2K"
+RESET = ESC + "0m"
+_SGR = re.compile(r"\x1b\[[0-9;]*m")
+
+# Estilos SGR usados pelo cliente
+BOLD = "1"
+DIM = "2"
+RED = "31"
+GREEN = "32"
+YELLOW = "33"
+BLUE = "34"
+MAGENTA = "35"
+CYAN = "36"
+
+def style(text, *codes):
+    """
+    Aplica estilos SGR (ex.: style("oi", BOLD, GREEN)) a um trecho de texto.
+    """
+    if not codes or not text:
+        return text
+    return f"{ESC}{';'.join(codes)}m{text}{RESET}"
+
+def _terminal_size():
+    # shutil (com zlib, bz2, lzma) pesa uns milissegundos na partida do processo
+    # e só o modo ANSI precisa dele: importado na primeira chamada
+    import shutil
+    return shutil.get_terminal_size()
+
+def _enable_vt_mode():
+    """
+    Windows 10+: liga o processamento de sequências ANSI no console.
+    """
+    if os.name != "nt":
+        return True
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except Exception:
+        return False
+
+class LiveScreen:
+    """
+    Parâmetros:
+        build_rows (callable) - Devolve a lista de linhas (str, podem ter ANSI) do
+            painel. Só é chamada na hora de desenhar, no máximo 'fps' vezes por segundo.
+        fps (float) - Limite de quadros por segundo.
+        out (file) - Saída (sys.stdout).
+        ansi (bool | None) - Força o modo; None = ANSI só se 'out' for um terminal.
+    """
+
+    def __init__(self, build_rows, fps=20, out=None, ansi=None):
+        self.build_rows = build_rows
+        self.frame_interval = 1.0 / fps
+        self.out = out or sys.stdout
+        if ansi is None:
+            ansi = self.out.isatty() and _enable_vt_mode()
+        self.ansi = ansi
+        self.frames = 0             # Quadros desenhados
+        self.rows_written = 0       # Linhas do painel efetivamente reescritas
+        self._lock = threading.Lock()   # Protege _messages/_dirty e a escrita em 'out'
+        self._wakeup = threading.Event()
+        self._dirty = False
+        self._messages = []
+        self._drawn = []            # Linhas do painel como estão na tela
+        self._size = None           # (colunas, linhas) do último layout
+        self._running = False
+        self._thread = None
+
+    # =======================
+    # API (qualquer thread)
+    # =======================
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Desenha o que estiver pendente e devolve o terminal ao normal.
+        """
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._draw()
+        if self.ansi:
+            with self._lock:
+                _, height = self._size or _terminal_size()
+                self.out.write(f"{ESC}r{ESC}{height};1H\n")
+                self.out.flush()
+
+    def invalidate(self):
+        """
+        O estado mudou: o painel será reconstruído no próximo quadro.
+        """
+        self._dirty = True
+        self._wakeup.set()
+
+    def message(self, text):
+        """
+        Acrescenta uma mensagem (uma ou mais linhas) na região de rolagem.
+        """
+        with self._lock:
+            self._messages.append(text)
+        self._wakeup.set()
+
+    def prompt(self, text="> "):
+        """
+        Lê um comando na linha de digitação. Desenhos que acontecem enquanto o
+        jogador digita salvam e restauram o cursor, então a linha fica intacta.
+        """
+        if self.ansi:
+            with self._lock:
+                _, height = self._size or _terminal_size()
+                self.out.write(f"{ESC}{height};1H{CLEAR_LINE}")
+                self.out.flush()
+        return input(text)
+
+    # =======================
+    # Desenho (thread 'render')
+    # =======================
+    def _run(self):
+        next_frame = 0.0
+        while self._running:
+            self._wakeup.wait()
+            # Limita a taxa: mudanças que chegarem até o próximo quadro saem juntas
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._wakeup.clear()
+            self._draw()
+            next_frame = time.monotonic() + self.frame_interval
+
+    def _draw(self):
+        with self._lock:
+            messages, self._messages = self._messages, []
+            dirty, self._dirty = self._dirty, False
+            if not messages and not dirty:
+                return
+            rows = self.build_rows() if dirty else self._drawn
+            if self.ansi:
+                chunk = self._frame_ansi(rows, messages)
+            else:
+                chunk = self._frame_plain(rows, messages, dirty)
+            if chunk:
+                self.out.write(chunk)
+                self.out.flush()
+            self.frames += 1
+
+    def _frame_ansi(self, rows, messages):
+        size = _terminal_size()
+        _, height = size
+        # Deixa pelo menos 3 linhas para mensagens + 1 para digitação
+        max_rows = max(1, height - 4)
+        if len(rows) > max_rows:
+            rows = rows[:max_rows - 1] + [style(f"... +{len(rows) - max_rows + 1} linhas", DIM)]
+        first = self._size is None
+        # Primeiro quadro: limpa a tela uma vez (sequência ANSI, sem processo externo)
+        parts = [f"{ESC}2J"] if first else [SAVE]
+        if size != self._size or len(rows) != len(self._drawn):
+            # Novo layout: região de rolagem abaixo do painel e redesenho completo
+            self._size = size
+            self._drawn = [None] * len(rows)
+            parts.append(f"{ESC}{len(rows) + 1};{height - 1}r")
+        for i, row in enumerate(rows):
+            if row != self._drawn[i]:
+                parts.append(f"{ESC}{i + 1};1H{CLEAR_LINE}{row}")
+                self.rows_written += 1
+        self._drawn = list(rows)
+        if messages:
+            # Cada linha nova entra embaixo e empurra a região de rolagem para cima
+            parts.append(f"{ESC}{height - 1};1H")
+            for text in messages:
+                for line in text.split("\n"):
+                    parts.append(f"\n{CLEAR_LINE}{line}")
+        parts.append(f"{ESC}{height};1H" if first else RESTORE)
+        return "".join(parts)
+
+    def _frame_plain(self, rows, messages, dirty):
+        parts = []
+        if dirty and rows != self._drawn:
+            parts.extend(row + "\n" for row in rows)
+            self.rows_written += len(rows)
+            self._drawn = list(rows)
+        parts.extend(text + "\n" for text in messages)
+        return _SGR.sub("", "".join(parts))
@@ -0,0 +1,171 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from engine import DiceStream, GameState
+from journal import (JournalReader, REC_JOIN, REC_ROLL, REC_BID, REC_CHALLENGE,
+                     REC_LEAVE, REC_END, REC_SEED)
+
+"""
+Replay e auditoria dos diários de partida (journal.py).
+
+    python replay.py journal/20260101-120000-4242-7.lj              # partida inteira
+    python replay.py journal/20260101-120000-4242-7.lj --round 12   # pula direto para a rodada 12
+    python replay.py --audit journal/                               # revalida todas as partidas
+
+A auditoria reaplica cada partida no núcleo do jogo (engine.GameState): toda
+aposta tem de ser válida e todo 'duvido' tem de dar a mesma contagem e o
+mesmo perdedor que o servidor registrou. Com a semente no diário, os dados de
+cada rodada também são refeitos (engine.DiceStream) e comparados com os
+registrados. No fim sai um resumo (partidas,
+rodadas, apostas, taxa de acerto dos 'duvido') e a velocidade do replay.
+"""
+
+FACE_NAMES = {1: "ás", 2: "duque", 3: "terno", 4: "quadra", 5: "quina", 6: "sena"}
+
+def fmt_time(ms):
+    return f"{ms // 60000:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+def replay(path, from_round=None, out=print):
+    """
+    Imprime a partida (ou a partir de 'from_round', usando o índice).
+    """
+    reader = JournalReader(path)
+    names = reader.players
+    out(f"{os.path.basename(path)}: {reader.num_players} jogadores, "
+        f"início {time.strftime('%d-%m-%Y %H:%M:%S', time.localtime(reader.started))}")
+    records = reader.records() if from_round is None else reader.from_round(from_round)
+    for rec in records:
+        kind, ms = rec[0], rec[1]
+        prefix = f"[{fmt_time(ms)}]"
+        if kind == REC_JOIN:
+            out(f"{prefix} {rec[3]} sentou no assento {rec[2]}")
+        elif kind == REC_ROLL:
+            out(f"{prefix} --- Rodada {rec[2]} (começa {names.get(rec[3], rec[3])}) ---")
+            for seat, hand in enumerate(rec[4]):
+                if hand:
+                    out(f"{prefix}   {names.get(seat, seat)}: {hand}")
+        elif kind == REC_BID:
+            out(f"{prefix} {names.get(rec[2], rec[2])} aposta {rec[3]}x {FACE_NAMES.get(rec[4], rec[4])}")
+        elif kind == REC_CHALLENGE:
+            challenger, bidder, total, loser = rec[2:]
+            out(f"{prefix} {names.get(challenger, challenger)} duvida de {names.get(bidder, bidder)}: "
+                f"{total} na mesa, {names.get(loser, loser)} perde 1 dado")
+        elif kind == REC_LEAVE:
+            out(f"{prefix} {names.get(rec[2], rec[2])} saiu")
+        elif kind == REC_END:
+            winner = names.get(rec[2], "Ninguém") if rec[2] >= 0 else "Ninguém"
+            out(f"{prefix} Fim: vencedor {winner}")
+        elif kind == REC_SEED:
+            out(f"{prefix} Semente dos dados: {rec[2]}")
+
+def audit_game(reader, totals):
+    """
+    Reaplica uma partida no GameState. Retorna a lista de divergências encontradas.
+    """
+    problems = []
+    game = GameState(reader.num_players, wild_ones=reader.wild_ones)
+    dice = DiceStream(reader.seed) if reader.seed is not None else None
+    for rec in reader.records():
+        kind = rec[0]
+        if kind == REC_ROLL:
+            _, _, round_no, start, hands = rec
+            totals["rounds"] += 1
+            counts = [len(h) for h in hands]
+            if counts != game.dice_counts:
+                problems.append(f"rodada {round_no}: dados {counts} != {game.dice_counts}")
+                game.set_dice_counts(counts)
+            if dice is not None:
+                totals["rolls_regenerated"] += 1
+                if dice.roll_round(round_no, counts)[0] != hands:
+                    problems.append(f"rodada {round_no}: dados diferentes dos gerados pela semente {reader.seed}")
+            game.set_hands(hands)
+            game.turn = start
+            game.last_bid = (0, 0)
+            game.last_bidder = None
+        elif kind == REC_BID:
+            _, _, seat, quantity, face = rec
+            totals["bids"] += 1
+            error = game.check_bid(quantity, face)
+            if seat != game.turn or error:
+                problems.append(f"aposta {quantity}x{face} do assento {seat}: {error or 'fora do turno'}")
+            game.turn = seat
+            game.apply_bid(quantity, face)
+        elif kind == REC_CHALLENGE:
+            _, _, challenger, bidder, total, loser = rec
+            totals["challenges"] += 1
+            game.turn = challenger
+            result = game.resolve_challenge()
+            totals["challenges_won"] += not result.valid_bid
+            if (result.bidder, result.total_count, result.loser) != (bidder, total, loser):
+                problems.append(f"duvido: registrado {(bidder, total, loser)}, recalculado "
+                                f"{(result.bidder, result.total_count, result.loser)}")
+        elif kind == REC_LEAVE:
+            game.eliminate(rec[2])  # Numa mesa grande a partida continua sem ele
+        elif kind == REC_END:
+            totals["games"] += 1
+            expected = game.winner()
+            if rec[2] >= 0 and expected != rec[2]:
+                problems.append(f"vencedor registrado {rec[2]}, recalculado {expected}")
+            totals["abandoned"] += rec[2] < 0
+    return problems
+
+def audit(paths, out=print):
+    """
+    Revalida todos os diários. Retorna o Counter com os totais.
+    """
+    totals = Counter()
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            problems = audit_game(JournalReader(path), totals)
+        except (ValueError, IndexError) as e:
+            problems = [f"arquivo corrompido: {e}"]
+        totals["files"] += 1
+        if problems:
+            totals["games_with_problems"] += 1
+            out(f"{path}:")
+            for p in problems[:10]:
+                out(f"  {p}")
+    totals["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+    return totals
+
+def expand(targets):
+    paths = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(glob.glob(os.path.join(target, "*.lj"))))
+        else:
+            paths.append(target)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay e auditoria dos diários de partida")
+    parser.add_argument("paths", nargs="+", help="arquivos .lj ou diretórios")
+    parser.add_argument("--round", type=int, default=None, help="começa nessa rodada (usa o índice)")
+    parser.add_argument("--audit", action="store_true", help="revalida as partidas e mostra um resumo")
+    args = parser.parse_args(argv)
+
+    paths = expand(args.paths)
+    if not args.audit:
+        for path in paths:
+            replay(path, args.round)
+        return
+
+    t = audit(paths)
+    seconds = t["elapsed_ms"] / 1000 or 1e-9
+    print(f"{t['files']} arquivos, {t['games']} partidas terminadas ({t['abandoned']} abandonadas), "
+          f"{t['rounds']} rodadas, {t['bids']} apostas")
+    if t["challenges"]:
+        print(f"'duvido' certeiro em {t['challenges_won'] / t['challenges']:.1%} de {t['challenges']}")
+    if t["rolls_regenerated"]:
+        print(f"{t['rolls_regenerated']} rodadas refeitas a partir da semente")
+    print(f"divergências: {t['games_with_problems']} partidas")
+    print(f"replay: {t['files'] / seconds:,.0f} partidas/s, {t['bids'] / seconds:,.0f} apostas/s")
+    if t["games_with_problems"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,104 @@
+import argparse
+import asyncio
 import socket
-import threading
-import random # rolar os dados
-import time
 import json
 import os
-from datetime import datetime
-from protocol import encode_message, decode_message
+import secrets
+import signal
+import time
+from collections import deque
+from engine import DiceStream, GameState, count_matches
+from journal import JournalFiles, JournalWriter
+from lobby import Matchmaker
+from logger import AsyncLogger, LEVELS, DEBUG, INFO, WARNING, ERROR
+from metrics import Registry, SamplingProfiler, SIZE_BUCKETS, serve_metrics
+from protocol import encode_message, choose_codec, diff_state, FrameDecoder, FrameTooLarge, ProtocolError, CODEC_JSON
+from recovery import StateStore, SavedTable, SAVED_BETWEEN, SAVED_BIDDING, orphan_dirs
+from stats import StatsStore
+from timers import TimerWheel
 
 # =======================
 # Configurações do Servidor
 # =======================
 HOST = '0.0.0.0' # Não restringe conexões apenas do próprio computador. Permite todas as interfaces de rede disponíveis.
 PORT = 65432
-NUM_PLAYERS = 2
+NUM_PLAYERS = 2         # Jogadores por mesa (mesa cheia)
+LARGE_TABLE = 10        # A partir daqui a mesa é "grande" (battle royale, até centenas de jogadores):
+                        # quem sai é eliminado e a partida continua
+LISTEN_BACKLOG = 128    # Fila de conexões pendentes no accept()
+
+# Controle de admissão e limites de entrada: um cliente não ocupa o loop, o log nem a memória
+MAX_CONNECTIONS = 10000 # Conexões abertas ao mesmo tempo (jogadores, espectadores, handshakes); 0 = sem limite
+CLIENT_MAX_FRAME = 4096 # Maior quadro aceito de um cliente (as mensagens dele têm poucas dezenas de bytes)
+READ_SIZE = 4096        # Bytes por leitura do socket; o StreamReader para de ler com 2x isso parado
+RATE_LIMITS = {         # (mensagens/s, rajada) por conexão: "*" = todas, o resto por tipo;
+    "*": (10.0, 30),    # a jogada que o servidor pediu ('your_turn') não gasta ficha
+    "resync": (2.0, 5),         # Cada um é um estado inteiro
+    "leaderboard": (1.0, 5),    # Cada um é uma consulta ao SQLite
+}
+FLOOD_LIMIT = 100       # Mensagens descartadas seguidas até derrubar a conexão; 0 = só descarta
+TURN_ACTIONS = ("bid", "challenge")
+
+# Matchmaking (ver lobby.py)
+MIN_PLAYERS = 2         # Mínimo para uma mesa incompleta sair depois de MATCH_MAX_WAIT
+MATCH_MAX_WAIT = 10.0   # Segundos na fila até aceitar mesa incompleta / ratings vizinhos
+RATING_BUCKET = None    # Largura do balde de rating (ex.: 100); None = sem separar por rating
+MATCH_SWEEP_INTERVAL = 0.25
+
+# Vários processos na mesma porta (ver supervisor.py)
+WORKER_ID = None        # Definido pelo supervisor; None = processo único
+HEALTH_INTERVAL = 1.0   # Segundos entre batimentos "HEALTH" enviados ao supervisor
+DRAIN_TIMEOUT = 120.0   # Máximo de espera pelas mesas em andamento ao drenar
+
+# Pausas do jogo, em segundos (0 = sem pausa, útil para bots e testes)
+PACING = {
+    "table_start": 3,   # Mesa lotou -> primeira rodada
+    "round_start": 0.5, # Dados enviados -> anúncio do turno
+    "challenge": 0.8,   # 'duvido' anunciado -> 'reveal_all'
+    "reveal_step": 0.6, # Entre uma mão e a próxima na animação da revelação (feita no cliente)
+    "reveal_max": 6,    # Duração máxima dessa animação (mesas grandes aceleram o passo)
+    "next_round": 4,    # Resultado do desafio -> próxima rodada
+}
+
+# Dados: cada mesa tem a própria sequência (engine.DiceStream), gravada no diário e no WAL
+DICE_SEED = None            # Semente base (a mesa N usa DICE_SEED << 32 | N); None = aleatória por mesa
+
+# Diário binário de cada partida (ver journal.py e replay.py); None = desligado
+JOURNAL_DIR = None
+JOURNAL_INDEX_EVERY = 1     # Uma entrada no índice a cada N rodadas
+
+# Prazos, todos na mesma roda de timers (ver timers.py): armar e cancelar são O(1)
+TIMER_RESOLUTION = 0.1      # Segundos por tique da roda (precisão dos prazos)
+HANDSHAKE_TIMEOUT = 10.0    # Segundos para a primeira mensagem (set_name / resume / spectate); 0 = sem prazo
+TURN_TIMEOUT = 30.0         # Segundos para o jogador da vez agir; 0 = a mesa espera para sempre
+TURN_TIMEOUT_ACTION = "raise"  # Jogada automática no fim do prazo: "raise" (menor aumento) ou "challenge"
+IDLE_TURNS = 3              # Prazos estourados seguidos até o jogador sair da mesa por inatividade (0 = nunca)
+
+# Recuperação após reinício (ver recovery.py); None = desligada
+STATE_DIR = None
+SNAPSHOT_INTERVAL = 30.0    # Segundos entre snapshots (limita o WAL a ser relido na volta)
+STATE_FSYNC = False         # fsync no WAL/snapshot (protege também contra queda da máquina)
+RECONNECT_GRACE = 30.0      # Segundos que a mesa espera um jogador que caiu (0 = encerra na hora)
+
+# Placar persistente (ver stats.py): partidas, vitórias, dados perdidos e blefes por jogador; None = desligado
+STATS_DB = None
+LEADERBOARD_LIMIT = 10      # Linhas do placar quando o 'leaderboard' não diz quantas
+
+# Métricas (ver metrics.py): endpoint HTTP local com /metrics (Prometheus) e /profile
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None         # None = sem métricas (nada é medido); sob o supervisor soma-se o slot
+PROFILE_HZ = 0              # Amostras/s do profiler (0 = desligado); requer METRICS_PORT
+
+# Fila de saída por cliente (ver Outbox)
+OUTBOX_MAX_BYTES = 256 * 1024           # Acima disso o cliente lento é desconectado
+COALESCE_TYPES = frozenset({"game_update"})  # Só a versão mais nova importa; as antigas na fila são descartadas
+
+# Espectadores (ver SpectatorChannel)
+SPECTATE_TYPES = frozenset({"info", "reveal_all", "game_over"})  # Eventos públicos (+ o game_update mais novo)
+SPECTATE_INTERVAL = 0.25    # Segundos entre lotes enviados aos espectadores de uma mesa
+SPECTATOR_HIGH_WATER = 64 * 1024  # Bytes ainda não enviados acima dos quais o espectador perde lotes
+SPECTATOR_EVENTS = 64       # Eventos guardados entre dois lotes (passando disso, os mais antigos caem)
+SPECTATOR_CHUNK = 64        # Espectadores atendidos antes de devolver a vez ao event loop
 
 # =======================
 # Regras do Jogo
@@ -22,43 +108,132 @@ NUM_PLAYERS = 2
 # - Se a aposta for 2..6 -> contam a face apostada + todos os 1.
 RULE_WILD_ONES = True
 
-# =======================
-# Estado Global
-# =======================
-clients = []            # [{"socket": sock, "addr": (ip, port)}]
-player_data = {}        # {sock: {"name": str, "dice_count": int, "dice_roll": [int,...]}}
-
-# Usamos RLock (Reentrant Lock) para permitir que a mesma thread
-# adquira o lock múltiplas vezes. Isso evita o deadlock quando uma função
-# com lock (handle_challenge) chama outra função com lock (start_new_round).
-
-game_lock = threading.RLock()
-game_started = False
-current_turn_index = 0
-last_bid = {"quantity": 0, "face": 0}
-game_should_end = False
+# Fases da mesa
+PHASE_WAITING = "waiting"         # Aguardando jogadores
+PHASE_STARTING = "starting"       # Lotada, primeira rodada agendada
+PHASE_ROUND_START = "round_start" # Dados rolados, turno ainda não anunciado
+PHASE_BIDDING = "bidding"         # Aceitando bid / challenge do jogador da vez
+PHASE_REVEAL = "reveal"           # 'duvido' sendo revelado
+PHASE_RESULT = "result"           # Resultado exibido, próxima rodada agendada
+PHASE_OVER = "over"
 
 # =======================
 # Logging (console + arquivo)
 # =======================
 LOG_FILE = "server_log.txt"
+LOG_LEVEL = "INFO"          # "DEBUG" grava também os payloads de SEND/RECV
+LOG_SAMPLING = {}           # {evento: fração}, ex.: {"SEND": 0.01, "RECV": 0.01}
+LOG_CONSOLE = True          # Ecoa o log no console (feito pela thread de escrita)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_ROTATE_SECONDS = 0      # 0 = só rotaciona por tamanho
+LOG_BACKUPS = 5
 
-def _ts():
-    return datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+# Nível de cada evento; os não listados são INFO
+EVENT_LEVELS = {
+    "SEND": DEBUG, "RECV": DEBUG,
+    "SEND_ERROR": ERROR, "CLIENT_ERROR": ERROR,
+    "SLOW_CONSUMER": WARNING,
+    "FORCE_END": WARNING, "GRACE_EXPIRED": WARNING, "WAL_DAMAGED": WARNING,
+    "RATE_LIMITED": WARNING, "FLOOD": WARNING, "OVERSIZE_FRAME": WARNING, "MALFORMED_MESSAGE": WARNING,
+}
+
+logger = AsyncLogger(LOG_FILE, level=LOG_LEVEL, sampling=LOG_SAMPLING, console=LOG_CONSOLE,
+                     max_bytes=LOG_MAX_BYTES, rotate_seconds=LOG_ROTATE_SECONDS,
+                     backup_count=LOG_BACKUPS)
 
 def log(event, **fields):
     """
-    Log estruturado: imprime no console e grava em server_log.txt.
+    Log estruturado: enfileira o registro para o console e server_log.txt.
+    A gravação acontece em lote numa thread de fundo (ver logger.py).
     Ex.: log("SEND", to="João", type="info", payload={...})
     """
-    record = {"ts": _ts(), "event": event, **fields}
-    line = json.dumps(record, ensure_ascii=False)
-    print(line)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-    except Exception:
-        pass
+    logger.log(event, EVENT_LEVELS.get(event, INFO), **fields)
+
+# =======================
+# Métricas do caminho quente
+# =======================
+# Tipos de mensagem com rótulo próprio; o resto vira "other" (o cliente escolhe o
+# tipo, então sem esse limite a lista de rótulos poderia crescer sem fim)
+MESSAGE_TYPES = ("bid", "challenge", "resync")
+
+class ServerMetrics:
+    """
+    As métricas do servidor. Só existe com METRICS_PORT definido; no caminho
+    quente cada ponto medido começa com 'if METRICS is not None'.
+
+    Não há locks no servidor (um event loop só), então o "tempo com o lock"
+    e a "espera pelo lock" de cada etapa da mesa são medidos como:
+    - ld_table_step_seconds: duração do callback da etapa (ninguém mais roda enquanto isso);
+    - ld_table_step_lateness_seconds: atraso do timer da etapa em relação ao previsto
+      (quanto ela esperou o loop terminar o trabalho das outras mesas).
+    """
+
+    def __init__(self, server):
+        r = self.registry = Registry()
+        self.received = r.counter("ld_messages_received_total", "Ações recebidas dos jogadores", ["type"])
+        self.handle = r.histogram("ld_message_handle_seconds",
+                                  "Tempo para tratar uma ação (validação, estado e envio)", ["type"])
+        self.sent = r.counter("ld_messages_sent_total", "Mensagens enfileiradas (por destinatário)", ["type"])
+        self.step = r.histogram("ld_table_step_seconds", "Duração de cada etapa da mesa", ["step"])
+        self.lateness = r.histogram("ld_table_step_lateness_seconds",
+                                    "Atraso de cada etapa agendada em relação ao previsto", ["step"])
+        self.flush = r.histogram("ld_outbox_flush_seconds", "writelines + drain de um lote da Outbox")
+        self.batch = r.histogram("ld_outbox_batch_frames", "Quadros por lote enviado", buckets=SIZE_BUCKETS)
+        self.sent_bytes = r.counter("ld_sent_bytes_total", "Bytes entregues ao socket")
+        self.slow = r.counter("ld_slow_consumers_total", "Clientes derrubados por fila de saída cheia")
+        self.wal_flush = r.histogram("ld_wal_flush_seconds", "Gravação de um lote do WAL (recovery.py)")
+        self.snapshot = r.histogram("ld_snapshot_encode_seconds", "Codificação de um snapshot (no event loop)")
+        r.gauge("ld_tables", "Mesas em andamento", fn=lambda: len(server.tables))
+        r.gauge("ld_players", "Jogadores sentados", fn=lambda: sum(len(t.players) for t in server.tables.values()))
+        r.gauge("ld_queued_players", "Jogadores na fila do matchmaking", fn=lambda: server.lobby.waiting)
+        r.gauge("ld_sessions", "Sessões que podem voltar com 'resume'", fn=lambda: len(server.sessions))
+        r.gauge("ld_outbox_queued_bytes", "Bytes nas filas de saída (todas)",
+                fn=lambda: sum(q for q in self._outbox_depths(server)))
+        r.gauge("ld_outbox_queued_bytes_max", "Maior fila de saída",
+                fn=lambda: max(self._outbox_depths(server), default=0))
+        r.gauge("ld_log_pending", "Registros de log aguardando a thread de escrita", fn=lambda: logger.pending)
+        r.gauge("ld_stats_pending", "Partidas aguardando a gravação no placar",
+                fn=lambda: STATS.pending if STATS else 0)
+        r.gauge("ld_stats_games_written", "Partidas gravadas no placar", fn=lambda: STATS.written if STATS else 0)
+        r.gauge("ld_journal_pending", "Pedaços de diário aguardando a thread de escrita",
+                fn=lambda: JOURNAL_FILES.pending if JOURNAL_FILES else 0)
+        r.gauge("ld_journal_errors", "Pedaços de diário perdidos por erro de I/O",
+                fn=lambda: JOURNAL_FILES.errors if JOURNAL_FILES else 0)
+        r.gauge("ld_tables_done", "Mesas encerradas", fn=lambda: server.tables_done)
+        r.gauge("ld_spectators", "Espectadores conectados",
+                fn=lambda: sum(len(t.viewers) for t in server.tables.values() if t.viewers is not None))
+        self.spectator_batches = r.counter("ld_spectator_batches_total", "Lotes entregues a espectadores")
+        self.spectator_dropped = r.counter("ld_spectator_dropped_total",
+                                           "Lotes descartados de espectadores atrasados")
+        self.timeouts = r.counter("ld_timeouts_total", "Prazos estourados", ["kind"])
+        self.shed = r.counter("ld_shed_total", "Conexões e mensagens recusadas pelo controle de admissão",
+                              ["reason"])
+        r.gauge("ld_connections", "Conexões abertas", fn=lambda: server.connections)
+        r.gauge("ld_timers", "Prazos armados na roda de timers", fn=lambda: len(TIMERS) if TIMERS else 0)
+        self._by_type = {t: (self.received.labels(t), self.handle.labels(t)) for t in MESSAGE_TYPES}
+        self._other = (self.received.labels("other"), self.handle.labels("other"))
+
+    @staticmethod
+    def _outbox_depths(server):
+        for table in server.tables.values():
+            for p in table.players:
+                if p["outbox"] is not None:
+                    yield p["outbox"].queued_bytes
+
+    def action(self, msg_type, seconds):
+        counter, histogram = self._by_type.get(msg_type, self._other)
+        counter.inc()
+        histogram.observe(seconds)
+
+    def timed(self, histogram, fn):
+        start = time.perf_counter()
+        fn()
+        histogram.observe(time.perf_counter() - start)
+
+METRICS = None              # ServerMetrics, criado em GameServer.serve se METRICS_PORT estiver definido
+TIMERS = None               # TimerWheel dos prazos, criada em GameServer.serve (None = sem prazos)
+STATS = None                # stats.StatsStore, criado em GameServer.serve se STATS_DB estiver definido
+JOURNAL_FILES = None        # journal.JournalFiles, criado em GameServer.serve se JOURNAL_DIR estiver definido
 
 # =======================
 # Utilitários
@@ -74,348 +249,1582 @@ def get_local_ip():
         s.close()
     return ip
 
-def get_player_name(sock):
-    return player_data.get(sock, {}).get("name", f"?({sock.fileno()})")
+# Implementa a lógica central do jogo (as regras em si estão em engine.py)
+def count_matches_in_hand(face, hand):
+    """
+    Conta quantos dados da mão 'hand' batem com a aposta considerando a regra do coringa.
+    - face == 1: contam apenas os 1.
+    - face 2..6: contam face OU 1 se RULE_WILD_ONES == True.
+    """
+    return count_matches(face, hand, RULE_WILD_ONES)
 
-# Funções "empacotadoras" -> centralizam a lógica de envio
-def send_to(sock, msg_type, payload):
+# =======================
+# Fila de saída por cliente
+# =======================
+class Outbox:
     """
-    Envia uma mensagem para um cliente e registra no log.
+    Fila de saída limitada de um cliente, esvaziada por uma task própria.
+
+    Quem envia só enfileira bytes já codificados (o mesmo objeto bytes é
+    compartilhado por todos os destinatários de um broadcast) e segue em frente;
+    um cliente com rede ruim atrasa apenas a própria fila. Política para quem
+    fica para trás:
+    - mensagens de COALESCE_TYPES ainda não enviadas são substituídas pela mais nova;
+    - passando de OUTBOX_MAX_BYTES na fila, a conexão é derrubada.
     """
-    try:
-        sock.sendall(encode_message(msg_type, payload))
-        log("SEND", to=get_player_name(sock), type=msg_type, payload=payload)
-    except Exception as e:
-        log("SEND_ERROR", to=get_player_name(sock), error=str(e))
 
-def broadcast(msg_type, payload):
+    def __init__(self, writer, max_bytes=OUTBOX_MAX_BYTES):
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self.queued_bytes = 0
+        self.closed = False
+        self._queue = deque()           # [[msg_type, data]]; data None = descartada
+        self._latest = {}               # {msg_type: entrada} para os tipos coalescíveis
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    def push(self, msg_type, data):
+        """
+        Enfileira um quadro. Retorna False se o cliente foi derrubado por estar lento.
+        """
+        if self.closed or self._closing:
+            return False
+        if msg_type in COALESCE_TYPES:
+            stale = self._latest.get(msg_type)
+            if stale is not None and stale[1] is not None:
+                self.queued_bytes -= len(stale[1])
+                stale[1] = None
+        if self.queued_bytes + len(data) > self.max_bytes:
+            if METRICS is not None:
+                METRICS.slow.inc()
+            self.abort()
+            return False
+        entry = [msg_type, data]
+        self._queue.append(entry)
+        if msg_type in COALESCE_TYPES:
+            self._latest[msg_type] = entry
+        self.queued_bytes += len(data)
+        self._ready.set()
+        return True
+
+    async def _run(self):
+        writer = self.writer
+        try:
+            while True:
+                if not self._queue:
+                    if self._closing:
+                        break
+                    await self._ready.wait()
+                    self._ready.clear()
+                    continue
+                # Esvazia tudo o que acumulou num único writelines + drain
+                batch = []
+                while self._queue:
+                    data = self._queue.popleft()[1]
+                    if data is not None:
+                        batch.append(data)
+                self._latest.clear()
+                self.queued_bytes = 0
+                if METRICS is None:
+                    writer.writelines(batch)
+                    await writer.drain()
+                    continue
+                start = time.perf_counter()
+                writer.writelines(batch)
+                await writer.drain()
+                METRICS.flush.observe(time.perf_counter() - start)
+                METRICS.batch.observe(len(batch))
+                METRICS.sent_bytes.inc(sum(map(len, batch)))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            log("SEND_ERROR", to=str(writer.get_extra_info("peername")), error=str(e))
+        finally:
+            self.closed = True
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    def close(self):
+        """
+        Envia o que ainda estiver na fila e fecha a conexão.
+        """
+        self._closing = True
+        self._ready.set()
+
+    def abort(self):
+        """
+        Derruba a conexão na hora, descartando a fila.
+        """
+        self._closing = True
+        self.closed = True
+        self._queue.clear()
+        self.queued_bytes = 0
+        self.writer.transport.abort()
+        self._task.cancel()
+
+# =======================
+# Controle de admissão
+# =======================
+class RateLimiter:
     """
-    Envia uma mensagem a todos os clientes e registra no log (um por um).
+    Baldes de fichas de uma conexão (RATE_LIMITS): um para todas as mensagens
+    ("*") e um para cada tipo listado, criado na primeira mensagem do tipo.
+    Cada balde ganha 'rate' fichas por segundo, até 'burst'; uma mensagem
+    gasta uma ficha do balde geral e uma do balde do tipo, e sem ficha em
+    algum dos dois é descartada (sem gastar nada).
+
+    Atributos:
+        streak (int) - Mensagens descartadas seguidas (zera na próxima aceita).
     """
-    for c in list(clients):
-        send_to(c["socket"], msg_type, payload)
+    __slots__ = ("limits", "_buckets", "streak")
 
-# Implementa a lógica central do jogo
-def count_matches_in_hand(face, hand):
+    def __init__(self, limits=None):
+        self.limits = RATE_LIMITS if limits is None else limits
+        self._buckets = {}      # {tipo: [fichas, quando foi recarregado]}
+        self.streak = 0
+
+    def allow(self, msg_type):
+        now = time.monotonic()
+        limits = self.limits
+        buckets = self._buckets
+        keys = ("*", msg_type) if msg_type != "*" and msg_type in limits else ("*",)
+        for key in keys:
+            limit = limits.get(key)
+            if limit is None:
+                continue
+            rate, burst = limit
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = [burst, now]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                self.streak += 1
+                return False
+        for key in keys:
+            if key in buckets:
+                buckets[key][0] -= 1
+        self.streak = 0
+        return True
+
+_CANNED = {}    # {(mensagem, codec): quadro} das recusas, codificadas uma vez
+
+def canned_error(message, codec=CODEC_JSON):
     """
-    Conta quantos dados da mão 'hand' batem com a aposta considerando a regra do coringa.
-    - face == 1: contam apenas os 1.
-    - face 2..6: contam face OU 1 se RULE_WILD_ONES == True.
+    Quadro 'error' pronto para as recusas repetitivas (sem encode nem log a cada vez).
     """
-    if face == 1:
-        return sum(1 for d in hand if d == 1)
-    if RULE_WILD_ONES:
-        return sum(1 for d in hand if d == face or d == 1)
-    return sum(1 for d in hand if d == face)
+    frame = _CANNED.get((message, codec))
+    if frame is None:
+        frame = _CANNED[(message, codec)] = encode_message("error", {"message": message}, codec)
+    return frame
 
 # =======================
-# Fluxo do Jogo
+# Espectadores (só leitura)
 # =======================
-def start_new_round():
+class SpectatorChannel:
     """
-    Nova rodada:
-    - Zera aposta
-    - Rola dados dos jogadores ativos
-    - Envia dados (privado) a cada jogador
-    - Chama o próximo turno válido
+    Os espectadores de uma mesa. Eles recebem só os eventos públicos
+    (SPECTATE_TYPES e o estado da mesa como 'game_update'), nunca os dados de
+    ninguém, por um caminho separado do dos jogadores:
+
+    - a mesa só anota o evento (publish, O(1)); nada é codificado na hora;
+    - a cada SPECTATE_INTERVAL uma task junta o que acumulou num lote, codifica
+      uma vez por codec (do estado só vale a versão mais nova) e escreve os
+      mesmos bytes no socket de cada espectador, SPECTATOR_CHUNK por vez,
+      devolvendo a vez ao loop entre um bloco e outro -- as jogadas das mesas
+      não esperam o fan-out inteiro;
+    - quem está atrasado (mais de SPECTATOR_HIGH_WATER bytes esperando o
+      socket) não recebe o lote: perde os eventos intermediários e, quando
+      alcança, recebe o estado atual. O que cada espectador acumula fica
+      limitado a isso (mais um lote).
     """
-    global last_bid, current_turn_index, game_should_end
 
-    with game_lock:
-        active_socks = [s for s in player_data if player_data[s]['dice_count'] > 0]
+    def __init__(self, table_id):
+        self.table_id = table_id
+        self.viewers = {}       # {id(viewer): {"writer", "addr", "codec", "behind"}}
+        self.dropped = 0        # Lotes não entregues a espectadores atrasados
+        self._events = deque(maxlen=SPECTATOR_EVENTS)
+        self._state = None      # Payload do 'game_update' mais recente
+        self._state_frames = {} # {codec: bytes} do _state (quem entra ou alcança recebe isso)
+        self._state_changed = False
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+    def __len__(self):
+        return len(self.viewers)
+
+    def add(self, viewer):
+        """
+        Novo espectador: recebe o estado atual na hora e os lotes daí em diante.
+        """
+        self.viewers[id(viewer)] = viewer
+        if self._state is not None:
+            viewer["writer"].transport.write(self._state_frame(viewer["codec"]))
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def remove(self, viewer):
+        self.viewers.pop(id(viewer), None)
 
-        if len(active_socks) <= 1:
-            winner = player_data[active_socks[0]]['name'] if active_socks else "Ninguém"
-            broadcast("game_over", {"message": f"O vencedor é {winner}!"})
-            log("GAME_OVER", winner=winner)
-            game_should_end = True
+    def publish(self, msg_type, payload):
+        """
+        Anota um evento público para o próximo lote.
+        """
+        if msg_type == "game_update":
+            self._state = payload
+            self._state_frames = {}
+            self._state_changed = True
+        elif self.viewers:
+            self._events.append((msg_type, payload))
+        else:
             return
+        self._wake.set()
+
+    def close(self):
+        """
+        A mesa acabou: manda o último lote (com o 'game_over') e fecha as conexões.
+        """
+        self._closing = True
+        self._wake.set()
 
-        last_bid = {"quantity": 0, "face": 0}
+    def _state_frame(self, codec):
+        data = self._state_frames.get(codec)
+        if data is None:
+            data = self._state_frames[codec] = encode_message("game_update", self._state, codec)
+        return data
 
-        # (Re)rola os dados e envia individualmente
-        for s in active_socks:
-            n = player_data[s]['dice_count']
-            player_data[s]['dice_roll'] = [random.randint(1, 6) for _ in range(n)]
-            send_to(s, "round_start", {"dice": player_data[s]['dice_roll']})
-            # Loga no servidor (não é enviado aos outros jogadores)
-            log("ROLL", player=get_player_name(s), dice=player_data[s]['dice_roll'])
+    def _batch(self, events, state_changed, codec):
+        frames = [encode_message(msg_type, payload, codec) for msg_type, payload in events]
+        if state_changed:
+            frames.append(self._state_frame(codec))
+        return b"".join(frames)
 
-        # Garante que o jogador do turno atual tem dados
-        while player_data[clients[current_turn_index]['socket']]['dice_count'] == 0:
-            current_turn_index = (current_turn_index + 1) % len(clients)
+    async def _run(self):
+        try:
+            while True:
+                await self._wake.wait()
+                if not self._closing:
+                    await asyncio.sleep(SPECTATE_INTERVAL)  # Junta os eventos do intervalo num lote
+                self._wake.clear()
+                closing = self._closing
+                events = list(self._events)
+                self._events.clear()
+                state_changed, self._state_changed = self._state_changed, False
+                await self._fan_out(events, state_changed)
+                if closing:
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for viewer in self.viewers.values():
+                viewer["writer"].close()
+            self.viewers.clear()
 
-        time.sleep(0.5)
-        prompt_turn()
+    async def _fan_out(self, events, state_changed):
+        if not events and not state_changed:
+            return
+        batches = {}
+        dropped = delivered = 0
+        for i, viewer in enumerate(list(self.viewers.values())):
+            if i and i % SPECTATOR_CHUNK == 0:
+                await asyncio.sleep(0)
+            transport = viewer["writer"].transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > SPECTATOR_HIGH_WATER:
+                viewer["behind"] = True
+                dropped += 1
+                continue
+            codec = viewer["codec"]
+            data = batches.get(codec)
+            if data is None:
+                data = batches[codec] = self._batch(events, state_changed, codec)
+            if viewer["behind"]:
+                # Alcançou: o estado atual antes do lote (os eventos perdidos ficam para trás)
+                viewer["behind"] = False
+                if not state_changed and self._state is not None:
+                    transport.write(self._state_frame(codec))
+            transport.write(data)
+            delivered += 1
+        self.dropped += dropped
+        if METRICS is not None:
+            METRICS.spectator_batches.inc(delivered)
+            METRICS.spectator_dropped.inc(dropped)
 
-def prompt_turn():
+# =======================
+# Mesa (uma partida)
+# =======================
+class Table:
     """
-    Anuncia de quem é a vez e envia o 'your_turn' ao jogador correto.
+    Uma partida independente: jogadores, conexões e fase da mesa. As regras e
+    o estado do jogo (dados, turno, aposta) ficam no GameState de engine.py,
+    o mesmo núcleo usado nas simulações.
+
+    Todas as mesas rodam no mesmo event loop do asyncio, então nenhuma
+    operação precisa de lock: cada etapa da mesa é um callback curto que
+    executa sem ser interrompido, e as pausas são timers (ver PACING).
     """
-    turn_sock = clients[current_turn_index]['socket']
-    turn_name = get_player_name(turn_sock)
 
-    state = {
-        "players": [{"name": d["name"], "dice_count": d["dice_count"]} for d in player_data.values()],
-        "last_bid": last_bid,
-        "current_turn": turn_name
-    }
+    def __init__(self, table_id, store=None, on_close=None):
+        self.id = table_id
+        self.players = []       # [{"name", "seat", "table", "queued_at", "outbox", "addr", "codec", "delta",
+                                #   "token", "connected", "grace", "prompted"}] na ordem dos assentos
+        self.phase = PHASE_WAITING
+        self.game = None        # engine.GameState, criado quando a mesa lota
+        self.dice = None        # engine.DiceStream da mesa, idem
+        self._timer = None      # Próxima etapa agendada (asyncio.TimerHandle)
+        self._challenge = None  # Revelação em andamento (ver handle_challenge)
+        self.first_turn_at = None
+        self.state_seq = 0      # Versão do estado público (ver publish_state)
+        self.journal = None     # journal.JournalWriter, se JOURNAL_DIR estiver definido
+        self._state = None      # Último estado publicado
+        self.store = store      # recovery.StateStore (WAL), se STATE_DIR estiver definido
+        self.on_close = on_close
+        self.large = False      # Mesa grande (LARGE_TABLE), definido quando ela lota
+        self._roster = None     # Lista 'players' do estado público, refeita só quando dados mudam
+        self._audiences = None  # (legacy, delta): quem recebe game_update / state_delta
+        self.viewers = None     # SpectatorChannel, criado com o primeiro espectador
+        self._deadline = None   # Prazo do turno atual (timers.Timer)
+        self._missed = {}       # {assento: prazos estourados seguidos}
+        self._tally = {}        # {assento: [dados perdidos, blefes desmascarados, blefes que desmascarou]} (placar)
 
-    broadcast("game_update", {"state": state, "message": f"Vez de {turn_name}"})
-    send_to(turn_sock, "your_turn", None)
-    log("TURN", player=turn_name, last_bid=last_bid)
+    @property
+    def started(self):
+        return self.phase != PHASE_WAITING
 
-def handle_challenge():
-    """
-    Processa 'duvido':
-    - Identifica apostador (jogador anterior com dados)
-    - Revela dados de todos (tempo real) + envia resumo 'reveal_all'
-    - Conta com a regra do coringa e decide quem perde dado
-    - Define próximo turno e inicia nova rodada
-    """
-    global current_turn_index
+    @property
+    def ended(self):
+        return self.phase == PHASE_OVER
 
-    with game_lock:
-        # Quem é o apostador? -> o jogador anterior ao desafiante com dados
-        bidder_idx = current_turn_index
-        while True:
-            bidder_idx = (bidder_idx - 1 + len(clients)) % len(clients)
-            if player_data[clients[bidder_idx]['socket']]['dice_count'] > 0:
-                break
+    # Funções "empacotadoras" -> centralizam a lógica de envio
+    def send_to(self, player, msg_type, payload):
+        """
+        Envia uma mensagem para um jogador e registra no log. Quem já foi
+        derrubado por lentidão (outbox fechada) é pulado até a conexão cair de
+        vez, sem um SLOW_CONSUMER por mensagem.
+        """
+        if not player["connected"] or player["outbox"].closed:
+            return
+        if METRICS is not None:
+            METRICS.sent.labels(msg_type).inc()
+        if not player["outbox"].push(msg_type, encode_message(msg_type, payload, player["codec"])):
+            log("SLOW_CONSUMER", table=self.id, to=player["name"], type=msg_type)
+            return
+        log("SEND", table=self.id, to=player["name"], type=msg_type, payload=payload)
+
+    def broadcast(self, msg_type, payload, players=None):
+        """
+        Envia uma mensagem a todos os jogadores da mesa (ou só a 'players').
+        A mensagem é codificada uma única vez por codec e os mesmos bytes vão
+        para a fila de cada jogador; o log registra um único SEND.
+        """
+        frames = {}
+        sent = 0
+        for p in self.players if players is None else players:
+            if not p["connected"] or p["outbox"].closed:
+                continue
+            codec = p["codec"]
+            data = frames.get(codec)
+            if data is None:
+                data = frames[codec] = encode_message(msg_type, payload, codec)
+            sent += 1
+            if not p["outbox"].push(msg_type, data):
+                log("SLOW_CONSUMER", table=self.id, to=p["name"], type=msg_type)
+        if METRICS is not None:
+            METRICS.sent.labels(msg_type).inc(sent)
+        if players is None and self.viewers is not None and msg_type in SPECTATE_TYPES:
+            self.viewers.publish(msg_type, payload)
+        log("SEND", table=self.id, to="*", type=msg_type, payload=payload)
+
+    def add_viewer(self, viewer):
+        """
+        Espectador (só leitura): entra no canal da mesa, criado na primeira vez.
+        """
+        if self.viewers is None:
+            self.viewers = SpectatorChannel(self.id)
+            if self._state is not None:
+                self.viewers.publish("game_update", {"state": self._state,
+                                                     "message": f"Vez de {self._state['current_turn']}"})
+        self.viewers.add(viewer)
+        log("SPECTATE", table=self.id, addr=str(viewer["addr"]), viewers=len(self.viewers))
+
+    def add_player(self, player):
+        self.players.append(player)
+        player["table"] = self
+        self._audiences = None
+        self.broadcast("info", {"message": f"{player['name']} entrou no jogo."})
+        log("JOIN", table=self.id, player=player["name"], addr=str(player["addr"]))
+
+    def current_player(self):
+        return self.players[self.game.turn]
 
-        challenger_sock = clients[current_turn_index]['socket']
-        bidder_sock = clients[bidder_idx]['socket']
+    @property
+    def last_bid(self):
+        quantity, face = self.game.last_bid
+        return {"quantity": quantity, "face": face}
 
-        challenger = get_player_name(challenger_sock)
-        bidder = get_player_name(bidder_sock)
+    def image(self):
+        """
+        Estado da mesa para o snapshot / WAL (recovery.SavedTable).
+        """
+        phase = SAVED_BIDDING if self.phase in (PHASE_ROUND_START, PHASE_BIDDING) else SAVED_BETWEEN
+        return SavedTable(self.id, [p["name"] for p in self.players],
+                          [p["token"] for p in self.players], self.game, phase, self.state_seq, self.dice)
 
-        broadcast("info", {
+    # =======================
+    # Fluxo do Jogo (máquina de estados com timers)
+    # =======================
+    # Nenhuma etapa "dorme": cada pausa de PACING vira um timer no event loop
+    # (call_later), e a etapa seguinte é disparada por ele. Enquanto isso o
+    # loop continua lendo sockets e atendendo as outras mesas.
+    def _schedule(self, delay, callback, *args):
+        """
+        Agenda a próxima etapa da mesa (delay 0 -> na próxima volta do loop).
+        """
+        loop = asyncio.get_running_loop()
+        if METRICS is not None:
+            callback, args = self._timed_step, (loop.time() + delay, callback, args)
+        if delay > 0:
+            self._timer = loop.call_later(delay, callback, *args)
+        else:
+            self._timer = loop.call_soon(callback, *args)
+
+    def _timed_step(self, due, callback, args):
+        """
+        Etapa agendada com as métricas ligadas: mede o atraso e a duração.
+        """
+        start = time.perf_counter()
+        lateness = asyncio.get_running_loop().time() - due
+        callback(*args)
+        name = callback.__name__
+        METRICS.lateness.labels(name).observe(max(0.0, lateness))
+        METRICS.step.labels(name).observe(time.perf_counter() - start)
+
+    def start(self):
+        """
+        Mesa cheia: agenda a primeira rodada para daqui a PACING["table_start"] segundos.
+        """
+        for seat, p in enumerate(self.players):
+            p["seat"] = seat
+        self.large = len(self.players) >= LARGE_TABLE
+        self.game = GameState(len(self.players), wild_ones=RULE_WILD_ONES)
+        self.dice = DiceStream(None if DICE_SEED is None else DICE_SEED << 32 | self.id)
+        log("ALL_CONNECTED", table=self.id, count=len(self.players), seed=self.dice.seed)
+        if JOURNAL_DIR:
+            name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.id}.lj"
+            self.journal = JournalWriter(os.path.join(JOURNAL_DIR, name), len(self.players),
+                                         RULE_WILD_ONES, JOURNAL_INDEX_EVERY, JOURNAL_FILES)
+            for p in self.players:
+                self.journal.join(p["seat"], p["name"])
+            self.journal.seed(self.dice.seed)
+        if self.store is not None:
+            self.store.open_table(self.image())
+        self.phase = PHASE_STARTING
+        self._schedule(PACING["table_start"], self.start_new_round)
+
+    def start_new_round(self):
+        """
+        Nova rodada:
+        - Rola dados dos jogadores ativos (GameState.roll também zera a aposta)
+        - Envia dados (privado) a cada jogador
+        - Agenda o anúncio do turno
+        """
+        game = self.game
+        winner = game.winner()
+        if winner is not None:
+            if self.journal:
+                self.journal.end(winner)
+            if STATS is not None:
+                self._record_stats(winner)
+            winner = self.players[winner]['name'] if winner >= 0 else "Ninguém"
+            self.broadcast("game_over", {"message": f"O vencedor é {winner}!"})
+            log("GAME_OVER", table=self.id, winner=winner)
+            self.close()
+            return
+
+        self.phase = PHASE_ROUND_START
+        self._roster = None  # Alguém perdeu um dado na rodada anterior
+        self._clear_deadline()
+        hands = game.roll(self.dice)  # A rodada inteira num sorteio só
+        if self.journal:
+            self.journal.roll(game.turn, hands)
+        if self.store is not None:
+            self.store.roll(self.id, game.turn, hands)
+
+        # Envia os dados individualmente
+        for p in self.players:
+            hand = hands[p['seat']]
+            if hand:
+                self.send_to(p, "round_start", {"dice": hand})
+                # Loga no servidor (não é enviado aos outros jogadores)
+                log("ROLL", table=self.id, player=p['name'], dice=hand)
+
+        self._schedule(PACING["round_start"], self.prompt_turn)
+
+    def _record_stats(self, winner):
+        """
+        Manda a partida terminada para o placar (só enfileira: ver stats.py).
+        Partidas encerradas por abandono não contam; numa mesa recuperada após
+        reinício, os dados perdidos e blefes contam só a partir da volta.
+        """
+        tally = self._tally
+        players = [(p["name"], *tally.get(p["seat"], (0, 0, 0))) for p in self.players]
+        STATS.record_game(self.id, self.dice.round, self.players[winner]["name"] if winner >= 0 else None,
+                          players)
+
+    def prompt_turn(self):
+        """
+        Anuncia de quem é a vez e envia o 'your_turn' ao jogador correto.
+        """
+        if self.phase == PHASE_ROUND_START and self.first_turn_at is None:
+            # Métrica do matchmaking: tempo da entrada na fila até o primeiro turno
+            self.first_turn_at = time.monotonic()
+            waits = [self.first_turn_at - p["queued_at"] for p in self.players]
+            log("FIRST_TURN", table=self.id, players=len(waits),
+                wait_avg=round(sum(waits) / len(waits), 3), wait_max=round(max(waits), 3))
+        self.phase = PHASE_BIDDING
+        turn_player = self.current_player()
+        turn_name = turn_player['name']
+        if self._roster is None:
+            # Uma vez por rodada: entre apostas os dados não mudam, e a mesma
+            # lista faz o diff_state da próxima aposta ser O(1)
+            dice_counts = self.game.dice_counts
+            self._roster = [{"name": p["name"], "dice_count": dice_counts[p["seat"]]} for p in self.players]
+
+        state = {
+            "players": self._roster,
+            "last_bid": self.last_bid,
+            "current_turn": turn_name
+        }
+
+        self.publish_state(state, f"Vez de {turn_name}")
+        turn_player["prompted"] = True  # Uma jogada pedida: não gasta ficha do RateLimiter
+        self.send_to(turn_player, "your_turn", None)
+        self._set_deadline()
+        log("TURN", table=self.id, player=turn_name, last_bid=self.last_bid)
+
+    def publish_state(self, state, message):
+        """
+        Publica uma nova versão do estado. Clientes com a feature "delta" recebem
+        só os campos que mudaram desde a versão anterior ('state_delta', com o
+        número de sequência); os demais recebem o 'game_update' completo.
+        """
+        previous = self._state
+        self.state_seq += 1
+        self._state = state
+        if self.viewers is not None:
+            self.viewers.publish("game_update", {"state": state, "message": message})
+        if self._audiences is None:
+            self._audiences = ([p for p in self.players if not p["delta"]],
+                               [p for p in self.players if p["delta"]])
+        legacy, delta_players = self._audiences
+        if legacy:
+            self.broadcast("game_update", {"state": state, "message": message}, legacy)
+        if not delta_players:
+            return
+        delta = diff_state(previous, state, self.game.turn) if previous is not None else None
+        if delta is None:
+            self.broadcast("state_snapshot", {"seq": self.state_seq, "state": state}, delta_players)
+        else:
+            self.broadcast("state_delta", {"seq": self.state_seq, **delta}, delta_players)
+
+    def send_snapshot(self, player):
+        """
+        Resposta ao 'resync': o estado inteiro na versão atual.
+        """
+        if self._state is not None:
+            self.send_to(player, "state_snapshot", {"seq": self.state_seq, "state": self._state})
+
+    def handle_challenge(self):
+        """
+        Processa 'duvido':
+        - Resolve o desafio no GameState (a contagem é uma consulta ao histograma
+          de faces montado na rolagem)
+        - Agenda a revelação: todas as mãos num único 'reveal_all' (_reveal)
+        O resultado só é anunciado em _finish_challenge, depois que o cliente
+        tiver animado a revelação.
+        """
+        self.phase = PHASE_REVEAL
+        self._clear_deadline()
+        last_bid = self.last_bid
+        game = self.game
+        # Mãos a revelar: quem tinha dados antes do desafio
+        dice_data = [{"player": p['name'], "dice": game.hands[p['seat']]} for p in self.players
+                     if game.dice_counts[p['seat']] > 0]
+        result = game.resolve_challenge()
+        if self.journal:
+            self.journal.challenge(result.challenger, result.bidder, result.total_count, result.loser)
+        if STATS is not None:
+            tally = self._tally
+            tally.setdefault(result.loser, [0, 0, 0])[0] += 1
+            if not result.valid_bid:
+                tally.setdefault(result.bidder, [0, 0, 0])[1] += 1
+                tally.setdefault(result.challenger, [0, 0, 0])[2] += 1
+        if self.store is not None:
+            self.store.challenge(self.id)
+
+        challenger = self.players[result.challenger]['name']
+        bidder = self.players[result.bidder]['name']
+
+        self.broadcast("info", {
             "message": f"\n!!! {challenger} duvidou da aposta de {bidder} "
                        f"({last_bid['quantity']}x {last_bid['face']}) !!!"
         })
-        log("CHALLENGE", challenger=challenger, bidder=bidder, last_bid=last_bid)
-        time.sleep(0.8)
-
-        # Revelação e contagem
-        total_count = 0
-        revealed_data = []
-        face = last_bid['face']
-
-        for psock, pdata in player_data.items():
-            if pdata['dice_count'] > 0:
-                hand = pdata['dice_roll']
-                revealed_data.append({"player": pdata['name'], "dice": hand})
-                # Mostra em tempo real
-                broadcast("info", {"message": f"{pdata['name']}: {hand}"})
-                # Loga servidor
-                log("REVEAL", player=pdata['name'], dice=hand)
-                # Contagem com regra do coringa
-                total_count += count_matches_in_hand(face, hand)
-                time.sleep(0.6)
-
-        # Resumo final (para clientes) e no log do servidor
-        broadcast("reveal_all", {"dice_data": revealed_data})
-        log("REVEAL_ALL", data=revealed_data, counted_face=face, total_count=total_count,
-            wild_ones=RULE_WILD_ONES)
-
-        # Decide quem perde um dado
-        if total_count >= last_bid['quantity']:
+        log("CHALLENGE", table=self.id, challenger=challenger, bidder=bidder, last_bid=last_bid)
+
+        # Revelação em andamento
+        self._challenge = {"result": result, "dice_data": dice_data}
+        self._schedule(PACING["challenge"], self._reveal)
+
+    def _reveal(self):
+        """
+        Envia todas as mãos de uma vez ('reveal_all'); o cliente mostra uma por
+        vez, a cada 'step' segundos, e o resultado sai quando ele terminar.
+        """
+        ch = self._challenge
+        result = ch["result"]
+        dice_data = ch["dice_data"]
+        # Mesas grandes: a animação inteira fica em PACING["reveal_max"]
+        step = min(PACING["reveal_step"], PACING["reveal_max"] / max(1, len(dice_data)))
+        self.broadcast("reveal_all", {
+            "dice_data": dice_data, "quantity": result.quantity, "face": result.face,
+            "total_count": result.total_count, "wild_ones": RULE_WILD_ONES, "step": step,
+        })
+        log("REVEAL_ALL", table=self.id, data=dice_data, counted_face=result.face,
+            total_count=result.total_count, wild_ones=RULE_WILD_ONES)
+        self._schedule(step * len(dice_data), self._finish_challenge)
+
+    def _finish_challenge(self):
+        """
+        Anuncia quem perdeu um dado e agenda a próxima rodada.
+        """
+        ch, self._challenge = self._challenge, None
+        result = ch["result"]
+        total_count = result.total_count
+        loser = self.players[result.loser]['name']
+
+        # Quem perdeu o dado também começa a próxima rodada (já definido em resolve_challenge)
+        if result.valid_bid:
             # Aposta válida -> desafiante perde um dado
-            player_data[challenger_sock]['dice_count'] -= 1
-            broadcast("info", {
-                "message": f"Aposta VERDADEIRA! Havia {total_count}. {challenger} perde 1 dado."
+            self.broadcast("info", {
+                "message": f"Aposta VERDADEIRA! Havia {total_count}. {loser} perde 1 dado."
             })
-            log("CHALLENGE_RESULT", result="VALID_BID",
-                loser=challenger, total_count=total_count)
-            # Próximo turno: desafiante começa
-            # (mantém current_turn_index como está)
+            log("CHALLENGE_RESULT", table=self.id, result="VALID_BID",
+                loser=loser, total_count=total_count)
         else:
             # Aposta falsa -> apostador perde um dado
-            player_data[bidder_sock]['dice_count'] -= 1
-            broadcast("info", {
-                "message": f"Aposta FALSA! Havia apenas {total_count}. {bidder} perde 1 dado."
+            self.broadcast("info", {
+                "message": f"Aposta FALSA! Havia apenas {total_count}. {loser} perde 1 dado."
             })
-            log("CHALLENGE_RESULT", result="BLUFF",
-                loser=bidder, total_count=total_count)
-            # Próximo turno: apostador começa
-            current_turn_index = bidder_idx
+            log("CHALLENGE_RESULT", table=self.id, result="BLUFF",
+                loser=loser, total_count=total_count)
 
         # Pausa para os jogadores lerem o resultado antes da próxima rodada
-        time.sleep(4)
-        start_new_round()
+        self.phase = PHASE_RESULT
+        self._schedule(PACING["next_round"], self.start_new_round)
+
+    def handle_action(self, player, msg):
+        """
+        Processa uma ação (bid / challenge) enviada por um jogador da mesa.
+        As regras ficam no GameState (engine.py); aqui só há envio e log.
+        """
+        if msg.get('type') == 'resync':
+            # Cliente perdeu uma versão do estado: vale em qualquer fase e turno
+            self.send_snapshot(player)
+            return
+
+        # Valida turno (só se joga na fase de apostas)
+        if self.phase != PHASE_BIDDING or self.current_player() is not player:
+            self.send_to(player, "error", {"message": "Não é seu turno."})
+            return
+        if self._missed:
+            self._missed.pop(player["seat"], None)  # Voltou a jogar: não está inativo
+
+        msg_type = msg.get('type')
+        payload = msg.get('payload') or {}
+
+        if msg_type == 'bid':
+            try:
+                new_quantity = int(payload['quantity'])
+                new_face = int(payload['face'])
+            except (ValueError, TypeError, KeyError):
+                self._reject_action(player, "Formato de aposta inválido.")
+                return
+
+            error = self.game.check_bid(new_quantity, new_face)
+            if error:
+                self._reject_action(player, error)
+                return
+
+            # Registra a aposta e passa turno para o próximo com dados
+            if self.journal:
+                self.journal.bid(player['seat'], new_quantity, new_face)
+            if self.store is not None:
+                self.store.bid(self.id, new_quantity, new_face)
+            self.game.apply_bid(new_quantity, new_face)
+            log("BID", table=self.id, player=player['name'], bid=self.last_bid)
+            self.prompt_turn()
+
+        elif msg_type == 'challenge':
+            error = self.game.check_challenge()
+            if error:
+                self._reject_action(player, error)
+            else:
+                self.handle_challenge()
+
+    def _reject_action(self, player, message):
+        """
+        Recusa a jogada da vez e pede outra. Só a primeira jogada depois de um
+        'your_turn' do servidor (prompt_turn, reattach) é de graça: as novas
+        tentativas gastam ficha do RateLimiter, senão quem insiste em jogadas
+        inválidas escaparia do limite durante o turno inteiro.
+        """
+        self.send_to(player, "error", {"message": message})
+        self.send_to(player, "your_turn", None)
+
+    # =======================
+    # Prazo do turno
+    # =======================
+    # Um prazo por mesa na roda de timers (TIMERS), rearmado a cada turno; uma
+    # jogada antes do prazo só o cancela (O(1)). Repetir uma aposta inválida
+    # não renova o prazo.
+    def _set_deadline(self):
+        self._clear_deadline()
+        if TIMERS is not None and TURN_TIMEOUT > 0:
+            self._deadline = TIMERS.call_later(TURN_TIMEOUT, self._turn_timeout, self.state_seq)
+
+    def _clear_deadline(self):
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+
+    def _turn_timeout(self, seq):
+        """
+        O jogador da vez não agiu a tempo: a mesa joga por ele (TURN_TIMEOUT_ACTION:
+        o menor aumento possível ou 'duvido'; sem aumento possível, 'duvido'; sem
+        aposta na rodada, o menor aumento). Depois de IDLE_TURNS prazos seguidos
+        ele sai da mesa, como se tivesse desconectado.
+        """
+        self._deadline = None
+        if self.phase != PHASE_BIDDING or self.state_seq != seq:
+            return  # O turno já passou (prazo cancelado tarde demais)
+        player = self.current_player()
+        seat = player["seat"]
+        missed = self._missed.get(seat, 0) + 1
+        game = self.game
+        raise_to = game.min_raise()
+        if raise_to is None or (TURN_TIMEOUT_ACTION == "challenge" and game.check_challenge() is None):
+            msg = {"type": "challenge"}
+            action = "'duvido'"
+        else:
+            msg = {"type": "bid", "payload": {"quantity": raise_to[0], "face": raise_to[1]}}
+            action = f"aposta {raise_to[0]}x {raise_to[1]}"
+        if METRICS is not None:
+            METRICS.timeouts.labels("turn").inc()
+        log("TURN_TIMEOUT", table=self.id, player=player["name"], action=msg["type"], missed=missed)
+        self.broadcast("info", {"message": f"{player['name']} não jogou a tempo. Jogada automática: {action}."})
+        self.handle_action(player, msg)
+        if not IDLE_TURNS or missed < IDLE_TURNS:
+            self._missed[seat] = missed
+            return
+        if METRICS is not None:
+            METRICS.timeouts.labels("idle").inc()
+        log("IDLE", table=self.id, player=player["name"], turns=missed)
+        self.send_to(player, "error", {"message": "Removido da mesa por inatividade."})
+        outbox = player["outbox"]
+        if not self.ended:
+            self.remove_player(player)
+        if outbox is not None:
+            outbox.close()
+
+    # =======================
+    # Queda e volta de jogadores
+    # =======================
+    def disconnect(self, player, grace=True):
+        """
+        A conexão do jogador caiu. Com a partida em andamento, a mesa segura o
+        lugar dele por RECONNECT_GRACE segundos (na vez dele, a mesa espera até o
+        prazo do turno e joga por ele); ele volta
+        com 'resume' + o token da sessão (ver reattach). Passado o prazo, sem
+        prazo configurado ou com grace=False, é como antes: remove_player
+        encerra a partida.
+        """
+        if not grace or RECONNECT_GRACE <= 0 or not self.started or self.ended:
+            self.remove_player(player)
+            return
+        if self.large and not self.game.dice_counts[player["seat"]]:
+            # Já sem dados numa mesa grande: só assistia, ninguém espera por ele
+            player["connected"] = False
+            return
+        player["connected"] = False
+        self._start_grace(player)
+        self.broadcast("info", {"message": f"{player['name']} caiu. Aguardando a volta por até "
+                                           f"{RECONNECT_GRACE:g} s."})
+        log("DISCONNECT", table=self.id, player=player["name"])
+
+    def _start_grace(self, player):
+        loop = asyncio.get_running_loop()
+        player["grace"] = loop.call_later(RECONNECT_GRACE, self._grace_expired, player)
+
+    def _grace_expired(self, player):
+        player["grace"] = None
+        if not player["connected"] and not self.ended:
+            log("GRACE_EXPIRED", table=self.id, player=player["name"])
+            self.remove_player(player)
+
+    def expire_disconnected(self):
+        """
+        Encerra já a espera por quem caiu (drenagem: a volta não cairia neste processo).
+        """
+        for p in list(self.players):
+            if not p["connected"] and not self.ended:
+                if p["grace"] is not None:
+                    p["grace"].cancel()
+                self._grace_expired(p)
+
+    def reattach(self, player):
+        """
+        O jogador voltou (mesma sessão, conexão nova): recebe o estado atual,
+        os próprios dados e, se for a vez dele, o 'your_turn' de novo.
+        """
+        if player["grace"] is not None:
+            player["grace"].cancel()
+            player["grace"] = None
+        player["connected"] = True
+        self._audiences = None  # A conexão nova pode ter outro codec / features
+        log("RESUME", table=self.id, player=player["name"], addr=str(player["addr"]))
+        self.broadcast("info", {"message": f"{player['name']} voltou."},
+                       [p for p in self.players if p is not player])
+        self.send_to(player, "info", {"message": f"Reconectado à mesa {self.id}."})
+        in_round = self.phase in (PHASE_ROUND_START, PHASE_BIDDING)
+        hand = self.game.hands[player["seat"]]
+        if in_round and hand:
+            self.send_to(player, "round_start", {"dice": hand})
+        if self._state is not None:
+            if player["delta"]:
+                self.send_snapshot(player)
+            else:
+                self.send_to(player, "game_update", {"state": self._state,
+                                                     "message": f"Vez de {self._state['current_turn']}"})
+        if self.phase == PHASE_BIDDING and self.current_player() is player:
+            player["prompted"] = True
+            self.send_to(player, "your_turn", None)
+
+    @classmethod
+    def restore(cls, saved, table_id, store=None, on_close=None):
+        """
+        Remonta uma mesa recuperada do disco (recovery.SavedTable) com todos
+        os jogadores desconectados, à espera de 'resume'. Chame resume() em
+        seguida; a mesa só entra no WAL pelo próximo snapshot.
+        """
+        table = cls(table_id, store, on_close)
+        table.game = saved.game
+        table.dice = saved.dice if saved.dice is not None else DiceStream()
+        table.large = len(saved.names) >= LARGE_TABLE
+        table.state_seq = saved.seq
+        table.first_turn_at = time.monotonic()  # A métrica do matchmaking já foi registrada
+        for seat, (name, token) in enumerate(zip(saved.names, saved.tokens)):
+            table.players.append({
+                "name": name, "seat": seat, "table": table, "queued_at": None,
+                "outbox": None, "addr": None, "codec": choose_codec(None), "delta": False,
+                "token": token, "connected": False, "grace": None, "prompted": False})
+        table.phase = PHASE_ROUND_START if saved.phase == SAVED_BIDDING else PHASE_RESULT
+        return table
+
+    def resume(self):
+        """
+        Continua uma mesa recuperada de onde parou. O prazo para os jogadores
+        voltarem é um timer só para todas as mesas recuperadas (ver
+        GameServer._expire_restored), e não um por jogador.
+        """
+        log("RESTORED", table=self.id, players=len(self.players), phase=self.phase)
+        if self.phase == PHASE_ROUND_START:
+            self.prompt_turn()  # Ninguém conectado ainda: só fixa o estado e a vez
+        else:
+            self._schedule(PACING["next_round"], self.start_new_round)
+
+    def remove_player(self, player):
+        """
+        Retira um jogador que desconectou. Se a partida já começou, ela é encerrada.
+        """
+        if player not in self.players:
+            return
+        if self.large and self.started and not self.ended:
+            self._eliminate(player)
+            return
+        if self.started and not self.ended:
+            self.broadcast("game_over", {"message": f"{player['name']} saiu. Jogo encerrado."})
+            log("FORCE_END", table=self.id, reason=f"{player['name']} disconnected")
+            if self.journal:
+                self.journal.leave(player['seat'])
+                self.journal.end(None)
+            self.close()
+        self.players.remove(player)
+
+    def _eliminate(self, player):
+        """
+        Mesa grande: quem sai perde o lugar e os dados, e a partida segue sem
+        ele (O(1) no GameState). O jogador fica na lista -- os assentos são
+        índices -- só que desconectado.
+        """
+        seat = player["seat"]
+        was_turn = self.phase == PHASE_BIDDING and self.game.turn == seat
+        player["connected"] = False
+        if player["grace"] is not None:
+            player["grace"].cancel()
+            player["grace"] = None
+        if not self.game.eliminate(seat):
+            return
+        self._roster = None
+        if self.journal:
+            self.journal.leave(seat)
+        if self.store is not None:
+            self.store.leave(self.id, seat)
+        self.broadcast("info", {"message": f"{player['name']} saiu e foi eliminado."})
+        log("ELIMINATED", table=self.id, player=player["name"], remaining=self.game.active)
+        if self.phase not in (PHASE_ROUND_START, PHASE_BIDDING):
+            return  # A próxima rodada já leva em conta (ou anuncia o vencedor)
+        if self.game.winner() is not None:
+            if self._timer is not None:
+                self._timer.cancel()
+            self.start_new_round()
+        elif was_turn:
+            self.prompt_turn()
+
+    def close(self):
+        """
+        Marca a mesa como encerrada, cancela a etapa agendada e fecha as conexões dos jogadores.
+        """
+        if self.phase == PHASE_OVER:
+            return
+        self.phase = PHASE_OVER
+        if self.journal:
+            self.journal.close()
+        if self.store is not None:
+            self.store.close_table(self.id)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._clear_deadline()
+        for p in self.players:
+            if p["grace"] is not None:
+                p["grace"].cancel()
+                p["grace"] = None
+            if p["outbox"] is not None:
+                p["outbox"].close()
+        if self.viewers is not None:
+            self.viewers.close()
+        if self.on_close is not None:
+            self.on_close(self)
 
 # =======================
-# Thread por cliente
+# Servidor (várias mesas)
 # =======================
-def handle_client(sock, addr):
+class GameServer:
     """
-    Comunicação com um cliente:
-    - Recebe o nome (set_name)
-    - Espera o início do jogo
-    - Processa ações: bid / challenge
-    - Faz limpeza ao desconectar
+    Aceita conexões, coloca os jogadores na fila do matchmaking (lobby.py)
+    e abre uma mesa para cada grupo formado.
+    Cada conexão é uma corrotina (handle_client), e não uma thread.
     """
-    global game_started, game_should_end, current_turn_index, last_bid
-    name = f"{addr}"
 
-    try:
-        # 1) Recebe o nome do jogador
-        raw = sock.recv(2048)
-        if not raw:
-            return
-        msg = decode_message(raw)
-        log("RECV", frm=name, raw=msg)
-
-        if msg.get('type') == 'set_name':
-            name = msg['payload']['name']
-            with game_lock:
-                player_data[sock] = {"name": name, "dice_count": 5, "dice_roll": []}
-            broadcast("info", {"message": f"{name} entrou no jogo."})
-            log("JOIN", player=name, addr=str(addr))
+    def __init__(self):
+        self.tables = {}        # {table_id: Table} -> mesas em andamento
+        self.lobby = Matchmaker(self._open_table, NUM_PLAYERS, MIN_PLAYERS,
+                                MATCH_MAX_WAIT, RATING_BUCKET)
+        self._next_table_id = 1
+        self.tables_done = 0    # Mesas encerradas (relatado ao supervisor)
+        self.sessions = {}      # {token: jogador} -> quem pode voltar com 'resume'
+        self.store = None       # recovery.StateStore, se STATE_DIR estiver definido
+        self.draining = False
+        self.connections = 0    # Conexões abertas (limitadas por MAX_CONNECTIONS)
+        self.shed = {"connections": 0, "rate": 0, "flood": 0, "out_of_turn": 0, "oversize": 0, "malformed": 0}
+        self._server = None
+        self._stopped = None    # asyncio.Event: serve() retorna quando é setado
+
+    def _open_table(self, players, queued_at):
+        """
+        Callback do Matchmaker: senta o grupo numa mesa nova e inicia a partida.
+        """
+        table = Table(self._next_table_id, self.store, self._table_closed)
+        self._next_table_id += 1
+        self.tables[table.id] = table
+        for player, since in zip(players, queued_at):
+            player["queued_at"] = since
+            table.add_player(player)
+        table.start()
+        return table
+
+    def _table_closed(self, table):
+        """
+        Callback de Table.close: a mesa sai da lista e as sessões dela expiram.
+        """
+        self.tables.pop(table.id, None)
+        self.tables_done += 1
+        for p in table.players:
+            self.sessions.pop(p["token"], None)
+        if self.draining and not self.tables:
+            self._stopped.set()
+
+    def reattach(self, payload, outbox, addr):
+        """
+        'resume' com o token da sessão: devolve o jogador à mesa dele nesta
+        conexão. Retorna o jogador, ou None se a sessão não existe mais.
+        """
+        player = self.sessions.get(payload.get('token'))
+        if player is None or player["table"] is None or player["table"].ended:
+            return None
+        if player["connected"] and player["outbox"] is not None:
+            # A conexão antiga ainda não percebeu a queda: a nova assume
+            player["outbox"].close()
+        offered = payload.get('codecs')
+        features = payload.get('features') or ()
+        player.update(outbox=outbox, addr=addr, codec=choose_codec(offered), delta="delta" in features)
+        if offered:
+            outbox.push("codec", encode_message("codec", {"codec": player["codec"]}))
+        player["table"].reattach(player)
+        return player
+
+    def spectate(self, payload, writer, addr):
+        """
+        'spectate' {"table"?, "codecs"?}: assiste a uma mesa (sem "table", à
+        mais antiga em andamento). Retorna (mesa, espectador) ou None.
+        """
+        table_id = payload.get('table')
+        if table_id is None:
+            table = next((t for t in self.tables.values() if t.started and not t.ended), None)
         else:
-            send_to(sock, "error", {"message": "Primeira mensagem deve ser 'set_name'."})
+            table = self.tables.get(table_id)
+        if table is None or table.ended:
+            return None
+        viewer = {"writer": writer, "addr": addr, "codec": choose_codec(payload.get('codecs')),
+                  "behind": False}
+        # Direto no socket (sem Outbox): assim nada passa à frente do estado inicial do canal
+        if payload.get('codecs'):
+            writer.transport.write(encode_message("codec", {"codec": viewer["codec"]}))
+        writer.transport.write(encode_message("spectating", {"table": table.id, "players": len(table.players)},
+                                              viewer["codec"]))
+        table.add_viewer(viewer)
+        return table, viewer
+
+    async def _sweep_lobby(self):
+        """
+        Forma mesas incompletas para quem passou de MATCH_MAX_WAIT na fila.
+        """
+        while True:
+            await asyncio.sleep(MATCH_SWEEP_INTERVAL)
+            self.lobby.sweep()
+
+    async def handle_client(self, reader, writer):
+        """
+        Comunicação com um cliente:
+        - Remonta as mensagens do fluxo TCP (FrameDecoder)
+        - Recebe o nome (set_name) e devolve o token da sessão,
+          ou devolve à mesa quem voltou com 'resume' (a primeira mensagem
+          tem HANDSHAKE_TIMEOUT segundos para chegar inteira)
+        - Coloca o jogador na fila do matchmaking (a mesa chega depois),
+          ou põe quem mandou 'spectate' no canal de espectadores de uma mesa
+        - Processa ações: bid / challenge. Antes de qualquer log ou resposta
+          montada, descarta o que passa de RATE_LIMITS (derrubando quem insiste,
+          FLOOD_LIMIT) e recusa com uma resposta pronta a jogada fora da vez
+        - Responde consultas ao placar ('leaderboard')
+        - Faz limpeza ao desconectar
+        """
+        if MAX_CONNECTIONS and self.connections >= MAX_CONNECTIONS:
+            # Lotado: recusa antes de montar qualquer coisa da conexão (nem log)
+            self._shed("connections")
+            writer.write(canned_error("Servidor cheio. Tente mais tarde."))
+            writer.close()
             return
+        self.connections += 1
+        addr = writer.get_extra_info("peername")
+        name = f"{addr}"
+        log("ACCEPT", addr=str(addr))
+        player = None
+        watching = None         # (mesa, espectador) de quem só assiste
+        decoder = FrameDecoder(CLIENT_MAX_FRAME)
+        limiter = RateLimiter() if RATE_LIMITS else None
+        outbox = Outbox(writer)
+        handshake = None
+        if TIMERS is not None and HANDSHAKE_TIMEOUT > 0:
+            handshake = TIMERS.call_later(HANDSHAKE_TIMEOUT, self._handshake_expired, writer, addr)
 
-        # 2) Espera o jogo começar
-        while not game_started:
-            time.sleep(0.1)
-            if game_should_end:
-                return
+        try:
+            while player is None or player["table"] is None or not player["table"].ended:
+                raw = await reader.read(READ_SIZE)
+                if not raw:
+                    break
+                for msg in decoder.feed(raw):
+                    # Filtro barato, antes de qualquer log ou resposta montada
+                    msg_type = msg.get('type')
+                    table = player["table"] if player is not None else None
+                    if (table is not None and player["prompted"] and msg_type in TURN_ACTIONS
+                            and table.phase == PHASE_BIDDING and table.current_player() is player):
+                        player["prompted"] = False  # A jogada que o 'your_turn' pediu: não gasta ficha
+                    elif limiter is not None and not limiter.allow(msg_type):
+                        if self._rate_limited(limiter, name, msg_type):
+                            writer.transport.abort()
+                            return
+                        continue
+                    elif table is not None and msg_type in TURN_ACTIONS and (
+                            table.phase != PHASE_BIDDING or table.current_player() is not player):
+                        self._shed("out_of_turn")
+                        outbox.push("error", canned_error("Não é seu turno.", player["codec"]))
+                        continue
+                    if watching is not None:
+                        continue  # Espectador: só leitura
+                    if msg.get('type') == 'leaderboard':
+                        # Consulta ao placar: a qualquer momento, antes ou depois do set_name
+                        log("RECV", frm=name, raw=msg)
+                        await self.send_leaderboard(msg.get('payload') or {}, player, outbox)
+                        continue
+                    if player is None and msg.get('type') == 'spectate':
+                        # 1'') Só assistir a uma mesa (eventos públicos, sem dados)
+                        log("RECV", frm=name, raw=msg)
+                        watching = self.spectate(msg.get('payload') or {}, writer, addr)
+                        if watching is None:
+                            outbox.push("error", encode_message("error", {"message": "Nenhuma mesa para assistir."}))
+                            return
+                    elif player is None and msg.get('type') == 'resume':
+                        # 1') Volta de quem caiu (ou de antes de um reinício do servidor)
+                        log("RECV", frm=name, raw=msg)
+                        player = self.reattach(msg.get('payload') or {}, outbox, addr)
+                        if player is None:
+                            outbox.push("error", encode_message("error", {"message": "Sessão expirada. Entre de novo."}))
+                            return
+                        name = player["name"]
+                    elif player is None:
+                        # 1) Primeira mensagem: nome do jogador
+                        log("RECV", frm=name, raw=msg)
+                        if msg.get('type') != 'set_name':
+                            outbox.push("error", encode_message("error", {"message": "Primeira mensagem deve ser 'set_name'."}))
+                            return
+                        name = msg['payload']['name']
+                        offered = msg['payload'].get('codecs')
+                        features = msg['payload'].get('features') or ()
+                        player = {"name": name, "seat": None, "table": None, "queued_at": None,
+                                  "outbox": outbox, "addr": addr, "codec": choose_codec(offered),
+                                  "delta": "delta" in features, "token": secrets.token_hex(8),
+                                  "connected": True, "grace": None, "prompted": False}
+                        self.sessions[player["token"]] = player
+                        if offered:
+                            # Confirma o codec (em JSON, que todo cliente entende)
+                            outbox.push("codec", encode_message("codec", {"codec": player["codec"]}))
+                        # Token para voltar à mesa com 'resume' se a conexão cair
+                        outbox.push("session", encode_message("session", {"token": player["token"],
+                                                                          "grace": RECONNECT_GRACE,
+                                                                          "turn_timeout": TURN_TIMEOUT},
+                                                  player["codec"]))
+                        outbox.push("info", encode_message("info", {"message": "Procurando mesa..."}, player["codec"]))
+                        log("QUEUED", player=name, addr=str(addr))
+                        self.lobby.enqueue(player, msg['payload'].get('rating'))
+                    elif player["table"] is None:
+                        outbox.push("error", canned_error("Aguardando mesa.", player["codec"]))
+                    else:
+                        # 2) Ações do jogador na mesa
+                        table = player["table"]
+                        log("RECV", table=table.id, frm=name, raw=msg)
+                        if METRICS is None:
+                            table.handle_action(player, msg)
+                        else:
+                            start = time.perf_counter()
+                            table.handle_action(player, msg)
+                            METRICS.action(msg.get('type'), time.perf_counter() - start)
+                        if table.ended:
+                            break
+                if handshake is not None and (player is not None or watching is not None):
+                    handshake.cancel()
+                    handshake = None
 
-        # 3) Loop principal de ações do jogador
-        while not game_should_end:
-            raw = sock.recv(4096)
-            if not raw:
-                break
-            msg = decode_message(raw)
-            log("RECV", frm=name, raw=msg)
-
-            with game_lock:
-                # Valida turno
-                if clients[current_turn_index]['socket'] != sock:
-                    send_to(sock, "error", {"message": "Não é seu turno."})
-                    continue
+        except FrameTooLarge as e:
+            # Quadro acima de CLIENT_MAX_FRAME: nada dele chega a ser lido
+            self._shed("oversize")
+            log("OVERSIZE_FRAME", player=name, error=str(e))
 
-                msg_type = msg.get('type')
-                payload = msg.get('payload', {})
+        except ProtocolError as e:
+            # Corpo que não decodifica (tipo binário desconhecido, binário cortado, JSON inválido)
+            self._shed("malformed")
+            log("MALFORMED_MESSAGE", player=name, error=str(e))
 
-                if msg_type == 'bid':
-                    try:
-                        new_quantity = int(payload['quantity'])
-                        new_face = int(payload['face'])
-                        new_bid = {"quantity": new_quantity, "face": new_face}
+        except Exception as e:
+            log("CLIENT_ERROR", player=name, error=str(e))
 
-                        total_dice_in_play = sum(p['dice_count'] for p in player_data.values())
+        finally:
+            # 3) Limpeza (se outra conexão já assumiu o jogador, não há o que fazer)
+            self.connections -= 1
+            if handshake is not None:
+                handshake.cancel()
+            if watching is not None:
+                table, viewer = watching
+                table.viewers.remove(viewer)
+            if player is not None and player["outbox"] is outbox:
+                table = player["table"]
+                if table is None:
+                    self.lobby.remove(player)
+                    self.sessions.pop(player["token"], None)
+                else:
+                    table.disconnect(player, grace=not self.draining)
+            outbox.close()
 
-                        # Validação 1: Face do dado deve ser entre 1 e 6
-                        if not (1 <= new_face <= 6):
-                            send_to(sock, "error", {"message": "Aposta inválida. A face do dado deve ser entre 1 e 6."})
-                            send_to(sock, "your_turn", None)
-                            continue
+    def _shed(self, reason):
+        self.shed[reason] += 1
+        if METRICS is not None:
+            METRICS.shed.labels(reason).inc()
 
-                        # Validação 2: Quantidade apostada não pode exceder o total de dados em jogo
-                        if new_quantity > total_dice_in_play:
-                            send_to(sock, "error", {"message": f"Aposta inválida. Existem apenas {total_dice_in_play} dados na mesa."})
-                            send_to(sock, "your_turn", None)
-                            continue
+    def _rate_limited(self, limiter, name, msg_type):
+        """
+        Conta uma mensagem descartada pelo RateLimiter. Uma linha de log por
+        sequência de descartes; retorna True quando a sequência chega a
+        FLOOD_LIMIT (a conexão deve cair).
+        """
+        self._shed("rate")
+        if limiter.streak == 1:
+            log("RATE_LIMITED", frm=name, type=msg_type)
+        if FLOOD_LIMIT and limiter.streak >= FLOOD_LIMIT:
+            self._shed("flood")
+            log("FLOOD", frm=name, dropped=limiter.streak)
+            return True
+        return False
 
-                        # Validação 3: Aposta deve ser maior que a anterior
-                        if (new_quantity > last_bid['quantity'] or
-                            (new_quantity == last_bid['quantity'] and new_face > last_bid['face'])):
+    async def send_leaderboard(self, request, player, outbox):
+        """
+        Responde ao 'leaderboard' ({"limit": N, "player": nome}, ambos opcionais;
+        sem 'player', quem pergunta) com {"top": [...], "player": {...} | None}.
+        A consulta ao SQLite roda numa thread do executor, fora do event loop.
+        """
+        codec = player["codec"] if player is not None else CODEC_JSON
+        if STATS is None:
+            outbox.push("error", encode_message("error", {"message": "Placar desligado neste servidor."}, codec))
+            return
+        try:
+            limit = int(request.get("limit", LEADERBOARD_LIMIT))
+        except (TypeError, ValueError):
+            limit = LEADERBOARD_LIMIT
+        name = request.get("player")
+        if not isinstance(name, str):
+            name = player["name"] if player is not None else None
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(None, STATS.lookup, limit, name)
+        outbox.push("leaderboard", encode_message("leaderboard", answer, codec))
 
-                            last_bid = new_bid
-                            log("BID", player=name, bid=last_bid)
+    def _handshake_expired(self, writer, addr):
+        """
+        A primeira mensagem não chegou a tempo: derruba a conexão (o read de
+        handle_client termina e a limpeza segue normalmente).
+        """
+        if METRICS is not None:
+            METRICS.timeouts.labels("handshake").inc()
+        log("HANDSHAKE_TIMEOUT", addr=str(addr))
+        writer.transport.abort()
 
-                            # Passa turno para o próximo com dados
-                            current_turn_index = (current_turn_index + 1) % len(clients)
-                            while player_data[clients[current_turn_index]['socket']]['dice_count'] == 0:
-                                current_turn_index = (current_turn_index + 1) % len(clients)
+    # =======================
+    # Supervisor: saúde e drenagem
+    # =======================
+    def drain(self):
+        """
+        Parada graciosa (SIGTERM): para de aceitar conexões -- com SO_REUSEPORT o
+        kernel passa a entregá-las aos outros processos --, senta quem der da fila,
+        dispensa o resto e espera as mesas em andamento terminarem (sem esperar
+        a volta de quem caiu: ela iria para outro processo).
+        """
+        if self.draining:
+            return
+        self.draining = True
+        log("DRAIN_START", tables=len(self.tables), queued=self.lobby.waiting)
+        self._server.close()
+        self.lobby.sweep(float("inf"))
+        for player in self.lobby.queued():
+            self.lobby.remove(player)
+            player["outbox"].push("error", encode_message(
+                "error", {"message": "Servidor reiniciando. Conecte novamente."}, player["codec"]))
+            player["outbox"].close()
+        for table in list(self.tables.values()):
+            table.expire_disconnected()
+        if not self.tables:
+            self._stopped.set()
+        else:
+            asyncio.get_running_loop().call_later(DRAIN_TIMEOUT, self._drain_timeout)
 
-                            prompt_turn()
-                        else:
-                            send_to(sock, "error", {"message": "Aposta inválida. Aumente a quantidade ou a face."})
-                            send_to(sock, "your_turn", None)
+    def _drain_timeout(self):
+        log("DRAIN_TIMEOUT", tables=len(self.tables))
+        self._stopped.set()
 
-                    except (ValueError, TypeError, KeyError):
-                        send_to(sock, "error", {"message": "Formato de aposta inválido."})
-                        send_to(sock, "your_turn", None)
+    async def _heartbeat(self):
+        """
+        Uma linha "HEALTH {...}" por HEALTH_INTERVAL no stdout: o supervisor
+        usa como verificação de saúde (o event loop está respondendo) e para
+        somar os números de todos os processos.
+        """
+        while True:
+            players = sum(len(t.players) for t in self.tables.values())
+            print("HEALTH " + json.dumps({
+                "worker": WORKER_ID, "pid": os.getpid(), "tables": len(self.tables),
+                "players": players, "queued": self.lobby.waiting,
+                "tables_done": self.tables_done, "draining": self.draining,
+            }), flush=True)
+            await asyncio.sleep(HEALTH_INTERVAL)
 
+    # =======================
+    # Recuperação (snapshot + WAL)
+    # =======================
+    def _recover(self):
+        """
+        Abre o diretório de estado e remonta, de uma vez, as mesas que estavam
+        em andamento quando o processo anterior parou. Sob o supervisor cada
+        processo tem o próprio diretório (w<slot>-<pid>) e o substituto de um
+        processo que morreu absorve o diretório dele.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        if WORKER_ID is None:
+            directory, orphans = STATE_DIR, []
+        else:
+            directory = os.path.join(STATE_DIR, f"w{WORKER_ID}-{os.getpid()}")
+            orphans = [StateStore(d) for d in orphan_dirs(STATE_DIR, WORKER_ID)]
+        if METRICS is None:
+            schedule_flush = loop.call_soon
+        else:
+            schedule_flush = lambda flush: loop.call_soon(METRICS.timed, METRICS.wal_flush, flush)
+        self.store = StateStore(directory, STATE_FSYNC, schedule_flush)
+        restored = records = 0
+        restored_tables = []
+        for source in [self.store] + orphans:
+            saved_tables, applied = source.recover()
+            records += applied
+            for path, position, reason in source.damaged:
+                log("WAL_DAMAGED", file=path, position=position, reason=reason)
+            for saved in saved_tables.values():
+                table = Table.restore(saved, self._next_table_id, self.store, self._table_closed)
+                self._next_table_id += 1
+                self.tables[table.id] = table
+                for p in table.players:
+                    self.sessions[p["token"]] = p
+                table.resume()
+                restored_tables.append(table)
+                restored += 1
+        if restored_tables:
+            loop.call_later(RECONNECT_GRACE, self._expire_restored, restored_tables)
+        # Snapshot imediato: o estado recuperado vira a geração nova e o WAL antigo some
+        self.store.write_snapshot(*self.store.rotate(t.image() for t in self.tables.values()))
+        for source in orphans:
+            source.destroy()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if restored:
+            print(f"{restored} mesas recuperadas em {elapsed_ms:.0f} ms", flush=True)
+        log("RECOVERY", tables=restored, wal_records=records, orphans=len(orphans),
+            ms=round(elapsed_ms, 1))
 
-                elif msg_type == 'challenge':
-                    if last_bid['quantity'] == 0:
-                        send_to(sock, "error", {"message": "Não pode duvidar antes da primeira aposta."})
-                        send_to(sock, "your_turn", None)
-                    else:
-                        handle_challenge()
+    def _expire_restored(self, tables):
+        """
+        Fim do prazo de volta das mesas recuperadas: quem não voltou sai (e a
+        mesa dele acaba). Quem voltou e caiu de novo tem o próprio prazo.
+        """
+        for table in tables:
+            for p in list(table.players):
+                if table.ended:
+                    break
+                if not p["connected"] and p["grace"] is None:
+                    table._grace_expired(p)
 
-    except Exception as e:
-        log("CLIENT_ERROR", player=name, error=str(e))
+    async def _snapshot_loop(self):
+        """
+        Um snapshot a cada SNAPSHOT_INTERVAL: codifica as mesas aqui no loop
+        (é o que fixa o ponto de corte do WAL) e grava numa thread.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            started = time.perf_counter()
+            generation, data = self.store.rotate(t.image() for t in self.tables.values())
+            encode_ms = (time.perf_counter() - started) * 1000
+            if METRICS is not None:
+                METRICS.snapshot.observe(encode_ms / 1000)
+            await loop.run_in_executor(None, self.store.write_snapshot, generation, data)
+            log("SNAPSHOT", generation=generation, tables=len(self.tables), bytes=len(data),
+                encode_ms=round(encode_ms, 1), total_ms=round((time.perf_counter() - started) * 1000, 1))
 
-    finally:
-        # 4) Limpeza
-        with game_lock:
-            if game_started and not game_should_end:
-                if sock in player_data:
-                    broadcast("game_over", {"message": f"{get_player_name(sock)} saiu. Jogo encerrado."})
-                    log("FORCE_END", reason=f"{get_player_name(sock)} disconnected")
-                    game_should_end = True
-
-            # Remove cliente das estruturas
-            clients[:] = [c for c in clients if c['socket'] != sock]
-            if sock in player_data:
-                del player_data[sock]
-            try:
-                sock.close()
-            except:
-                pass
+    async def serve(self, host=HOST, port=PORT, reuse_port=False):
+        """
+        Atende até drain() terminar. Com reuse_port=True vários processos
+        escutam na mesma porta e o kernel distribui as conexões entre eles.
+        """
+        global METRICS, TIMERS, STATS, JOURNAL_FILES
+        self._stopped = asyncio.Event()
+        TIMERS = TimerWheel(TIMER_RESOLUTION)
+        if STATS_DB:
+            STATS = StatsStore(STATS_DB)
+        if JOURNAL_DIR:
+            JOURNAL_FILES = JournalFiles()
+        metrics_server = profiler = None
+        if METRICS_PORT is not None:
+            METRICS = ServerMetrics(self)
+            if PROFILE_HZ > 0:
+                profiler = SamplingProfiler(PROFILE_HZ).start()
+            port_m = METRICS_PORT + (WORKER_ID or 0)
+            metrics_server = await serve_metrics(METRICS.registry, METRICS_HOST, port_m, profiler)
+            log("METRICS_START", url=f"http://{METRICS_HOST}:{port_m}/metrics", profile_hz=PROFILE_HZ)
+        if STATE_DIR:
+            self._recover()
+        self._server = await asyncio.start_server(self.handle_client, host, port,
+                                                  backlog=LISTEN_BACKLOG, limit=READ_SIZE,
+                                                  reuse_port=reuse_port)
+        print(f"Servidor iniciado em {get_local_ip()}:{port}", flush=True)
+        log("SERVER_START", host=get_local_ip(), port=port, players_per_table=NUM_PLAYERS,
+            worker=WORKER_ID, pid=os.getpid())
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, self.drain)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows: sem drenagem por sinal
+        tasks = [asyncio.create_task(self._sweep_lobby())]
+        if WORKER_ID is not None:
+            tasks.append(asyncio.create_task(self._heartbeat()))
+        if self.store is not None:
+            tasks.append(asyncio.create_task(self._snapshot_loop()))
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._server.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            if profiler is not None:
+                profiler.stop()
+            TIMERS.close()
+            if STATS is not None:
+                STATS.close()  # Grava as partidas que ainda estão na fila
+            if JOURNAL_FILES is not None:
+                JOURNAL_FILES.close()
+            if self.store is not None:
+                # Mesas ainda abertas ficam no WAL para o próximo processo
+                if self.tables or WORKER_ID is None:
+                    self.store.close()
+                else:
+                    self.store.destroy()
+            log("DRAIN_DONE", tables=len(self.tables), tables_done=self.tables_done, shed=self.shed)
 
 # =======================
 # Bootstrap do Servidor
 # =======================
-def main():
-    global game_started
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de Liar's Dice")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--players", type=int, default=NUM_PLAYERS, help="jogadores por mesa")
+    parser.add_argument("--large-table", type=int, default=LARGE_TABLE,
+                        help="mesas com pelo menos N jogadores seguem sem quem sai (eliminado)")
+    parser.add_argument("--min-players", type=int, default=MIN_PLAYERS,
+                        help="mínimo para começar uma mesa incompleta após --max-wait")
+    parser.add_argument("--max-wait", type=float, default=MATCH_MAX_WAIT,
+                        help="segundos na fila até aceitar mesa incompleta")
+    parser.add_argument("--rating-bucket", type=int, default=RATING_BUCKET,
+                        help="separa a fila em baldes de rating dessa largura")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS,
+                        help="conexões abertas ao mesmo tempo; as excedentes são recusadas (0 = sem limite)")
+    parser.add_argument("--backlog", type=int, default=LISTEN_BACKLOG,
+                        help="fila de conexões pendentes no accept() (limitada pelo somaxconn do sistema)")
+    parser.add_argument("--rate-limit", type=float, default=RATE_LIMITS["*"][0], metavar="MSG/S",
+                        help="mensagens por segundo por conexão, com rajada de 3x (0 = sem limite geral; "
+                             "'resync' e 'leaderboard' continuam limitados)")
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="SO_REUSEPORT: vários processos na mesma porta (ver supervisor.py)")
+    parser.add_argument("--worker-id", type=int, default=None,
+                        help="usado pelo supervisor: ativa os batimentos HEALTH e mantém o log")
+    parser.add_argument("--log-file", default=LOG_FILE)
+    parser.add_argument("--dice-seed", type=int, default=DICE_SEED,
+                        help="semente base dos dados, de 0 a 2**64 - 1 (partidas reproduzíveis); sem ela, aleatória por mesa")
+    parser.add_argument("--journal", default=JOURNAL_DIR, metavar="DIR",
+                        help="grava o diário binário de cada partida nesse diretório (ver replay.py)")
+    parser.add_argument("--stats-db", default=STATS_DB, metavar="ARQUIVO",
+                        help="placar persistente (SQLite) com partidas, vitórias e blefes de cada jogador")
+    parser.add_argument("--state-dir", default=STATE_DIR, metavar="DIR",
+                        help="snapshots + WAL das mesas: um reinício retoma as partidas (ver recovery.py)")
+    parser.add_argument("--snapshot-interval", type=float, default=SNAPSHOT_INTERVAL,
+                        help="segundos entre snapshots do estado")
+    parser.add_argument("--reconnect-grace", type=float, default=RECONNECT_GRACE,
+                        help="segundos que a mesa espera quem caiu voltar com o token (0 = encerra)")
+    parser.add_argument("--turn-timeout", type=float, default=TURN_TIMEOUT,
+                        help="segundos para o jogador da vez agir antes da jogada automática (0 = sem prazo)")
+    parser.add_argument("--timeout-action", default=TURN_TIMEOUT_ACTION, choices=["raise", "challenge"],
+                        help="jogada automática no fim do prazo: menor aumento ou 'duvido'")
+    parser.add_argument("--idle-turns", type=int, default=IDLE_TURNS,
+                        help="prazos estourados seguidos até o jogador sair por inatividade (0 = nunca)")
+    parser.add_argument("--handshake-timeout", type=float, default=HANDSHAKE_TIMEOUT,
+                        help="segundos para a primeira mensagem de uma conexão (0 = sem prazo)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="liga as métricas em http://127.0.0.1:PORTA/metrics (formato Prometheus)")
+    parser.add_argument("--profile-hz", type=int, default=PROFILE_HZ,
+                        help="profiler por amostragem com N amostras/s, em /profile (requer --metrics-port)")
+    parser.add_argument("--pacing", type=float, default=1.0,
+                        help="multiplica as pausas de PACING (0 = sem pausas, para bots/carga)")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--quiet", action="store_true", help="não ecoa o log no console")
+    args = parser.parse_args(argv)
+    # A mesa usa DICE_SEED << 32 | id, que tem de caber nos 16 bytes da chave do DiceStream
+    if args.dice_seed is not None and not 0 <= args.dice_seed < 2 ** 64:
+        parser.error("--dice-seed deve estar entre 0 e 2**64 - 1")
+    return args
+
+def main(argv=None):
+    global NUM_PLAYERS, LARGE_TABLE, MIN_PLAYERS, MATCH_MAX_WAIT, RATING_BUCKET, WORKER_ID, JOURNAL_DIR
+    global STATE_DIR, SNAPSHOT_INTERVAL, RECONNECT_GRACE, METRICS_PORT, PROFILE_HZ, STATS_DB
+    global TURN_TIMEOUT, TURN_TIMEOUT_ACTION, IDLE_TURNS, HANDSHAKE_TIMEOUT, DICE_SEED
+    global MAX_CONNECTIONS, LISTEN_BACKLOG, RATE_LIMITS
+    args = parse_args(argv)
+    NUM_PLAYERS = args.players
+    LARGE_TABLE = args.large_table
+    MIN_PLAYERS = args.min_players
+    MATCH_MAX_WAIT = args.max_wait
+    RATING_BUCKET = args.rating_bucket
+    WORKER_ID = args.worker_id
+    JOURNAL_DIR = args.journal
+    DICE_SEED = args.dice_seed
+    if JOURNAL_DIR:
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+    STATE_DIR = args.state_dir
+    STATS_DB = args.stats_db
+    SNAPSHOT_INTERVAL = args.snapshot_interval
+    RECONNECT_GRACE = args.reconnect_grace
+    METRICS_PORT = args.metrics_port
+    PROFILE_HZ = args.profile_hz
+    TURN_TIMEOUT = args.turn_timeout
+    TURN_TIMEOUT_ACTION = args.timeout_action
+    IDLE_TURNS = args.idle_turns
+    HANDSHAKE_TIMEOUT = args.handshake_timeout
+    MAX_CONNECTIONS = args.max_connections
+    LISTEN_BACKLOG = args.backlog
+    if args.rate_limit > 0:
+        RATE_LIMITS = {**RATE_LIMITS, "*": (args.rate_limit, max(1, round(3 * args.rate_limit)))}
+    else:
+        # Só o limite geral sai: 'resync' e 'leaderboard' protegem os caminhos caros
+        RATE_LIMITS = {k: v for k, v in RATE_LIMITS.items() if k != "*"}
+    for step in PACING:
+        PACING[step] *= args.pacing
+    logger.level = LEVELS[args.log_level]
+    logger.console = not args.quiet
+    logger.path = args.log_file
 
-    # Limpa log antigo
-    if os.path.exists(LOG_FILE):
+    # Limpa log antigo (sob o supervisor, o substituto de um processo continua o mesmo arquivo)
+    if WORKER_ID is None and os.path.exists(logger.path):
         try:
-            os.remove(LOG_FILE)
+            os.remove(logger.path)
         except:
             pass
 
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((HOST, PORT)) #"Liga" o socket do servidor ao endereço de rede e à porta especificados
-    server.listen(NUM_PLAYERS)
-    print(f"Servidor iniciado em {get_local_ip()}:{PORT}")
-    log("SERVER_START", host=get_local_ip(), port=PORT, players_needed=NUM_PLAYERS)
-
+    logger.start()
     try:
-        # Aguarda todos conectarem
-        while len(clients) < NUM_PLAYERS:
-            sock, addr = server.accept()
-            with game_lock:
-                clients.append({'socket': sock, 'addr': addr})
-            log("ACCEPT", addr=str(addr))
-            threading.Thread(target=handle_client, args=(sock, addr), daemon=True).start()
-
-        print("Todos conectados. Iniciando em 3s...")
-        log("ALL_CONNECTED", count=len(clients))
-        time.sleep(3)
-        game_started = True
-        start_new_round()
-
-        # Loop ocioso do servidor até fim do jogo
-        while not game_should_end:
-            time.sleep(0.5)
-
+        asyncio.run(GameServer().serve(args.host, args.port, args.reuse_port))
+    except KeyboardInterrupt:
+        pass
     finally:
         print("Encerrando servidor...")
-        for c in clients:
-            try:
-                c['socket'].close()
-            except:
-                pass
-        server.close()
         log("SERVER_STOP")
+        logger.stop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
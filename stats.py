@@ -0,0 +1,253 @@
+import queue
+import sqlite3
+import threading
+import time
+
+"""
+Placar persistente: partidas, vitórias, dados perdidos e blefes de cada
+jogador num SQLite local.
+
+O servidor só chama record_game() no fim de uma partida, que põe o registro
+numa fila e volta na hora -- nenhum I/O no event loop. Uma thread de fundo
+junta até 'batch_max' partidas (ou o que chegar em 'batch_delay' segundos)
+e grava o lote numa única transação: um INSERT por partida na tabela
+'games' e um UPSERT por jogador do lote em 'players', com os totais do lote
+já somados (quem jogou 40 partidas no lote é uma linha só).
+
+Os totais por jogador ficam prontos em 'players', então nem o placar nem a
+consulta de um jogador dependem do número de partidas gravadas:
+    - placar: os primeiros N pelo índice (wins DESC, name), O(N);
+    - jogador: busca pela chave primária + posição = 1 + quantos têm mais
+      vitórias, somados em 'win_counts' (jogadores por nº de vitórias, mantida
+      por gatilhos): uma linha por valor distinto de vitórias, não por jogador.
+O índice não leva 'games': só a linha do vencedor muda de lugar nele a cada
+partida, as dos outros jogadores são atualizadas no lugar.
+Os primeiros LEADERBOARD_MAX ficam em memória até o próximo lote. O banco usa
+WAL, então as leituras (em outras threads, cada uma com a própria conexão)
+não esperam a gravação.
+
+Esquema:
+    players     name (chave), games, wins, dice_lost, bluffs_caught (blefes seus
+                desmascarados), bluffs_called (blefes alheios que você desmascarou),
+                last_game (epoch da última partida)
+    win_counts  wins (chave), players (quantos jogadores têm essas vitórias)
+    games       id, finished (epoch), table_id, players (nº de assentos), rounds, winner
+"""
+
+BATCH_MAX = 500         # Partidas por transação
+BATCH_DELAY = 0.5       # Segundos que a primeira partida do lote espera as outras
+LEADERBOARD_MAX = 100   # Maior 'limit' aceito no placar
+CACHE_KB = 16384        # Cache de páginas do SQLite por conexão
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    dice_lost INTEGER NOT NULL DEFAULT 0,
+    bluffs_caught INTEGER NOT NULL DEFAULT 0,
+    bluffs_called INTEGER NOT NULL DEFAULT 0,
+    last_game REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_rank ON players (wins DESC, name);
+CREATE TABLE IF NOT EXISTS win_counts (
+    wins INTEGER PRIMARY KEY,
+    players INTEGER NOT NULL
+);
+-- Num gatilho disparado por um UPSERT o 'OR IGNORE' não vale (prevalece o
+-- conflito do comando de fora): a linha nova entra com NOT EXISTS
+CREATE TRIGGER IF NOT EXISTS players_insert AFTER INSERT ON players BEGIN
+    INSERT INTO win_counts SELECT new.wins, 0
+        WHERE NOT EXISTS (SELECT 1 FROM win_counts WHERE wins = new.wins);
+    UPDATE win_counts SET players = players + 1 WHERE wins = new.wins;
+END;
+CREATE TRIGGER IF NOT EXISTS players_wins AFTER UPDATE OF wins ON players
+WHEN new.wins != old.wins BEGIN
+    UPDATE win_counts SET players = players - 1 WHERE wins = old.wins;
+    INSERT INTO win_counts SELECT new.wins, 0
+        WHERE NOT EXISTS (SELECT 1 FROM win_counts WHERE wins = new.wins);
+    UPDATE win_counts SET players = players + 1 WHERE wins = new.wins;
+END;
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,
+    table_id INTEGER NOT NULL,
+    players INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    winner TEXT
+);
+"""
+
+_UPSERT = """
+INSERT INTO players (name, games, wins, dice_lost, bluffs_caught, bluffs_called, last_game)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    dice_lost = dice_lost + excluded.dice_lost,
+    bluffs_caught = bluffs_caught + excluded.bluffs_caught,
+    bluffs_called = bluffs_called + excluded.bluffs_called,
+    last_game = max(last_game, excluded.last_game)
+"""
+
+_COLUMNS = ("name", "games", "wins", "dice_lost", "bluffs_caught", "bluffs_called")
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM players"
+
+class StatsStore:
+    """
+    Parâmetros:
+        path (str) - Arquivo do banco (criado se não existir).
+        batch_max (int) - Partidas por transação.
+        batch_delay (float) - Espera máxima da primeira partida de um lote.
+    """
+
+    def __init__(self, path, batch_max=BATCH_MAX, batch_delay=BATCH_DELAY):
+        self.path = path
+        self.batch_max = batch_max
+        self.batch_delay = batch_delay
+        self.written = 0            # Partidas gravadas
+        self.batches = 0            # Transações gravadas
+        self.errors = 0             # Lotes perdidos por erro do SQLite
+        self._queue = queue.SimpleQueue()
+        self._local = threading.local()
+        self._top = (-1, [])        # (self.batches quando foi lido, primeiros LEADERBOARD_MAX)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._thread = threading.Thread(target=self._run, name="stats", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_KB}")
+        return conn
+
+    # =======================
+    # Escrita (lado do servidor: só enfileira)
+    # =======================
+    @property
+    def pending(self):
+        """
+        Partidas na fila, ainda não gravadas.
+        """
+        return self._queue.qsize()
+
+    def record_game(self, table_id, rounds, winner, players):
+        """
+        Enfileira uma partida terminada. Nunca faz I/O nem bloqueia.
+
+        Parâmetros:
+            winner (str | None) - Nome do vencedor (None = ninguém).
+            players (list) - [(nome, dados perdidos, blefes desmascarados, blefes que desmascarou)]
+                por assento. A lista não deve ser alterada depois.
+        """
+        self._queue.put((time.time(), table_id, rounds, winner, players))
+
+    def close(self):
+        """
+        Grava o que ainda estiver na fila e encerra a thread.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        conn = self._connect()
+        get = self._queue.get
+        stopping = False
+        while not stopping:
+            item = get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_max:
+                try:
+                    item = get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(conn, batch)
+        conn.close()
+
+    def _write(self, conn, batch):
+        games = []
+        totals = {}
+        for finished, table_id, rounds, winner, players in batch:
+            games.append((finished, table_id, len(players), rounds, winner))
+            for name, lost, caught, called in players:
+                t = totals.get(name)
+                if t is None:
+                    t = totals[name] = [0, 0, 0, 0, 0, 0.0]
+                t[0] += 1
+                t[1] += name == winner
+                t[2] += lost
+                t[3] += caught
+                t[4] += called
+                t[5] = finished
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT INTO games (finished, table_id, players, rounds, winner) "
+                                 "VALUES (?, ?, ?, ?, ?)", games)
+                conn.executemany(_UPSERT, [(name, *t) for name, t in totals.items()])
+        except sqlite3.Error:
+            self.errors += 1
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    # =======================
+    # Consultas (em qualquer thread)
+    # =======================
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def leaderboard(self, limit=10):
+        """
+        Os primeiros 'limit' (até LEADERBOARD_MAX) por vitórias; no empate, em
+        ordem de nome. Retorna [{"rank", "name", "games", "wins", ...}];
+        empatados em vitórias têm a mesma posição.
+        """
+        batches = self.batches
+        cached_at, top = self._top
+        if cached_at != batches:
+            rows = self._reader().execute(f"{_SELECT} ORDER BY wins DESC, name LIMIT ?",
+                                          (LEADERBOARD_MAX,)).fetchall()
+            top = []
+            rank = 0
+            for i, row in enumerate(rows):
+                if i == 0 or row[2] != rows[i - 1][2]:
+                    rank = i + 1
+                top.append(dict(zip(_COLUMNS, row), rank=rank))
+            self._top = (batches, top)
+        return top[:max(0, min(limit, LEADERBOARD_MAX))]
+
+    def player(self, name):
+        """
+        Totais e posição de um jogador, ou None se ele nunca terminou uma partida.
+        """
+        conn = self._reader()
+        row = conn.execute(f"{_SELECT} WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        ahead = conn.execute("SELECT COALESCE(SUM(players), 0) FROM win_counts WHERE wins > ?",
+                             (row[2],)).fetchone()[0]
+        return dict(zip(_COLUMNS, row), rank=ahead + 1)
+
+    def lookup(self, limit=10, name=None):
+        """
+        Resposta da mensagem 'leaderboard': {"top": leaderboard(limit), "player": player(name) | None}.
+        """
+        return {"top": self.leaderboard(limit), "player": None if name is None else self.player(name)}
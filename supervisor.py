@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import time
+from logger import AsyncLogger, INFO, WARNING, ERROR
+
+"""
+Supervisor multiprocesso: um só processo Python usa um núcleo (GIL), então
+o supervisor sobe N processos server.py escutando na MESMA porta com
+SO_REUSEPORT. O kernel distribui as conexões novas entre eles; cada processo
+tem o próprio event loop, matchmaking e mesas (conjuntos disjuntos).
+
+- Saúde: cada processo imprime "HEALTH {...}" a cada HEALTH_INTERVAL
+  (server.GameServer._heartbeat). Sem batimento por HEALTH_TIMEOUT, o
+  processo é morto e substituído; se sair sozinho, é substituído também.
+- Reinício gracioso (SIGHUP): um processo de cada vez, o substituto sobe
+  primeiro e, quando manda o primeiro batimento, o antigo recebe SIGTERM e
+  drena -- para de aceitar, termina as mesas em andamento e sai.
+- Ctrl+C / SIGTERM: drena todos e encerra.
+
+Uso:
+    python supervisor.py --workers 4 -- --pacing 0 --quiet
+    kill -HUP <pid do supervisor>     # reinício gracioso
+"""
+
+# =======================
+# Configurações
+# =======================
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+HEALTH_INTERVAL = 1.0   # Frequência das verificações
+HEALTH_TIMEOUT = 5.0    # Sem batimento por esse tempo -> processo travado
+READY_TIMEOUT = 10.0    # Espera pelo primeiro batimento de um processo novo
+DRAIN_TIMEOUT = 130.0   # Espera por um processo drenando antes do SIGKILL
+RESTART_BACKOFF = 1.0   # Pausa antes de substituir um processo que caiu
+STATUS_INTERVAL = 10.0  # Totais de todos os processos no log
+
+LOG_FILE = "supervisor_log.txt"
+logger = AsyncLogger(LOG_FILE, console=True)
+
+def log(event, level=INFO, **fields):
+    logger.log(event, level, **fields)
+
+# =======================
+# Processo de trabalho
+# =======================
+class Worker:
+    """
+    Um processo server.py. 'slot' é a posição fixa (0..N-1) que o substituto
+    herda, junto com o arquivo de log server_log.w<slot>.txt.
+    """
+
+    def __init__(self, slot, proc):
+        self.slot = slot
+        self.proc = proc
+        self.started_at = time.monotonic()
+        self.last_beat = None       # Último batimento recebido (monotonic)
+        self.health = {}            # Conteúdo do último "HEALTH {...}"
+        self.ready = asyncio.Event()
+        self.draining = False
+        self._reader = asyncio.create_task(self._read_output())
+
+    @property
+    def alive(self):
+        return self.proc.returncode is None
+
+    async def _read_output(self):
+        """
+        Lê o stdout do processo: batimentos são consumidos, o resto é repassado.
+        """
+        async for line in self.proc.stdout:
+            text = line.decode("utf-8", "replace").rstrip()
+            if text.startswith("HEALTH "):
+                try:
+                    self.health = json.loads(text[7:])
+                except ValueError:
+                    continue
+                self.last_beat = time.monotonic()
+                self.ready.set()
+            elif text:
+                print(f"[w{self.slot}] {text}", flush=True)
+
+    def stalled(self, now):
+        since = self.last_beat if self.last_beat is not None else self.started_at
+        limit = HEALTH_TIMEOUT if self.last_beat is not None else READY_TIMEOUT
+        return now - since > limit
+
+    def drain(self):
+        self.draining = True
+        if self.alive:
+            self.proc.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        if self.alive:
+            self.proc.kill()
+
+# =======================
+# Supervisor
+# =======================
+class Supervisor:
+    def __init__(self, num_workers, server_args):
+        self.num_workers = num_workers
+        self.server_args = server_args
+        self.workers = {}           # {slot: Worker} -> processos atendendo
+        self.draining = set()       # Workers antigos terminando as mesas
+        self.restarts = 0
+        self._stopping = False
+        self._rolling = None        # Task do reinício gracioso em andamento
+
+    async def spawn(self, slot):
+        args = [sys.executable, SERVER_SCRIPT, *self.server_args,
+                "--reuse-port", "--worker-id", str(slot),
+                "--log-file", f"server_log.w{slot}.txt"]
+        # Sessão própria: o Ctrl+C do terminal chega só ao supervisor, que drena os processos
+        proc = await asyncio.create_subprocess_exec(
+            *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True)
+        worker = Worker(slot, proc)
+        log("WORKER_SPAWN", slot=slot, pid=proc.pid)
+        return worker
+
+    async def start(self):
+        for slot in range(self.num_workers):
+            self.workers[slot] = await self.spawn(slot)
+
+    async def check(self):
+        """
+        Verificação de saúde: substitui processos que saíram ou pararam de responder.
+        """
+        now = time.monotonic()
+        for slot, worker in list(self.workers.items()):
+            if not worker.alive:
+                log("WORKER_EXIT", ERROR, slot=slot, pid=worker.proc.pid, code=worker.proc.returncode)
+            elif worker.stalled(now):
+                log("WORKER_STALLED", ERROR, slot=slot, pid=worker.proc.pid)
+                worker.kill()
+            else:
+                continue
+            await asyncio.sleep(RESTART_BACKOFF)
+            if self._stopping:
+                return
+            self.workers[slot] = await self.spawn(slot)
+            self.restarts += 1
+        for worker in list(self.draining):
+            if not worker.alive:
+                log("WORKER_DRAINED", slot=worker.slot, pid=worker.proc.pid)
+                self.draining.discard(worker)
+            elif now - worker.started_at > DRAIN_TIMEOUT or worker.stalled(now):
+                worker.kill()
+
+    async def rolling_restart(self):
+        """
+        Substitui um processo de cada vez: o novo entra na porta antes do
+        antigo parar de aceitar, então não há janela sem ninguém escutando.
+        """
+        log("ROLLING_RESTART", workers=len(self.workers))
+        for slot in sorted(self.workers):
+            if self._stopping:
+                return
+            old = self.workers[slot]
+            new = await self.spawn(slot)
+            try:
+                await asyncio.wait_for(new.ready.wait(), READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                log("WORKER_NOT_READY", ERROR, slot=slot, pid=new.proc.pid)
+                new.kill()
+                return
+            self.workers[slot] = new
+            old.drain()
+            old.started_at = time.monotonic()  # Conta o DRAIN_TIMEOUT a partir daqui
+            self.draining.add(old)
+            log("WORKER_DRAIN", slot=slot, old_pid=old.proc.pid, new_pid=new.proc.pid)
+
+    def request_restart(self):
+        if self._rolling is None or self._rolling.done():
+            self._rolling = asyncio.create_task(self.rolling_restart())
+
+    def totals(self):
+        keys = ("tables", "players", "queued", "tables_done")
+        result = dict.fromkeys(keys, 0)
+        for worker in [*self.workers.values(), *self.draining]:
+            for k in keys:
+                result[k] += worker.health.get(k, 0)
+        return result
+
+    async def stop(self):
+        """
+        Drena todos os processos e espera (no máximo DRAIN_TIMEOUT) eles saírem.
+        """
+        self._stopping = True
+        workers = [*self.workers.values(), *self.draining]
+        log("SUPERVISOR_STOP", workers=len(workers), **self.totals())
+        for worker in workers:
+            worker.drain()
+        waits = [asyncio.create_task(w.proc.wait()) for w in workers]
+        if waits:
+            done, pending = await asyncio.wait(waits, timeout=DRAIN_TIMEOUT)
+            for worker in workers:
+                if worker.alive:
+                    log("WORKER_KILL", WARNING, slot=worker.slot, pid=worker.proc.pid)
+                    worker.kill()
+            await asyncio.gather(*(w.proc.wait() for w in workers))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        loop.add_signal_handler(signal.SIGHUP, self.request_restart)
+
+        await self.start()
+        next_status = time.monotonic() + STATUS_INTERVAL
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), HEALTH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            if stop.is_set():
+                break
+            await self.check()
+            if time.monotonic() >= next_status:
+                next_status += STATUS_INTERVAL
+                log("STATUS", workers=len(self.workers), draining=len(self.draining),
+                    restarts=self.restarts, **self.totals())
+        if self._rolling is not None:
+            self._rolling.cancel()
+        await self.stop()
+
+# =======================
+# Bootstrap
+# =======================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sobe N processos server.py na mesma porta (SO_REUSEPORT)",
+        epilog="Argumentos depois de '--' vão para cada server.py (ex.: -- --pacing 0 --quiet)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos de jogo (padrão: um por núcleo)")
+    parser.add_argument("server_args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.server_args[:1] == ["--"]:
+        args.server_args = args.server_args[1:]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not hasattr(socket, "SO_REUSEPORT"):
+        sys.exit("SO_REUSEPORT indisponível neste sistema: rode server.py diretamente.")
+    logger.start()
+    log("SUPERVISOR_START", pid=os.getpid(), workers=args.workers, server_args=args.server_args)
+    try:
+        asyncio.run(Supervisor(args.workers, args.server_args).run())
+    finally:
+        logger.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+"""
+Os módulos do jogo ficam na raiz do repositório (sem pacote): os testes
+importam direto de lá, como os benchmarks.
+"""
@@ -0,0 +1,78 @@
+from engine import GameState, DiceStream, count_matches
+
+"""
+GameState: anel de assentos, eliminação e resolução do 'duvido'.
+"""
+
+def ring(game, start):
+    """
+    Assentos ativos na ordem do anel, a partir de 'start'.
+    """
+    seats = [start]
+    seat = game.next_active(start)
+    while seat != start:
+        seats.append(seat)
+        seat = game.next_active(seat)
+    return seats
+
+def test_ring_skips_seats_without_dice():
+    game = GameState(5)
+    game.set_dice_counts([2, 0, 3, 0, 1])
+    assert game.active == 3 and game.total == 6
+    assert ring(game, 0) == [0, 2, 4]
+    assert game.next_active(1) == 2
+    assert game.previous_active(0) == 4
+    assert game.previous_active(3) == 2
+
+def test_eliminate_passes_turn_and_keeps_totals():
+    game = GameState(4, dice_per_player=2)
+    game.set_hands([[1, 2], [3, 3], [5, 6], [1, 1]])
+    game.turn = 1
+    assert game.eliminate(1)
+    assert not game.eliminate(1)
+    assert game.turn == 2
+    assert ring(game, 0) == [0, 2, 3]
+    assert game.total == 6 and game.active == 3
+    assert game.count(3) == 3          # Só os coringas que sobraram
+    game.eliminate(0)
+    game.eliminate(3)
+    assert game.winner() == 2
+
+def test_challenge_on_true_bid_costs_the_challenger():
+    game = GameState(3, dice_per_player=2)
+    game.set_hands([[4, 1], [4, 2], [6, 6]])
+    game.apply_bid(3, 4)                # Assento 0; 4 + 4 + coringa = 3
+    result = game.resolve_challenge()   # Assento 1 duvida
+    assert (result.challenger, result.bidder, result.total_count) == (1, 0, 3)
+    assert result.valid_bid and result.loser == 1
+    assert game.dice_counts == [2, 1, 2]
+    assert game.turn == 1
+
+def test_challenge_on_bluff_costs_the_bidder_and_can_eliminate():
+    game = GameState(3, dice_per_player=1)
+    game.set_hands([[2], [5], [3]])
+    game.turn = 2
+    game.apply_bid(2, 6)                # Assento 2 blefa
+    result = game.resolve_challenge()   # Assento 0 duvida
+    assert not result.valid_bid and result.loser == 2
+    assert game.dice_counts == [1, 1, 0]
+    assert game.active == 2
+    assert ring(game, 0) == [0, 1]
+    game.roll(DiceStream(7))
+    assert game.turn == 0               # Quem perdeu saiu: a rodada começa com o seguinte
+    assert game.hands[2] == []
+
+def test_wild_ones():
+    assert count_matches(4, [1, 4, 2], wild_ones=True) == 2
+    assert count_matches(4, [1, 4, 2], wild_ones=False) == 1
+    game = GameState(1, dice_per_player=3, wild_ones=False)
+    game.set_hands([[1, 4, 4]])
+    assert game.count(4) == 2 and game.count(1) == 1
+
+def test_dice_stream_replays_any_round():
+    counts = [5, 3, 0, 2]
+    stream = DiceStream(42)
+    rounds = [stream.roll(counts)[0] for _ in range(3)]
+    assert [len(h) for h in rounds[0]] == counts
+    assert DiceStream(42).roll_round(2, counts)[0] == rounds[1]
+    assert DiceStream(43).roll_round(2, counts)[0] != rounds[1]
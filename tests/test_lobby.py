@@ -0,0 +1,79 @@
+from lobby import Matchmaker
+
+"""
+Matchmaker: mesa cheia na hora e sweep (mesas incompletas depois de max_wait,
+completadas pelos baldes de rating vizinhos).
+"""
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_lobby(table_size=4, min_size=2, max_wait=10.0, bucket_width=None):
+    """
+    Retorna (matchmaker, mesas formadas [[nomes]], relógio).
+    """
+    tables = []
+    clock = Clock()
+    lobby = Matchmaker(lambda players, queued_at: tables.append([p["name"] for p in players]),
+                       table_size, min_size, max_wait, bucket_width, clock=clock)
+    return lobby, tables, clock
+
+def join(lobby, name, rating=None):
+    player = {"name": name}  # O Matchmaker identifica o jogador pelo objeto, como no servidor
+    lobby.enqueue(player, rating)
+    return player
+
+def queued(lobby):
+    return [p["name"] for p in lobby.queued()]
+
+def test_full_table_forms_on_enqueue():
+    lobby, tables, _ = make_lobby(table_size=3)
+    for name in "abcd":
+        join(lobby, name)
+    assert tables == [["a", "b", "c"]]
+    assert queued(lobby) == ["d"] and lobby.waiting == 1
+
+def test_sweep_waits_for_max_wait_and_min_size():
+    lobby, tables, clock = make_lobby(min_size=2, max_wait=10)
+    join(lobby, "a")
+    clock.now = 30
+    assert lobby.sweep() == 0           # Sozinho não forma mesa
+    clock.now = 31
+    join(lobby, "b")
+    join(lobby, "c")
+    assert lobby.sweep() == 1           # 'a' passou do prazo: sai com quem houver
+    assert tables == [["a", "b", "c"]]
+    assert lobby.waiting == 0 and queued(lobby) == []
+
+def test_sweep_skips_players_who_left():
+    lobby, tables, clock = make_lobby(min_size=2, max_wait=10)
+    a = join(lobby, "a")
+    clock.now = 2
+    join(lobby, "b")
+    join(lobby, "c")
+    lobby.remove(a)
+    lobby.remove(a)                     # Sair duas vezes não conta duas
+    assert lobby.waiting == 2
+    clock.now = 11
+    assert lobby.sweep() == 0           # 'a' passaria do prazo, mas saiu; 'b' ainda não
+    clock.now = 12
+    assert lobby.sweep() == 1
+    assert tables == [["b", "c"]]
+    assert lobby.waiting == 0
+
+def test_sweep_gathers_from_nearest_buckets():
+    lobby, tables, clock = make_lobby(table_size=3, max_wait=10, bucket_width=100)
+    join(lobby, "mid", rating=550)
+    join(lobby, "far", rating=1200)
+    join(lobby, "low", rating=430)
+    join(lobby, "high", rating=640)
+    assert tables == []                 # Cada um num balde
+    clock.now = 10
+    assert lobby.sweep() == 1
+    # 'mid' (balde 5) puxa primeiro os baldes 4 e 6; 'far' (balde 12) fica
+    assert sorted(tables[0]) == ["high", "low", "mid"]
+    assert queued(lobby) == ["far"]
@@ -0,0 +1,78 @@
+import pytest
+from protocol import (encode_message, decode_message, FrameDecoder, FrameTooLarge, ProtocolError,
+                      HEADER, CODEC_BINARY, CODEC_JSON, pack_dice, unpack_dice)
+
+"""
+Codecs (JSON e bin1) e enquadramento: ida e volta e entradas malformadas.
+"""
+
+STATE = {
+    "players": [{"name": "Ana", "dice_count": 5}, {"name": "Bráulio", "dice_count": 3}],
+    "last_bid": {"quantity": 4, "face": 6},
+    "current_turn": "Bráulio",
+}
+
+MESSAGES = [
+    ("bid", {"quantity": 7, "face": 3}),
+    ("challenge", None),
+    ("your_turn", None),
+    ("round_start", {"dice": [1, 6, 2, 5, 3]}),
+    ("game_update", {"state": STATE, "message": "Ana apostou 4 x 6"}),
+    ("state_snapshot", {"seq": 12, "state": STATE}),
+    ("state_delta", {"seq": 13, "last_bid": {"quantity": 5, "face": 2}, "turn": 0, "dice": [[1, 2]]}),
+    ("info", {"message": "Procurando mesa..."}),
+]
+
+@pytest.mark.parametrize("codec", [CODEC_JSON, CODEC_BINARY])
+@pytest.mark.parametrize("msg_type, payload", MESSAGES)
+def test_round_trip(codec, msg_type, payload):
+    frames = FrameDecoder().feed(encode_message(msg_type, payload, codec))
+    assert frames == [{"type": msg_type, "payload": payload}]
+
+def test_binary_is_used_for_frequent_types():
+    frame = encode_message("bid", {"quantity": 7, "face": 3}, CODEC_BINARY)
+    assert frame[HEADER.size] < 0x20
+    assert len(frame) < len(encode_message("bid", {"quantity": 7, "face": 3}))
+
+def test_payload_outside_binary_layout_falls_back_to_json():
+    frame = encode_message("round_start", {"dice": [1, 2], "extra": True}, CODEC_BINARY)
+    assert frame[HEADER.size:HEADER.size + 1] == b"{"
+    assert FrameDecoder().feed(frame)[0]["payload"]["extra"] is True
+
+def test_decoder_reassembles_split_and_joined_frames():
+    stream = encode_message("your_turn") + encode_message("bid", {"quantity": 2, "face": 4}, CODEC_BINARY)
+    decoder = FrameDecoder()
+    messages = []
+    for i in range(len(stream)):
+        messages += decoder.feed(stream[i:i + 1])
+    assert [m["type"] for m in messages] == ["your_turn", "bid"]
+    assert decoder.feed(stream) == messages
+
+@pytest.mark.parametrize("body", [b'\n{"type": "your_turn"}', b'\t\r\n {"type": "your_turn"}'])
+def test_json_with_leading_whitespace(body):
+    assert decode_message(body) == {"type": "your_turn"}
+    assert FrameDecoder().feed(HEADER.pack(len(body)) + body) == [{"type": "your_turn"}]
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 4, 5, 30])
+def test_pack_dice(count):
+    dice = [(i * 5) % 6 + 1 for i in range(count)]
+    assert unpack_dice(pack_dice(dice), count) == dice
+
+def test_oversize_frame():
+    decoder = FrameDecoder(max_frame_size=16)
+    with pytest.raises(FrameTooLarge):
+        decoder.feed(HEADER.pack(17))
+
+@pytest.mark.parametrize("body", [
+    b"{nope",                   # JSON inválido
+    b"\xff\xfe",                # UTF-8 inválido
+    b"[1, 2]",                  # JSON que não é objeto
+    b"\x1f",                    # Nem TAG_* nem JSON
+    b"\x01\x00",                # 'bid' binário cortado
+])
+def test_malformed_body(body):
+    with pytest.raises(ProtocolError) as info:
+        decode_message(body)
+    assert not isinstance(info.value, FrameTooLarge)
+    with pytest.raises(ProtocolError):
+        FrameDecoder().feed(HEADER.pack(len(body)) + body)
@@ -0,0 +1,120 @@
+import os
+from engine import GameState, DiceStream
+from recovery import (StateStore, SavedTable, load_records, MAGIC_WAL, SAVED_BETWEEN, SAVED_BIDDING)
+
+"""
+Recuperação: snapshot + WAL de volta ao mesmo estado, e registro cortado no
+fim do WAL.
+"""
+
+def make_table(table_id, n=3):
+    game = GameState(n, dice_per_player=2)
+    return SavedTable(table_id, [f"p{i}" for i in range(n)], [f"t{i}" for i in range(n)], game,
+                      dice=DiceStream(1234 + table_id))
+
+def state(saved):
+    game = saved.game
+    return (saved.names, saved.tokens, saved.phase, game.turn, game.last_bid, game.last_bidder,
+            game.dice_counts, game.hands, saved.dice.seed if saved.dice else None,
+            saved.dice.round if saved.dice else None)
+
+def play_round(store, saved, hands, bids):
+    """
+    Rodada na mesa 'saved', registrada no WAL como o servidor faz.
+    """
+    game = saved.game
+    game.set_hands(hands)
+    saved.dice.round += 1
+    saved.phase = SAVED_BIDDING
+    game.last_bid, game.last_bidder = (0, 0), None
+    store.roll(saved.id, game.turn, hands)
+    for quantity, face in bids:
+        game.apply_bid(quantity, face)
+        store.bid(saved.id, quantity, face)
+
+def test_snapshot_and_wal_restore_tables(tmp_path):
+    store = StateStore(str(tmp_path))
+    store.rotate([])
+    one, two = make_table(1), make_table(2, n=4)
+    store.open_table(one)
+    store.open_table(two)
+    play_round(store, one, [[1, 5], [2, 2], [6, 3]], [(2, 2), (3, 2)])
+    one.game.resolve_challenge()
+    one.phase = SAVED_BETWEEN
+    store.challenge(one.id)
+
+    # Snapshot no meio: o que vem depois vai para o WAL da geração nova
+    generation, data = store.rotate([one, two])
+    store.write_snapshot(generation, data)
+    play_round(store, two, [[4, 4], [1, 3], [5, 6], [2, 1]], [(1, 4)])
+    gone = make_table(3)
+    store.open_table(gone)
+    store.close_table(gone.id)
+    leaving = two.game.turn
+    two.game.eliminate(leaving)
+    store.leave(two.id, leaving)
+    store.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["snapshot-00000002.lds", "wal-00000002.ldw"]
+    tables, applied = StateStore(str(tmp_path)).recover()
+    assert applied == 6                 # W_ROLL, W_BID, W_TABLE + W_DICE, W_CLOSE, W_LEAVE
+    assert sorted(tables) == [1, 2]
+    assert state(tables[1]) == state(one)
+    assert state(tables[2]) == state(two)
+    assert tables[2].game.total == two.game.total and tables[2].game.count(4) == two.game.count(4)
+
+def test_cut_record_is_ignored(tmp_path):
+    saved = make_table(1)
+    store = StateStore(str(tmp_path))
+    store.rotate([])
+    store.open_table(saved)
+    store.flush()
+    saved.game.turn = 2
+    play_round(store, saved, [[1, 1], [2, 2], [3, 3]], [])
+    store.close()
+    with open(tmp_path / "wal-00000001.ldw", "rb") as f:
+        data = f.read()
+
+    full = {}
+    assert load_records(data, len(MAGIC_WAL), full) == 3
+    assert full[1].game.hands == [[1, 1], [2, 2], [3, 3]] and full[1].game.turn == 2
+    # A queda cortou o W_ROLL no meio das mãos: a mesa fica como antes dele
+    cut = {}
+    assert load_records(data[:-1], len(MAGIC_WAL), cut) == 2
+    restored = cut[1]
+    assert restored.phase == SAVED_BETWEEN
+    assert restored.game.turn == 0 and restored.game.hands == [[], [], []]
+    assert restored.dice.round == 0
+
+def test_zero_padded_tail_stops_the_wal(tmp_path):
+    saved = make_table(1)
+    store = StateStore(str(tmp_path))
+    store.rotate([])
+    store.open_table(saved)
+    play_round(store, saved, [[1, 1], [2, 2], [3, 3]], [(2, 2)])
+    store.close()
+    wal = tmp_path / "wal-00000001.ldw"
+    size = wal.stat().st_size
+    with open(wal, "ab") as f:
+        f.write(bytes(4096))            # Páginas zeradas depois de uma queda da máquina
+
+    tables, applied = StateStore(str(tmp_path)).recover()
+    assert applied == 4                 # W_TABLE + W_DICE, W_ROLL, W_BID
+    assert state(tables[1]) == state(saved)
+
+    recovered = StateStore(str(tmp_path))
+    recovered.recover()
+    assert recovered.damaged == [(str(wal), size, "registro desconhecido 0")]
+
+def test_record_for_unknown_table_stops_the_wal(tmp_path):
+    saved = make_table(1)
+    store = StateStore(str(tmp_path))
+    store.rotate([])
+    store.open_table(saved)
+    store.bid(7, 1, 3)                  # Mesa que nunca foi aberta
+    store.bid(1, 1, 3)
+    store.close()
+    recovered = StateStore(str(tmp_path))
+    tables, applied = recovered.recover()
+    assert applied == 2 and tables[1].game.last_bid == (0, 0)
+    assert len(recovered.damaged) == 1 and recovered.damaged[0][2] == "mesa 7 não existe"
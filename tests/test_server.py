@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+import server
+from engine import GameState
+from protocol import HEADER, FrameDecoder, encode_message
+
+"""
+Controle de admissão do servidor: quadros grandes demais x mensagens
+malformadas (contados em separado), a nova chance depois de uma jogada
+recusada (só a primeira jogada depois do 'your_turn' da mesa não gasta ficha)
+e o jogador já derrubado por lentidão.
+"""
+
+# =======================
+# Conexões de verdade (handle_client num servidor local)
+# =======================
+async def send_and_close(payload):
+    """
+    Abre um GameServer local, manda 'payload' numa conexão e espera o servidor
+    fechá-la. Retorna o GameServer.
+    """
+    game_server = server.GameServer()
+    listener = await asyncio.start_server(game_server.handle_client, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(payload)
+    await writer.drain()
+    await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return game_server
+
+def test_oversize_frame_is_counted_as_oversize():
+    game_server = asyncio.run(send_and_close(HEADER.pack(server.CLIENT_MAX_FRAME + 1) + b"{"))
+    assert game_server.shed["oversize"] == 1
+    assert game_server.shed["malformed"] == 0
+    assert game_server.connections == 0
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1]", b"\x1f"])
+def test_malformed_message_is_counted_as_malformed(body):
+    game_server = asyncio.run(send_and_close(HEADER.pack(len(body)) + body))
+    assert game_server.shed["malformed"] == 1
+    assert game_server.shed["oversize"] == 0
+
+# =======================
+# Mesa com jogadores de mentira
+# =======================
+class FakeOutbox:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def push(self, msg_type, data):
+        self.sent.append(msg_type)
+        return True
+
+def make_table(num_players=2):
+    table = server.Table(1)
+    for seat in range(num_players):
+        table.players.append({"name": f"p{seat}", "seat": seat, "table": table, "outbox": FakeOutbox(),
+                              "addr": None, "codec": "json", "delta": False, "token": f"t{seat}",
+                              "connected": True, "grace": None, "prompted": False})
+    table.game = GameState(num_players)
+    table.game.set_hands([[2, 3, 4, 5, 6]] * num_players)
+    table.phase = server.PHASE_BIDDING
+    return table
+
+@pytest.mark.parametrize("msg", [
+    {"type": "bid", "payload": {"quantity": "muitos", "face": 3}},   # Formato inválido
+    {"type": "bid", "payload": {"quantity": 3, "face": 9}},          # Recusada pelo check_bid
+    {"type": "challenge"},                                           # Duvido sem aposta
+])
+def test_rejected_action_asks_again_without_free_pass(msg):
+    table = make_table()
+    player = table.current_player()
+    table.handle_action(player, msg)
+    assert player["outbox"].sent == ["error", "your_turn"]
+    assert not player["prompted"]       # A nova tentativa passa pelo RateLimiter
+    assert table.current_player() is player and table.game.last_bid == (0, 0)
+
+async def wait_for_type(reader, decoder, msg_type):
+    while True:
+        data = await reader.read(4096)
+        assert data, "conexão fechada"
+        for msg in decoder.feed(data):
+            if msg["type"] == msg_type:
+                return msg
+
+async def retry_burst(tries):
+    """
+    Dois jogadores numa mesa local; o da vez manda 'tries' apostas inválidas
+    de uma vez. Retorna (GameServer, quantas foram recusadas pela mesa).
+    """
+    game_server = server.GameServer()
+    listener = await asyncio.start_server(game_server.handle_client, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    clients = []
+    for name in ("ana", "bia"):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(encode_message("set_name", {"name": name}))
+        clients.append((reader, writer, FrameDecoder()))
+    waits = {asyncio.create_task(wait_for_type(r, d, "your_turn")): (r, w, d) for r, w, d in clients}
+    done, pending = await asyncio.wait(waits, timeout=5, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    reader, writer, decoder = waits[done.pop()]
+    writer.write(encode_message("bid", {"quantity": 1, "face": 9}) * tries)
+    rejected = 0
+    while True:
+        try:
+            data = await asyncio.wait_for(reader.read(65536), 0.3)
+        except asyncio.TimeoutError:
+            break
+        rejected += sum(msg["type"] == "error" for msg in decoder.feed(data))
+    for _, w, _ in clients:
+        w.close()
+    listener.close()
+    await listener.wait_closed()
+    return game_server, rejected
+
+def test_retries_after_a_rejected_action_cost_tokens(monkeypatch):
+    monkeypatch.setattr(server, "NUM_PLAYERS", 2)
+    monkeypatch.setattr(server, "MIN_PLAYERS", 2)
+    monkeypatch.setattr(server, "RATE_LIMITS", {"*": (0.001, 4)})
+    monkeypatch.setattr(server, "FLOOD_LIMIT", 0)
+    for step in server.PACING:
+        monkeypatch.setitem(server.PACING, step, 0)
+    game_server, rejected = asyncio.run(retry_burst(10))
+    # 4 fichas: 1 no set_name, 3 nas novas tentativas; a primeira aposta foi pedida
+    assert rejected == 4
+    assert game_server.shed["rate"] == 6
+
+def test_closed_outbox_is_skipped():
+    table = make_table(3)
+    slow = table.players[1]
+    slow["outbox"].closed = True        # Derrubado por lentidão, a leitura ainda não notou
+    table.send_to(slow, "info", {"message": "oi"})
+    table.broadcast("info", {"message": "todos"})
+    assert slow["outbox"].sent == []
+    assert table.players[0]["outbox"].sent == ["info"]
+    assert table.players[2]["outbox"].sent == ["info"]
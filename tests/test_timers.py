@@ -0,0 +1,116 @@
+import asyncio
+from timers import TimerWheel, LEVEL0_SIZE
+
+"""
+TimerWheel: disparo, cancelamento e descida dos níveis de cima (cascade).
+A roda roda sobre um loop de mentira, com o relógio avançado à mão.
+"""
+
+class FakeHandle:
+    def __init__(self, when):
+        self.when = when
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class FakeLoop:
+    """
+    O que a TimerWheel usa do loop: time(), call_at() e call_exception_handler().
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.handle = None
+
+    def time(self):
+        return self.now
+
+    def call_at(self, when, callback):
+        self.handle = FakeHandle(when)
+        self.callback = callback
+        return self.handle
+
+    def call_exception_handler(self, context):
+        raise context["exception"]
+
+def make_wheel():
+    loop = FakeLoop()
+    wheel = TimerWheel(resolution=0.125)  # Exato em ponto flutuante
+    wheel._loop = loop
+    wheel._origin = loop.time()
+    return wheel, loop
+
+def advance(wheel, ticks):
+    """
+    Anda 'ticks' tiques, disparando o tique agendado da roda a cada um.
+    """
+    loop = wheel._loop
+    for _ in range(ticks):
+        loop.now += wheel.resolution
+        if wheel._handle is not None:
+            loop.callback()
+
+def arm(wheel, ticks, callback, *args):
+    return wheel.call_later(ticks * wheel.resolution, callback, *args)
+
+def test_fires_once_at_its_tick():
+    wheel, _ = make_wheel()
+    fired = []
+    arm(wheel, 5, fired.append, "a")
+    assert len(wheel) == 1
+    advance(wheel, 4)
+    assert fired == []
+    advance(wheel, 1)
+    assert fired == ["a"]
+    advance(wheel, LEVEL0_SIZE)
+    assert fired == ["a"] and len(wheel) == 0 and wheel.fired == 1
+
+def test_cascade_from_upper_levels():
+    wheel, _ = make_wheel()
+    fired = []
+    delays = [LEVEL0_SIZE + 10, 5 * LEVEL0_SIZE + 3, 70 * LEVEL0_SIZE + 1]
+    for delay in delays:
+        arm(wheel, delay, fired.append, delay)
+    for delay in delays:
+        advance(wheel, delay - 1 - wheel.now)
+        assert delay not in fired
+        advance(wheel, 1)
+        assert fired[-1] == delay
+    assert fired == delays and len(wheel) == 0
+
+def test_cancel():
+    wheel, _ = make_wheel()
+    fired = []
+    near = arm(wheel, 3, fired.append, "near")
+    far = arm(wheel, 3 * LEVEL0_SIZE, fired.append, "far")
+    keep = arm(wheel, 4, fired.append, "keep")
+    near.cancel()
+    far.cancel()
+    near.cancel()                       # Cancelar duas vezes não faz nada
+    assert near.cancelled() and far.cancelled() and not keep.cancelled()
+    assert len(wheel) == 1
+    advance(wheel, 4 * LEVEL0_SIZE)
+    assert fired == ["keep"]
+
+def test_cancel_from_a_callback_of_the_same_tick():
+    wheel, _ = make_wheel()
+    fired = []
+    timers = {}
+    def first():
+        fired.append("first")
+        timers["second"].cancel()
+    timers["first"] = arm(wheel, 2, first)
+    timers["second"] = arm(wheel, 2, fired.append, "second")
+    advance(wheel, 2)
+    assert fired == ["first"] and len(wheel) == 0
+
+def test_runs_on_the_event_loop():
+    async def main():
+        wheel = TimerWheel(resolution=0.01)
+        done = asyncio.get_running_loop().create_future()
+        wheel.call_later(0.02, done.set_result, "ok")
+        result = await asyncio.wait_for(done, 1)
+        wheel.close()
+        return result
+    assert asyncio.run(main()) == "ok"
@@ -0,0 +1,196 @@
+import asyncio
+import math
+
+"""
+Roda de timers hierárquica (timing wheel) para prazos que quase nunca
+disparam: o prazo de cada turno, a espera pelo primeiro 'set_name' etc.
+Com centenas de milhares desses em voo, o loop.call_later do asyncio paga
+um objeto na heap e um O(log n) por timer (e os cancelados ficam na heap até
+vencerem); aqui armar e cancelar são O(1) e o loop vê um único timer, o
+"tique" da roda, que só fica agendado enquanto houver prazos armados.
+
+Os prazos são arredondados para cima até o próximo tique ('resolution'
+segundos): nunca disparam antes da hora, e no máximo um tique depois.
+
+    wheel = TimerWheel(resolution=0.1)
+    timer = wheel.call_later(30, table.turn_timeout, seq)
+    timer.cancel()
+
+Estrutura (como nos timers do kernel Linux): o nível 0 tem 1024 posições de
+um tique; cada nível acima tem 64 posições, cada uma do tamanho do nível
+inteiro de baixo. Um prazo entra no nível mais baixo que o alcança; quando o
+nível de baixo dá a volta, a posição seguinte do nível de cima é "descida"
+(cada timer é recolocado, agora mais perto). Um timer desce no máximo uma
+vez por nível, então o custo total por timer continua O(1).
+"""
+
+LEVEL0_BITS = 10            # Nível 0: 1024 tiques (~100 s com tique de 0,1 s: prazos de turno caem aqui)
+LEVEL_BITS = 6
+LEVELS = 4                  # 2**28 tiques: ~310 dias com tique de 0,1 s
+LEVEL0_SIZE = 1 << LEVEL0_BITS
+LEVEL0_MASK = LEVEL0_SIZE - 1
+LEVEL_MASK = (1 << LEVEL_BITS) - 1
+MAX_TICKS = (1 << (LEVEL0_BITS + LEVEL_BITS * (LEVELS - 1))) - 1  # Prazos maiores são encurtados
+
+class Timer:
+    """
+    Um prazo armado na roda. cancel() tira o timer da posição dele (O(1)).
+    """
+
+    __slots__ = ("expires", "callback", "args", "_wheel", "_slot")
+
+    def __init__(self, wheel, expires, callback, args):
+        self.expires = expires      # Tique em que dispara
+        self.callback = callback
+        self.args = args
+        self._wheel = wheel
+        self._slot = None           # Dicionário da posição onde está; None = disparou ou cancelado
+
+    def cancel(self):
+        slot = self._slot
+        if slot is not None:
+            del slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+    def cancelled(self):
+        return self._slot is None
+
+class TimerWheel:
+    """
+    Timers de baixa resolução sobre o event loop em execução (criado na
+    primeira chamada). Mesma interface do loop.call_later.
+    """
+
+    def __init__(self, resolution=0.1):
+        self.resolution = resolution
+        self._ticks_per_second = 1.0 / resolution
+        self.now = 0                # Último tique processado
+        self.fired = 0              # Timers disparados desde o início
+        self._count = 0             # Timers armados
+        self._levels = [[{} for _ in range(LEVEL0_SIZE)]]
+        self._levels += [[{} for _ in range(1 << LEVEL_BITS)] for _ in range(LEVELS - 1)]
+        self._level0 = self._levels[0]
+        self._loop = None
+        self._origin = 0.0          # loop.time() do tique 0
+        self._handle = None         # Próximo tique agendado no loop (None = roda parada)
+
+    def __len__(self):
+        return self._count
+
+    def _current_tick(self):
+        return int((self._loop.time() - self._origin) * self._ticks_per_second)
+
+    def call_later(self, delay, callback, *args):
+        """
+        Chama callback(*args) daqui a 'delay' segundos (arredondado para cima
+        até o tique seguinte). Retorna o Timer, para cancelar.
+        """
+        loop = self._loop
+        if loop is None:
+            loop = self._loop = asyncio.get_running_loop()
+            self._origin = loop.time()
+        if self._handle is None:
+            # Roda parada (e vazia): o relógio dela pula direto para agora
+            self.now = self._current_tick()
+            self._handle = loop.call_at(self._origin + (self.now + 1) * self.resolution, self._tick)
+        now = self.now
+        expires = math.ceil((loop.time() + delay - self._origin) * self._ticks_per_second)
+        if expires <= now:
+            expires = now + 1
+        timer = Timer(self, expires, callback, args)
+        self._count += 1
+        if expires - now < LEVEL0_SIZE:
+            # Caso comum (prazos de até 1024 tiques): direto no nível 0
+            slot = self._level0[expires & LEVEL0_MASK]
+            slot[timer] = None
+            timer._slot = slot
+        else:
+            self._place(timer)
+        return timer
+
+    def _place(self, timer):
+        expires = timer.expires
+        diff = expires - self.now
+        if diff > MAX_TICKS:
+            diff = MAX_TICKS
+            expires = timer.expires = self.now + MAX_TICKS
+        if diff < LEVEL0_SIZE:
+            slot = self._level0[expires & LEVEL0_MASK]
+        else:
+            level = 1
+            shift = LEVEL0_BITS
+            while diff >= 1 << (shift + LEVEL_BITS) and level < LEVELS - 1:
+                level += 1
+                shift += LEVEL_BITS
+            slot = self._levels[level][(expires >> shift) & LEVEL_MASK]
+        slot[timer] = None
+        timer._slot = slot
+
+    def _cascade(self, level, index):
+        """
+        Desce os timers de uma posição do nível 'level' para os níveis de baixo.
+        """
+        slots = self._levels[level]
+        slot = slots[index]
+        if slot:
+            slots[index] = {}
+            for timer in slot:
+                self._place(timer)
+
+    def _advance(self):
+        """
+        Processa o tique seguinte: desce os níveis de cima se o nível 0 deu a
+        volta e dispara a posição do tique.
+        """
+        self.now = now = self.now + 1
+        index = now & LEVEL0_MASK
+        if index == 0:
+            shift = LEVEL0_BITS
+            for level in range(1, LEVELS):
+                upper = (now >> shift) & LEVEL_MASK
+                self._cascade(level, upper)
+                if upper:
+                    break
+                shift += LEVEL_BITS
+        slots = self._level0
+        slot = slots[index]
+        if not slot:
+            return
+        slots[index] = {}
+        for timer in list(slot):
+            if timer._slot is not slot:
+                continue  # Cancelado por um callback anterior deste mesmo tique
+            timer._slot = None
+            self._count -= 1
+            self.fired += 1
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                self._loop.call_exception_handler({
+                    "message": f"Erro no timer {timer.callback!r}", "exception": e})
+
+    def _tick(self):
+        scheduled = self.now + 1
+        # Atraso do loop: processa todos os tiques que passaram (no mínimo o agendado)
+        target = max(scheduled, self._current_tick())
+        while self.now < target:
+            self._advance()
+        if self._count:
+            self._handle = self._loop.call_at(self._origin + (self.now + 1) * self.resolution, self._tick)
+        else:
+            self._handle = None
+
+    def close(self):
+        """
+        Para a roda e descarta todos os timers armados.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for slots in self._levels:
+            for slot in slots:
+                for timer in slot:
+                    timer._slot = None
+                slot.clear()
+        self._count = 0